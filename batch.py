@@ -0,0 +1,151 @@
+import argparse
+import math
+import struct
+import sys
+import time
+import numpy as np
+from space import Space, load_orbits, load_satellites, update_all_positions
+
+# Propagació sense interfície gràfica. Carrega un espai, l'avança de start a
+# stop amb pas step amb la mateixa semàntica que update_all_positions i
+# escriu x/y de cada satèl·lit a cada pas, per blocs de `chunk` passos, de
+# manera que la memòria no depèn de la durada de la simulació.
+#
+# Formats de sortida:
+#   csv: una fila "time,satellite,x,y" per satèl·lit i pas
+#   bin: capçalera (TRAJ_HEADER) + noms separats per "\n" i després blocs
+#        [nombre de passos (uint32), temps (float64 × passos),
+#         x (float64 × passos × satèl·lits), y (ídem)]
+
+TRAJ_MAGIC = b"ORBTRAJ\0"
+TRAJ_VERSION = 1
+TRAJ_HEADER = struct.Struct("<8sIQQ")
+CHUNK_STEPS = struct.Struct("<I")
+
+
+class CsvWriter:
+    def __init__(self, f, names):
+        self.f = f
+        self.names = names
+        f.write("time,satellite,x,y\n")
+
+    def write(self, times, x, y):
+        for t, xs, ys in zip(times.tolist(), x, y):
+            self.f.write("".join(f"{t},{name},{xi:.6f},{yi:.6f}\n"
+                                 for name, xi, yi in zip(self.names, xs.tolist(), ys.tolist())))
+
+
+class BinaryWriter:
+    def __init__(self, f, names):
+        self.f = f
+        blob = "\n".join(names).encode("utf-8")
+        f.write(TRAJ_HEADER.pack(TRAJ_MAGIC, TRAJ_VERSION, len(names), len(blob)))
+        f.write(blob)
+
+    def write(self, times, x, y):
+        self.f.write(CHUNK_STEPS.pack(len(times)))
+        self.f.write(np.ascontiguousarray(times, dtype="<f8").tobytes())
+        self.f.write(np.ascontiguousarray(x, dtype="<f8").tobytes())
+        self.f.write(np.ascontiguousarray(y, dtype="<f8").tobytes())
+
+
+WRITERS = {"csv": (CsvWriter, "w"), "bin": (BinaryWriter, "wb")}
+
+
+def read_trajectory(filename):
+    # Llegeix un fitxer "bin" bloc a bloc: retorna (noms, generador de
+    # (temps, x, y)) amb x i y de forma (passos, satèl·lits).
+    f = open(filename, "rb")
+    magic, version, count, nbytes = TRAJ_HEADER.unpack(f.read(TRAJ_HEADER.size))
+    if magic != TRAJ_MAGIC or version != TRAJ_VERSION:
+        f.close()
+        raise ValueError(f"{filename}: no és una trajectòria vàlida")
+    names = f.read(nbytes).decode("utf-8").split("\n") if count else []
+
+    def chunks():
+        with f:
+            while True:
+                head = f.read(CHUNK_STEPS.size)
+                if len(head) < CHUNK_STEPS.size:
+                    return
+                (steps,) = CHUNK_STEPS.unpack(head)
+                times = np.frombuffer(f.read(8 * steps), dtype="<f8")
+                x = np.frombuffer(f.read(8 * steps * count), dtype="<f8").reshape(steps, count)
+                y = np.frombuffer(f.read(8 * steps * count), dtype="<f8").reshape(steps, count)
+                yield times, x, y
+
+    return names, chunks()
+
+
+def propagate_to_file(space, start, stop, step, out, fmt="csv", chunk=256, progress=None):
+    # Retorna (passos, segons de rellotge).
+    sats = space.satellite_table
+    rows = np.flatnonzero(sats.alive[:sats.n])
+    names = [sats.names[i] for i in rows.tolist()]
+    steps = int(math.floor((stop - start) / step + 1e-9)) + 1 if stop >= start else 0
+    chunk = max(1, min(chunk, steps or 1))
+    times = np.empty(chunk)
+    x = np.empty((chunk, len(rows)))
+    y = np.empty((chunk, len(rows)))
+    writer_class, mode = WRITERS[fmt]
+    began = time.perf_counter()
+    with open(out, mode) as f:
+        writer = writer_class(f, names)
+        filled = 0
+        for k in range(steps):
+            t = start + k * step
+            update_all_positions(space, t)
+            times[filled] = t
+            np.take(sats.col("x"), rows, out=x[filled])
+            np.take(sats.col("y"), rows, out=y[filled])
+            filled += 1
+            if filled == chunk or k == steps - 1:
+                writer.write(times[:filled], x[:filled], y[:filled])
+                filled = 0
+                if progress is not None:
+                    progress(k + 1, steps, time.perf_counter() - began)
+    return steps, time.perf_counter() - began
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Propagació sense interfície amb sortida a disc")
+    parser.add_argument("orbits")
+    parser.add_argument("satellites")
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--stop", type=float, required=True)
+    parser.add_argument("--step", type=float, default=1.0)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--chunk", type=int, default=256, help="passos per bloc escrit")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="reparteix la propagació entre processos (sharded.py)")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+    if args.step <= 0:
+        parser.error("--step ha de ser positiu")
+
+    space = Space()
+    load_orbits(space, args.orbits)
+    load_satellites(space, args.satellites)
+    n = len(space.satellites)
+
+    def progress(done, total, elapsed):
+        print(f"{done}/{total} passos, {done * n / max(elapsed, 1e-9):,.0f} satèl·lit·passos/s",
+              file=sys.stderr)
+
+    if args.workers is not None:
+        from sharded import ShardedPropagator
+        space.propagator = ShardedPropagator(space, args.workers)
+    try:
+        steps, elapsed = propagate_to_file(space, args.start, args.stop, args.step, args.out,
+                                           args.format, args.chunk,
+                                           None if args.quiet else progress)
+    finally:
+        if space.propagator is not None:
+            space.propagator.close()
+    print(f"{n} satèl·lits × {steps} passos en {elapsed:.2f} s: "
+          f"{n * steps / max(elapsed, 1e-9):,.0f} satèl·lit·passos/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from orbit import Orbit
+from propagator import kepler_E_batch
+from satellite import change_orbit
+from space import Space, load_orbits, load_satellites, save_orbits, save_satellites, update_all_positions
+from synthetic import synthetic_space
+
+# Banc de proves dels camins calents sobre constel·lacions sintètiques
+# (synthetic_space, llavor fixa). Cada cas es repeteix `repeat` vegades i es
+# desa el mínim (el valor més estable) i la mediana en segons, més el temps
+# per element. `compare` marca com a regressió qualsevol cas el mínim del qual
+# empitjora més de `threshold` respecte d'un fitxer de referència.
+#
+#   python bench.py run --out actual.json
+#   python bench.py compare referencia.json actual.json --threshold 0.10
+#   python bench.py startup          (temps d'importació de cada mòdul)
+
+SIZES = (10, 1000, 100000, 1000000)
+REPEAT = 5
+SAMPLE = 1000            # crides escalars (kepler_E, change_orbit) per mida
+RENDER_MAX = 100000
+CONJUNCTION_MAX = 50000
+CONJUNCTION_SPAN = 600.0
+THRESHOLD = 0.20
+STARTUP_MODULES = ("space", "snapshot", "batch", "conjunction", "transfer", "plotting",
+                   "render", "interface")
+HEAVY = ("matplotlib", "PySide6")
+MIN_TIME = 0.05         # s per mostra als casos curts
+
+
+def _measure(run, repeat, setup=None):
+    # run(state) es cronometra; setup() (no cronometrat) prepara cada
+    # repetició. Sense setup, els casos curts s'executen diverses vegades per
+    # mostra fins a MIN_TIME i es divideix, perquè la resolució no domini.
+    if setup is not None:
+        samples = []
+        for _ in range(repeat):
+            state = setup()
+            start = time.perf_counter()
+            run(state)
+            samples.append(time.perf_counter() - start)
+        return samples
+    start = time.perf_counter()
+    run(None)
+    loops = max(1, math.ceil(MIN_TIME / max(time.perf_counter() - start, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run(None)
+        samples.append((time.perf_counter() - start) / loops)
+    return samples
+
+
+def bench_kepler_E(space, n, repeat):
+    # crides escalars a Orbit.kepler_E sobre una mostra d'anomalies
+    rng = np.random.default_rng(0)
+    orbits = list(space.orbits)
+    k = min(n, SAMPLE)
+    calls = [(orbits[i % len(orbits)], M) for i, M in
+             enumerate(rng.uniform(0, 2 * math.pi, k).tolist())]
+
+    def run(_):
+        for orbit, M in calls:
+            orbit.kepler_E(M)
+
+    return _measure(run, repeat), k
+
+
+def bench_kepler_E_batch(space, n, repeat):
+    rng = np.random.default_rng(0)
+    M = rng.uniform(0, 2 * math.pi, n)
+    epsilon = space.orbit_table.col("epsilon")[rng.integers(0, space.orbit_table.n, n)]
+    return _measure(lambda _: kepler_E_batch(M, epsilon), repeat), n
+
+
+def bench_update_all_positions(space, n, repeat):
+    # tic amb arrencada en calent, com fa el motor de simulació
+    update_all_positions(space, 0.0)
+    ticks = itertools.count(1)
+    return _measure(lambda _: update_all_positions(space, next(ticks) * 0.02), repeat), n
+
+
+def bench_load_satellites(space, n, repeat):
+    with tempfile.TemporaryDirectory() as folder:
+        orbits_file = os.path.join(folder, "orbits.txt")
+        satellites_file = os.path.join(folder, "satellites.txt")
+        save_orbits(space, orbits_file)
+        save_satellites(space, satellites_file)
+
+        def setup():
+            fresh = Space()
+            load_orbits(fresh, orbits_file)
+            return fresh
+
+        return _measure(lambda fresh: load_satellites(fresh, satellites_file), repeat, setup), n
+
+
+def bench_change_orbit(space, n, repeat):
+    # maniobres sobre una mostra de satèl·lits cap a òrbites noves; change_orbit
+    # adopta les òrbites BENCH a la taula de l'espai, així que el cas fa servir
+    # un espai propi per no engreixar el dels casos següents
+    space = synthetic_space(n)
+    update_all_positions(space, 0.0)
+    k = min(n, SAMPLE)
+    sats = list(space.satellites[:k])
+    state = [(s.orbit, s.mass, s.fuel, s.M0) for s in sats]
+    raised = []
+
+    def setup():
+        # change_orbit retalla l'excentricitat de la destinació i l'adopta:
+        # cada repetició parteix d'òrbites noves i treu les de l'anterior
+        for sat, (orbit, mass, fuel, M0) in zip(sats, state):
+            sat.orbit, sat.mass, sat.fuel, sat.M0 = orbit, mass, fuel, M0
+        for target in raised:
+            if target in space.orbits:
+                space.orbits.remove(target)
+        raised[:] = [Orbit(f"BENCH{i}", o.period * 1.2, o.epsilon, o.a * 1.13)
+                     for i, (o, _, _, _) in enumerate(state)]
+        return raised
+
+    def run(targets):
+        for sat, target in zip(sats, targets):
+            change_orbit(sat, target, 0.0)
+
+    return _measure(run, repeat, setup), k
+
+
+def _agg_axes():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=(8, 8))
+    FigureCanvasAgg(figure)
+    return figure.add_subplot()
+
+
+def bench_render_build(space, n, repeat):
+    # primer dibuix complet (capa estàtica + satèl·lits) en un llenç Agg
+    from render import SpaceRenderer
+    update_all_positions(space, 0.0)
+
+    def setup():
+        return SpaceRenderer(_agg_axes())
+
+    return _measure(lambda renderer: renderer.draw(space), repeat, setup), n
+
+
+def bench_render_frame(space, n, repeat):
+    # fotogrames successius amb blitting; la propagació no es compta
+    from render import SpaceRenderer
+    renderer = SpaceRenderer(_agg_axes())
+    update_all_positions(space, 0.0)
+    renderer.draw(space)
+    ticks = itertools.count(1)
+
+    def setup():
+        update_all_positions(space, next(ticks) * 10.0)
+
+    return _measure(lambda _: renderer.draw(space), repeat, setup), n
+
+
+def bench_conjunctions(space, n, repeat):
+    from conjunction import screen_conjunctions
+    return _measure(lambda _: screen_conjunctions(space, 0.0, CONJUNCTION_SPAN, 5.0),
+                    repeat), n
+
+
+CASES = {
+    "kepler_E": (bench_kepler_E, None),
+    "kepler_E_batch": (bench_kepler_E_batch, None),
+    "update_all_positions": (bench_update_all_positions, None),
+    "load_satellites": (bench_load_satellites, None),
+    "change_orbit": (bench_change_orbit, None),
+    "render_build": (bench_render_build, RENDER_MAX),
+    "render_frame": (bench_render_frame, RENDER_MAX),
+    "conjunctions": (bench_conjunctions, CONJUNCTION_MAX),
+}
+
+
+def run_suite(sizes=SIZES, repeat=REPEAT, cases=None, limits=None, log=print):
+    limits = dict(limits or {})
+    results = {}
+    for n in sizes:
+        space = synthetic_space(n)
+        for name, (bench, limit) in CASES.items():
+            if cases and name not in cases:
+                continue
+            limit = limits.get(name, limit)
+            if limit is not None and n > limit:
+                continue
+            samples, items = bench(space, n, repeat)
+            best = min(samples)
+            results[f"{name}/{n}"] = {
+                "case": name, "size": n, "items": items, "min": best,
+                "median": statistics.median(samples), "per_item": best / max(items, 1),
+            }
+            log(f"{name:22s} n={n:<8d} min {best * 1e3:10.3f} ms  "
+                f"{best / max(items, 1) * 1e6:10.3f} µs/element")
+    return {"meta": _meta(repeat), "results": results}
+
+
+def _meta(repeat):
+    return {
+        "python": platform.python_version(), "numpy": np.__version__,
+        "platform": platform.platform(), "processor": platform.processor(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": repeat,
+    }
+
+
+def measure_startup(modules=STARTUP_MODULES, repeat=REPEAT, log=print):
+    # temps d'importar cada mòdul en un intèrpret nou (mínim de `repeat`) i
+    # quins dels mòduls pesants (HEAVY) arrossega
+    folder = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        script = (f"import sys, time; t = time.perf_counter(); import {module}; "
+                  f"t = time.perf_counter() - t; "
+                  f"print(t, *(h in sys.modules for h in {HEAVY!r}))")
+        samples = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", script], cwd=folder, check=True,
+                                 capture_output=True, text=True).stdout.split()
+            samples.append(float(out[0]))
+        heavy = [h for h, loaded in zip(HEAVY, out[1:]) if loaded == "True"]
+        best = min(samples)
+        results[f"startup/{module}"] = {"case": "startup", "module": module, "items": 1,
+                                        "min": best, "median": statistics.median(samples),
+                                        "per_item": best, "loads": heavy}
+        log(f"import {module:14s} {best * 1e3:8.1f} ms  {' '.join(heavy) or '-'}")
+    return {"meta": _meta(repeat), "results": results}
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    # llista de (cas, mínim de referència, mínim actual, canvi relatiu, regressió)
+    rows = []
+    for key, now in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        change = now["min"] / before["min"] - 1 if before["min"] > 0 else 0.0
+        rows.append((key, before["min"], now["min"], change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de proves de propagació, càrrega, maniobres i dibuix")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="executa el banc i desa els resultats en JSON")
+    run.add_argument("--out", default="bench.json")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    run.add_argument("--repeat", type=int, default=REPEAT)
+    run.add_argument("--cases", nargs="+", choices=sorted(CASES))
+    run.add_argument("--render-max", type=int, default=RENDER_MAX)
+    run.add_argument("--conjunction-max", type=int, default=CONJUNCTION_MAX)
+    run.add_argument("--baseline", help="compara amb aquest fitxer en acabar")
+    run.add_argument("--threshold", type=float, default=THRESHOLD)
+    startup = commands.add_parser("startup", help="temps d'importació de cada mòdul")
+    startup.add_argument("--out", default="startup.json")
+    startup.add_argument("--modules", nargs="+", default=list(STARTUP_MODULES))
+    startup.add_argument("--repeat", type=int, default=REPEAT)
+    startup.add_argument("--baseline", help="compara amb aquest fitxer en acabar")
+    startup.add_argument("--threshold", type=float, default=THRESHOLD)
+    cmp = commands.add_parser("compare", help="compara dos fitxers de resultats")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command in ("run", "startup"):
+        if args.command == "run":
+            limits = {"render_build": args.render_max, "render_frame": args.render_max,
+                      "conjunctions": args.conjunction_max}
+            current = run_suite(args.sizes, args.repeat, args.cases, limits)
+        else:
+            current = measure_startup(args.modules, args.repeat)
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+        if args.baseline is None:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for key, before, now, change, regressed in rows:
+        flag = "REGRESSIÓ" if regressed else ""
+        print(f"{key:32s} {before * 1e3:10.3f} -> {now * 1e3:10.3f} ms  {change:+7.1%}  {flag}")
+    regressions = sum(r[4] for r in rows)
+    print(f"{regressions} regressions de {len(rows)} casos (llindar {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
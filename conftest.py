@@ -0,0 +1,2 @@
+# els mòduls són a l'arrel del repositori; aquest fitxer fa que pytest
+# l'afegeixi a sys.path per als tests de tests/
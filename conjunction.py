@@ -0,0 +1,233 @@
+import argparse
+import math
+import time
+import numpy as np
+from propagator import propagate
+from satellite import relative_position_to
+from space import satellite_elements, update_all_positions
+
+# Cribratge d'aproximacions (conjunctions) entre tots els satèl·lits d'un Space.
+#
+# 1. Prefiltre per closques: dos satèl·lits només es poden acostar a menys de
+#    `threshold` si les seves closques radials [perigeu, apogeu] estan a menys
+#    d'aquesta distància; els que no se solapen amb ningú es descarten.
+# 2. Es mostreja l'interval amb un pas `step` i a cada instant es reparteixen
+#    les posicions en una graella uniforme de cel·la threshold + marge, on el
+#    marge (velocitat màxima · step) garanteix que una aproximació entre dues
+#    mostres no s'escapa. Només es comparen satèl·lits de cel·les veïnes.
+# 3. Per a cada mínim local de distància mostrejat es refina el temps de màxima
+#    aproximació (TCA) amb una cerca de secció àuria vectoritzada. Una tirada
+#    de mostres sempre per sota del llindar compta com una sola aproximació.
+
+NEIGHBOURS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+KEY_SHIFT = 1 << 31
+GOLDEN = (math.sqrt(5) - 1) / 2
+REFINE_ITER = 40
+
+
+def max_speed(period, epsilon, a):
+    # velocitat al perigeu del model x = a(cosE - e), y = b sinE; les òrbites
+    # de transferència poden tenir epsilon < 0 (perigeu a x < 0)
+    epsilon = np.abs(epsilon)
+    return (2 * np.pi / period) * a * np.sqrt((1 + epsilon) / (1 - epsilon))
+
+
+def shell_filter(epsilon, a, threshold):
+    epsilon = np.abs(epsilon)
+    lo = a * (1 - epsilon) - threshold / 2
+    hi = a * (1 + epsilon) + threshold / 2
+    order = np.argsort(lo, kind="stable")
+    lo, hi = lo[order], hi[order]
+    if len(order) < 2:
+        return np.zeros(0, dtype=np.int64)
+    reach = np.maximum.accumulate(hi)
+    overlap = np.zeros(len(order), dtype=bool)
+    overlap[1:] |= reach[:-1] >= lo[1:]
+    overlap[:-1] |= lo[1:] <= hi[:-1]
+    return np.sort(order[overlap])
+
+
+def grid_pairs(x, y, cell):
+    # parelles (i < j) a distància < cell, comparant només cel·les veïnes
+    n = len(x)
+    ix = np.floor(x / cell).astype(np.int64)
+    iy = np.floor(y / cell).astype(np.int64)
+    key = ix * KEY_SHIFT + iy
+    order = np.argsort(key, kind="stable")
+    keys = key[order]
+    first, second = [], []
+    for dx, dy in NEIGHBOURS:
+        if dx == 0 and dy == 0:
+            start = np.arange(1, n + 1)
+            end = np.searchsorted(keys, keys, side="right")
+        else:
+            target = keys + dx * KEY_SHIFT + dy
+            start = np.searchsorted(keys, target, side="left")
+            end = np.searchsorted(keys, target, side="right")
+        counts = np.maximum(end - start, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        i = np.repeat(np.arange(n), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        j = np.repeat(start, counts) + offsets
+        first.append(order[i])
+        second.append(order[j])
+    if not first:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    i = np.concatenate(first)
+    j = np.concatenate(second)
+    close = np.hypot(x[i] - x[j], y[i] - y[j]) < cell
+    i, j = i[close], j[close]
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def _sampling(period, epsilon, a, threshold, step):
+    vmax = float(max_speed(period, epsilon, a).max()) if len(a) else 0.0
+    if step is None:
+        step = 4 * threshold / vmax if vmax > 0 else threshold
+    # la velocitat relativa és com a molt 2·vmax i la mostra més propera és a step/2
+    return step, threshold + vmax * step
+
+
+def _times(t0, t1, step):
+    times = np.arange(t0, t1, step)
+    return np.append(times, t1) if len(times) == 0 or times[-1] < t1 else times
+
+
+def _distance(elements, i, j, t):
+    period, epsilon, a, M0 = elements
+    xi, yi = propagate(period[i], epsilon[i], a[i], M0[i], t)
+    xj, yj = propagate(period[j], epsilon[j], a[j], M0[j], t)
+    return np.hypot(xi - xj, yi - yj)
+
+
+def _closest_approaches(elements, i, j, k, times, step, threshold):
+    if len(i) == 0:
+        return np.zeros(0), np.zeros(0), i, j
+    # només els mínims locals de cada tirada de mostres consecutives
+    n = len(elements[0])
+    pair = i * n + j
+    order = np.lexsort((k, pair))
+    i, j, k, pair = i[order], j[order], k[order], pair[order]
+    d = _distance(elements, i, j, times[k])
+    linked = (pair[1:] == pair[:-1]) & (k[1:] == k[:-1] + 1)
+    minimum = np.ones(len(i), dtype=bool)
+    minimum[1:] &= ~linked | (d[1:] <= d[:-1])
+    minimum[:-1] &= ~linked | (d[:-1] < d[1:])
+    # una tirada de mostres que no surt del llindar és una sola aproximació:
+    # entre veïns de la mateixa òrbita la distància és gairebé constant i el
+    # soroll faria un mínim de cada mostra. Se'n queda la mostra més propera.
+    under = d <= threshold
+    start = np.ones(len(i), dtype=bool)
+    start[1:] = ~(linked & under[1:] & under[:-1])
+    run = np.cumsum(start)
+    order = np.lexsort((d, run))
+    closest = np.zeros(len(i), dtype=bool)
+    first = np.ones(len(i), dtype=bool)
+    first[1:] = run[order][1:] != run[order][:-1]
+    closest[order[first]] = True
+    minimum = np.where(under, closest, minimum)
+    i, j, k = i[minimum], j[minimum], k[minimum]
+
+    lo = np.maximum(times[k] - step, times[0])
+    hi = np.minimum(times[k] + step, times[-1])
+    c = hi - GOLDEN * (hi - lo)
+    e = lo + GOLDEN * (hi - lo)
+    fc = _distance(elements, i, j, c)
+    fe = _distance(elements, i, j, e)
+    for _ in range(REFINE_ITER):
+        left = fc < fe
+        hi = np.where(left, e, hi)
+        lo = np.where(left, lo, c)
+        probe = np.where(left, hi - GOLDEN * (hi - lo), lo + GOLDEN * (hi - lo))
+        fp = _distance(elements, i, j, probe)
+        c, e = np.where(left, probe, e), np.where(left, c, probe)
+        fc, fe = np.where(left, fp, fe), np.where(left, fc, fp)
+    tca = (lo + hi) / 2
+    miss = _distance(elements, i, j, tca)
+    keep = miss <= threshold
+    tca, miss, i, j = tca[keep], miss[keep], i[keep], j[keep]
+
+    # dos mínims mostrejats poden convergir al mateix TCA
+    order = np.lexsort((tca, i * n + j))
+    tca, miss, i, j = tca[order], miss[order], i[order], j[order]
+    repeated = np.zeros(len(i), dtype=bool)
+    repeated[1:] = (i[1:] == i[:-1]) & (j[1:] == j[:-1]) & (tca[1:] - tca[:-1] < step / 2)
+    return tca[~repeated], miss[~repeated], i[~repeated], j[~repeated]
+
+
+def _results(space, rows, tca, miss, i, j):
+    table = space.satellite_table
+    order = np.argsort(tca, kind="stable")
+    return [(t, d, table.get_view(rows[a]), table.get_view(rows[b]))
+            for t, d, a, b in zip(tca[order].tolist(), miss[order].tolist(),
+                                  i[order].tolist(), j[order].tolist())]
+
+
+def screen_conjunctions(space, t0, t1, threshold, step=None, chunk=64):
+    # Llista d'aproximacions a menys de `threshold` km entre t0 i t1, com a
+    # tuples (tca, distància, sat1, sat2) ordenades per temps.
+    rows, period, epsilon, a, M0 = satellite_elements(space)
+    elements = (period, epsilon, a, M0)
+    step, cell = _sampling(period, epsilon, a, threshold, step)
+    times = _times(t0, t1, step)
+    candidates = shell_filter(epsilon, a, threshold)
+    sub = tuple(v[candidates] for v in elements)
+    found_i, found_j, found_k = [], [], []
+    for start in range(0, len(times), chunk):
+        block = times[start:start + chunk]
+        X, Y = propagate(*sub, block[:, None])
+        for offset in range(len(block)):
+            i, j = grid_pairs(X[offset], Y[offset], cell)
+            found_i.append(candidates[i])
+            found_j.append(candidates[j])
+            found_k.append(np.full(len(i), start + offset))
+    i = np.concatenate(found_i) if found_i else np.zeros(0, dtype=np.int64)
+    j = np.concatenate(found_j) if found_j else np.zeros(0, dtype=np.int64)
+    k = np.concatenate(found_k) if found_k else np.zeros(0, dtype=np.int64)
+    return _results(space, rows, *_closest_approaches(elements, i, j, k, times, step, threshold))
+
+
+def screen_conjunctions_brute(space, t0, t1, threshold, step=None):
+    # Versió de referència O(n²): a cada mostra es comparen totes les parelles
+    # amb relative_position_to. Fa servir el mateix mostreig i refinament.
+    rows, period, epsilon, a, M0 = satellite_elements(space)
+    elements = (period, epsilon, a, M0)
+    step, cell = _sampling(period, epsilon, a, threshold, step)
+    times = _times(t0, t1, step)
+    sats = list(space.satellites)
+    found = []
+    for k, t in enumerate(times.tolist()):
+        update_all_positions(space, t)
+        for p in range(len(sats)):
+            for q in range(p + 1, len(sats)):
+                dx, dy = relative_position_to(sats[p], sats[q])
+                if math.hypot(dx, dy) < cell:
+                    found.append((p, q, k))
+    found = np.array(found, dtype=np.int64).reshape(-1, 3)
+    return _results(space, rows, *_closest_approaches(elements, found[:, 0], found[:, 1],
+                                                      found[:, 2], times, step, threshold))
+
+
+if __name__ == "__main__":
+    from synthetic import synthetic_space
+
+    parser = argparse.ArgumentParser(description="Compara el cribratge per graella amb la força bruta")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 10000, 50000])
+    parser.add_argument("--brute-max", type=int, default=300)
+    parser.add_argument("--threshold", type=float, default=5.0)
+    parser.add_argument("--span", type=float, default=600.0)
+    args = parser.parse_args()
+    for n in args.sizes:
+        space = synthetic_space(n)
+        start = time.perf_counter()
+        events = screen_conjunctions(space, 0.0, args.span, args.threshold)
+        grid = time.perf_counter() - start
+        line = f"n={n}: graella {grid:.3f} s, {len(events)} aproximacions"
+        if n <= args.brute_max:
+            start = time.perf_counter()
+            brute = screen_conjunctions_brute(space, 0.0, args.span, args.threshold)
+            line += (f"; força bruta {time.perf_counter() - start:.3f} s, "
+                     f"{len(brute)} aproximacions")
+        print(line)
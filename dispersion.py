@@ -0,0 +1,125 @@
+import argparse
+import time
+import numpy as np
+from propagator import warm_start, kepler_E_batch
+from space import satellite_elements
+
+# Dispersió Monte Carlo. Per a cada satèl·lit es generen `samples` còpies amb
+# errors gaussians a epsilon, a (km) i M0 (rad) i es propaguen totes com un
+# sol lot vectorial. Per defecte el període de cada mostra segueix la tercera
+# llei de Kepler (T ∝ a^1.5), de manera que l'error en a es tradueix en una
+# deriva de fase que creix amb el temps.
+#
+# Per cada instant i satèl·lit es retornen la posició nominal, la mitjana i
+# la covariància (x, y) de les mostres i els percentils de la distància a la
+# posició nominal. Els percentils necessiten totes les mostres d'un
+# satèl·lit alhora, així que el que es trossegen són els satèl·lits: cada
+# bloc té com a molt `block` elements (mostres x satèl·lits, almenys un
+# satèl·lit). Newton arrenca per a cada mostra des de la solució nominal, que
+# per a dispersions petites és a una o dues iteracions.
+
+BLOCK = 1 << 20
+LEVELS = (50.0, 95.0, 99.0)
+EPSILON_MAX = 0.99
+
+
+class Dispersion:
+    __slots__ = ("times", "satellites", "levels", "nominal", "mean", "covariance", "percentiles")
+
+    def __init__(self, times, satellites, levels):
+        T, n = len(times), len(satellites)
+        self.times = times
+        self.satellites = satellites
+        self.levels = levels
+        self.nominal = np.empty((T, n, 2))        # km
+        self.mean = np.empty((T, n, 2))
+        self.covariance = np.empty((T, n, 2, 2))  # km²
+        self.percentiles = np.empty((T, n, len(levels)))   # distància a la nominal (km)
+
+
+def _per_satellite(value, n):
+    return np.broadcast_to(np.asarray(value, dtype=float), (n,))
+
+
+def disperse(space, times, sigma_epsilon=0.0, sigma_a=0.0, sigma_M0=0.0, samples=1000,
+             satellites=None, levels=LEVELS, kepler_period=True, seed=0, block=BLOCK):
+    # sigma_*: escalar o un valor per satèl·lit; satellites: vistes (per
+    # defecte tots els vius)
+    rows, period, epsilon, a, M0 = satellite_elements(space)
+    if satellites is not None:
+        pick = np.searchsorted(rows, [s._i for s in satellites])
+        rows, period, epsilon, a, M0 = (v[pick] for v in (rows, period, epsilon, a, M0))
+    names = [space.satellite_table.names[i] for i in rows.tolist()]
+    times = np.asarray(times, dtype=float).ravel()
+    n = len(rows)
+    sigmas = [_per_satellite(s, n) for s in (sigma_epsilon, sigma_a, sigma_M0)]
+    result = Dispersion(times, names, tuple(levels))
+    rng = np.random.default_rng(seed)
+    width = max(1, block // max(samples, 1))
+
+    for lo in range(0, n, width):
+        cols = slice(lo, min(lo + width, n))
+        # mostres (satèl·lits del bloc, samples): les reduccions són per files contigües
+        el = [v[cols, None] for v in (period, epsilon, a, M0)]
+        e = el[1] + sigmas[0][cols, None] * rng.standard_normal((cols.stop - lo, samples))
+        e = np.clip(e, 0.0, EPSILON_MAX)
+        A = el[2] + sigmas[1][cols, None] * rng.standard_normal(e.shape)
+        phase = el[3] + sigmas[2][cols, None] * rng.standard_normal(e.shape)
+        P = el[0] * (A / el[2]) ** 1.5 if kepler_period else np.broadcast_to(el[0], e.shape)
+        B = A * np.sqrt(1 - e**2)
+        motion = 2 * np.pi / P
+        ddof = max(samples - 1, 1)
+        for k, t in enumerate(times):
+            # la solució nominal és el punt de partida de Newton per a les
+            # mostres (com l'E del tic anterior a update_all_positions)
+            Mn = el[3] + (2 * np.pi / el[0]) * t
+            En = kepler_E_batch(Mn, el[1])
+            xn = el[2] * (np.cos(En) - el[1])
+            yn = el[2] * np.sqrt(1 - el[1]**2) * np.sin(En)
+            M = phase + motion * t
+            E = kepler_E_batch(M, e, E0=warm_start(M, e, En, Mn))
+            x = A * (np.cos(E) - e)
+            y = B * np.sin(E)
+            result.nominal[k, cols, 0] = xn[:, 0]
+            result.nominal[k, cols, 1] = yn[:, 0]
+            mx, my = x.mean(axis=1, keepdims=True), y.mean(axis=1, keepdims=True)
+            result.mean[k, cols, 0] = mx[:, 0]
+            result.mean[k, cols, 1] = my[:, 0]
+            dx, dy = x - mx, y - my
+            cxy = np.einsum("ij,ij->i", dx, dy) / ddof
+            result.covariance[k, cols, 0, 0] = np.einsum("ij,ij->i", dx, dx) / ddof
+            result.covariance[k, cols, 0, 1] = cxy
+            result.covariance[k, cols, 1, 0] = cxy
+            result.covariance[k, cols, 1, 1] = np.einsum("ij,ij->i", dy, dy) / ddof
+            # hypot és diverses vegades més lent que l'arrel de la suma de quadrats
+            distance = np.sqrt(np.square(x - xn) + np.square(y - yn))
+            result.percentiles[k, cols] = np.percentile(distance, levels, axis=1).T
+    return result
+
+
+if __name__ == "__main__":
+    from synthetic import synthetic_space
+
+    parser = argparse.ArgumentParser(description="Dispersió Monte Carlo de la constel·lació")
+    parser.add_argument("--satellites", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--span", type=float, default=86400.0)
+    parser.add_argument("--steps", type=int, default=24)
+    parser.add_argument("--sigma-epsilon", type=float, default=1e-4)
+    parser.add_argument("--sigma-a", type=float, default=0.1, help="km")
+    parser.add_argument("--sigma-M0", type=float, default=1e-4, help="rad")
+    parser.add_argument("--block", type=int, default=BLOCK)
+    args = parser.parse_args()
+
+    space = synthetic_space(args.satellites)
+    times = np.linspace(0, args.span, args.steps + 1)
+    start = time.perf_counter()
+    result = disperse(space, times, args.sigma_epsilon, args.sigma_a, args.sigma_M0,
+                      args.samples, block=args.block)
+    elapsed = time.perf_counter() - start
+    total = args.samples * args.satellites * len(times)
+    print(f"{args.samples} mostres x {args.satellites} satèl·lits x {len(times)} instants: "
+          f"{elapsed:.1f} s ({total / elapsed / 1e6:.1f} M posicions/s)")
+    for level, values in zip(result.levels, np.moveaxis(result.percentiles[-1], -1, 0)):
+        print(f"  p{level:g} de la distància a t = {times[-1]:.0f} s: mediana {np.median(values):.2f} km, "
+              f"màxim {values.max():.2f} km")
@@ -0,0 +1,132 @@
+import threading
+import time
+import numpy as np
+from space import update_all_positions
+from profiling import PROFILER
+
+# Motor de simulació en un fil propi. Avança el temps a `speed` segons simulats
+# per segon real, propaga l'espai `rate` vegades per segon i publica cada
+# resultat en un doble buffer: el fil escriu sempre al buffer de darrere i
+# l'intercanvia amb el de davant, i la interfície llegeix el de davant al seu
+# propi ritme sense esperar la propagació. NumPy allibera el GIL durant els
+# càlculs vectorials, de manera que el fil de Qt continua responent.
+#
+# Qualsevol canvi d'estructura de l'espai (carregar, afegir, maniobrar) s'ha
+# de fer amb `engine.lock` agafat.
+
+
+class Snapshot:
+    __slots__ = ("time", "x", "y", "count", "catalog", "names")
+
+    def __init__(self, capacity):
+        self.time = 0.0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.count = 0
+        self.catalog = 0         # versió del catàleg de noms
+        self.names = []          # noms de les files vives, en l'ordre de x i y
+
+
+class SimulationEngine:
+    def __init__(self, space, speed=1.0, rate=50.0):
+        self.space = space
+        self.speed = speed
+        self.rate = rate
+        self.time = 0.0
+        self.lock = threading.RLock()
+        self.steps = 0
+        self.catalog = 0
+        self._names = []
+        self._signature = None
+        self._source = None
+        self._swap_lock = threading.Lock()
+        self._buffers = [Snapshot(0), Snapshot(0)]
+        self._front = None
+        self._stop = threading.Event()
+        self._paused = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def pause(self):
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    def set_time(self, t):
+        with self.lock:
+            self.time = t
+            self.step()
+
+    def step(self):
+        # propaga a self.time i publica el resultat al buffer de darrere
+        with self.lock:
+            space = self.space
+            with PROFILER.stage("propagate"):
+                update_all_positions(space, self.time)
+            with PROFILER.stage("publish"):
+                sats = space.satellite_table
+                alive = sats.alive[:sats.n]
+                back = self._buffers[0] if self._front is self._buffers[1] else self._buffers[1]
+                count = int(np.count_nonzero(alive))
+                if len(back.x) < count:
+                    back.x = np.zeros(count)
+                    back.y = np.zeros(count)
+                np.compress(alive, sats.col("x"), out=back.x[:count])
+                np.compress(alive, sats.col("y"), out=back.y[:count])
+                # la llista de noms només es refà quan canvia l'estructura
+                # de la taula; mai es modifica un cop publicada. Es guarda la
+                # llista de la taula (no el seu id) perquè no es pugui reciclar
+                signature = (sats.n, sats.live)
+                if signature != self._signature or sats.names is not self._source:
+                    self._names = [sats.names[i] for i in sats.rows()]
+                    self._signature = signature
+                    self._source = sats.names
+                    self.catalog += 1
+            back.count = count
+            back.catalog = self.catalog
+            back.names = self._names
+            back.time = self.time
+            self.steps += 1
+        with self._swap_lock:
+            self._front = back
+
+    def latest(self, names=False):
+        # còpia del darrer estat publicat: (temps, x, y), i amb names=True
+        # també (versió del catàleg, noms) del mateix tic
+        with self._swap_lock:
+            front = self._front
+            if front is None:
+                return None
+            state = front.time, front.x[:front.count].copy(), front.y[:front.count].copy()
+            if names:
+                state += (front.catalog, front.names)
+            return state
+
+    def _run(self):
+        period = 1.0 / self.rate
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            elapsed, last = start - last, start
+            if not self._paused.is_set():
+                with self.lock:
+                    self.time += self.speed * elapsed
+                    self.step()
+            self._stop.wait(max(0.0, period - (time.perf_counter() - start)))
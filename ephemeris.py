@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import numpy as np
+from propagator import kepler_E_batch
+
+# Memòria cau d'efemèrides. Com que la forma d'una òrbita (epsilon, a, b) no
+# canvia amb el temps, la posició només depèn de l'anomalia mitjana M mòdul
+# 2π. Per a cada forma es tabula x(M), y(M) en trams de Chebyshev sobre un
+# període i després qualsevol satèl·lit d'aquesta òrbita, amb la seva fase,
+# es resol amb una avaluació de polinomi en lloc de l'equació de Kepler.
+#
+# La clau és la forma mateixa: si change_orbit reescriu epsilon o b la clau
+# canvia i la taula vella deixa de fer-se servir fins que l'LRU la descarta.
+# M0 no forma part de la clau perquè la fase s'aplica en el moment de la
+# consulta.
+
+TWO_PI = 2 * np.pi
+MAX_SEGMENTS = 1 << 16
+
+
+class EphemerisCache:
+    def __init__(self, max_bytes=64 * 2**20, tol=1e-3, degree=5):
+        # tol: error màxim admès en km; max_bytes: límit de coeficients en memòria
+        self.max_bytes = max_bytes
+        self.tol = tol
+        self.degree = degree
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        k = np.arange(degree + 1)
+        self.nodes = np.cos(np.pi * (k + 0.5) / (degree + 1))
+        self.basis = np.cos(np.outer(k, np.pi * (k + 0.5) / (degree + 1)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def invalidate(self, epsilon, a, b):
+        coeffs = self.entries.pop((float(epsilon), float(a), float(b)), None)
+        if coeffs is not None:
+            self.nbytes -= coeffs.nbytes
+
+    def table(self, epsilon, a, b):
+        key = (float(epsilon), float(a), float(b))
+        coeffs = self.entries.get(key)
+        if coeffs is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return coeffs
+        self.misses += 1
+        coeffs = self._build(*key)
+        self.entries[key] = coeffs
+        self.nbytes += coeffs.nbytes
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return coeffs
+
+    def lookup(self, epsilon, a, b, M):
+        return self._evaluate(self.table(epsilon, a, b), np.asarray(M, dtype=float))
+
+    def update_positions(self, space, time):
+        # equivalent a update_all_positions, agrupant els satèl·lits per òrbita
+        sats = space.satellite_table
+        orbits = space.orbit_table
+        m = orbits.n
+        rows = sats.col("orbit")
+        M = sats.col("M0") + ((TWO_PI / orbits.data["period"][:m]) * time)[rows]
+        x = sats.col("x")
+        y = sats.col("y")
+        order = np.argsort(rows, kind="stable")
+        unique, starts = np.unique(rows[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for row, start, end in zip(unique.tolist(), starts.tolist(), ends.tolist()):
+            idx = order[start:end]
+            coeffs = self.table(orbits.data["epsilon"][row], orbits.data["a"][row],
+                                orbits.data["b"][row])
+            x[idx], y[idx] = self._evaluate(coeffs, M[idx])
+        sats.col("M")[:] = M
+        sats.col("E")[:] = np.nan
+
+    def _exact(self, epsilon, a, b, M):
+        E = kepler_E_batch(M, epsilon)
+        return a * (np.cos(E) - epsilon), b * np.sin(E)
+
+    def _fit(self, epsilon, a, b, segments):
+        width = TWO_PI / segments
+        centers = (np.arange(segments) + 0.5) * width
+        M = centers[:, None] + 0.5 * width * self.nodes[None, :]
+        x, y = self._exact(epsilon, a, b, M)
+        values = np.stack([x, y], axis=1)
+        coeffs = values @ self.basis.T * (2.0 / (self.degree + 1))
+        coeffs[..., 0] *= 0.5
+        # (grau, coordenada, tram): cada pas de Clenshaw llegeix una fila contigua
+        return np.ascontiguousarray(coeffs.transpose(2, 1, 0))
+
+    def _build(self, epsilon, a, b):
+        # es dobla el nombre de trams fins que l'error entre nodes és < tol
+        segments = 4
+        while True:
+            coeffs = self._fit(epsilon, a, b, segments)
+            probe = (np.arange(segments * 2 * (self.degree + 1)) + 0.5) * (
+                TWO_PI / (segments * 2 * (self.degree + 1)))
+            x, y = self._evaluate(coeffs, probe)
+            xe, ye = self._exact(epsilon, a, b, probe)
+            error = max(np.max(np.abs(x - xe)), np.max(np.abs(y - ye)))
+            if error <= self.tol or segments >= MAX_SEGMENTS:
+                return coeffs
+            segments *= 2
+
+    def _evaluate(self, coeffs, M):
+        # Clenshaw vectoritzat sobre el tram de cada M
+        segments = coeffs.shape[2]
+        s = np.mod(M, TWO_PI) * (segments / TWO_PI)
+        seg = np.minimum(s.astype(np.int64), segments - 1)
+        u2 = 4 * (s - seg) - 2
+        b1 = np.zeros((2,) + u2.shape)
+        b2 = np.zeros_like(b1)
+        for j in range(self.degree, 0, -1):
+            b1, b2 = u2 * b1 - b2 + coeffs[j][:, seg], b1
+        out = 0.5 * u2 * b1 - b2 + coeffs[0][:, seg]
+        return out[0], out[1]
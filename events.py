@@ -0,0 +1,264 @@
+import argparse
+import math
+import time
+import numpy as np
+from conjunction import max_speed
+from propagator import propagate
+from space import satellite_elements
+
+# Detecció d'esdeveniments en una finestra de temps. Cada definició és una
+# funció g(t) per canal (un satèl·lit o una parella) que canvia de signe a
+# l'esdeveniment:
+#
+#   Proximity(pairs, distance)          g = |r1 - r2| - distance
+#   RadiusCrossing(radius, satellites)  g = |r| - radius
+#   SectorCrossing(center, half_width)  g = cos(half_width) - cos(θ - center(t))
+#
+# 1. Es propaguen una sola vegada, per blocs de temps, tots els satèl·lits que
+#    fan servir les definicions en una graella de pas `step` i s'avaluen tots
+#    els canals alhora; un canvi de signe entre dues mostres és un interval
+#    amb un esdeveniment.
+# 2. Tots els intervalls es refinen junts amb regula falsi (variant
+#    d'Illinois) fins a `tol` segons.
+#
+# Dues arrels a menys d'un pas de distància es poden perdre: `step` ha de ser
+# més curt que el temps mínim entre esdeveniments del mateix canal. Per
+# defecte cada definició té el seu: el període més curt dels satèl·lits que
+# fa servir / STEPS_PER_PERIOD, o menys si la definició en fixa un màxim
+# (Proximity: distance / (2·vmax), perquè una finestra de proximitat pot
+# durar molt menys que una òrbita). Les definicions amb el mateix pas es
+# propaguen juntes.
+
+STEPS_PER_PERIOD = 64
+EVENT_TOL = 1e-3         # s
+REFINE_ITER = 60
+CHUNK = 256
+
+
+class Proximity:
+    # parelles (sat1, sat2) a menys de `distance` km: "enter" / "exit"
+    arity = 2
+
+    def __init__(self, pairs, distance, name="proximity"):
+        self.pairs = list(pairs)
+        self.distance = distance
+        self.name = name
+
+    def satellites(self):
+        return self.pairs
+
+    def g(self, t, xs, ys):
+        return np.hypot(xs[0] - xs[1], ys[0] - ys[1]) - self.distance
+
+    def max_step(self, vmax):
+        # la distància entre dos satèl·lits canvia com a molt a 2·vmax
+        return self.distance / (2 * vmax)
+
+    def label(self, rising):
+        return "exit" if rising else "enter"
+
+
+class RadiusCrossing:
+    # |r| travessa `radius` km: "outward" / "inward"
+    arity = 1
+
+    def __init__(self, radius, satellites, name="radius"):
+        self.radius = radius
+        self.sats = list(satellites)
+        self.name = name
+
+    def satellites(self):
+        return [(s,) for s in self.sats]
+
+    def g(self, t, xs, ys):
+        return np.hypot(xs[0], ys[0]) - self.radius
+
+    def label(self, rising):
+        return "outward" if rising else "inward"
+
+
+class SectorCrossing:
+    # sector angular de semiamplada half_width (rad) al voltant de la direcció
+    # center + rate·t (rad, des de l'eix x); p. ex. l'ombra de la Terra amb
+    # center = direcció del Sol + π: "enter" / "exit"
+    arity = 1
+
+    def __init__(self, center, half_width, satellites, rate=0.0, name="sector"):
+        self.center = center
+        self.half_width = half_width
+        self.rate = rate
+        self.sats = list(satellites)
+        self.name = name
+
+    def satellites(self):
+        return [(s,) for s in self.sats]
+
+    def g(self, t, xs, ys):
+        c = self.center + self.rate * t
+        r = np.hypot(xs[0], ys[0])
+        return math.cos(self.half_width) - (xs[0] * np.cos(c) + ys[0] * np.sin(c)) / r
+
+    def label(self, rising):
+        return "exit" if rising else "enter"
+
+
+def _members(space, rows, definition):
+    # (K, aritat) posicions dins `rows` dels satèl·lits de cada canal
+    table = space.satellite_table
+    members = np.array([[s._i for s in channel] for channel in definition.satellites()],
+                       dtype=np.int64).reshape(-1, definition.arity)
+    for channel in definition.satellites():
+        for s in channel:
+            if s._table is not table or not table.alive[s._i]:
+                raise ValueError(f"{s.name!r} no és a l'espai")
+    return np.searchsorted(rows, members)
+
+
+def _step(definition, m, period, epsilon, a):
+    involved = np.unique(m)
+    step = float(period[involved].min()) / STEPS_PER_PERIOD
+    limit = getattr(definition, "max_step", None)
+    if limit is not None:
+        vmax = float(max_speed(period[involved], epsilon[involved], a[involved]).max())
+        if vmax > 0:
+            step = min(step, limit(vmax))
+    return step
+
+
+def _times(t0, t1, step):
+    n = max(1, math.ceil((t1 - t0) / step))
+    return np.linspace(t0, t1, n + 1)
+
+
+def _refine(g, lo, hi, glo, ghi, tol):
+    # regula falsi d'Illinois vectoritzada: g(idx, t) avalua els canals idx a t
+    idx = np.arange(len(lo))
+    a, b, fa, fb = lo.copy(), hi.copy(), glo.copy(), ghi.copy()
+    side = np.zeros(len(lo), dtype=np.int8)
+    active = np.arange(len(lo))
+    for _ in range(REFINE_ITER):
+        if len(active) == 0:
+            break
+        A, B, FA, FB = a[active], b[active], fa[active], fb[active]
+        C = (A * FB - B * FA) / (FB - FA)
+        C = np.where(np.isfinite(C) & (C > A) & (C < B), C, (A + B) / 2)
+        FC = g(idx[active], C)
+        left = (FC > 0) == (FB > 0)
+        S = side[active]
+        # l'arrel és a [A, C]: C passa a ser B; si B ja s'havia mogut, FA a la meitat
+        B, FB = np.where(left, C, B), np.where(left, FC, FB)
+        FA = np.where(left & (S == 1), FA / 2, FA)
+        A, FA = np.where(left, A, C), np.where(left, FA, FC)
+        FB = np.where(~left & (S == -1), FB / 2, FB)
+        a[active], b[active], fa[active], fb[active] = A, B, FA, FB
+        side[active] = np.where(left, 1, -1)
+        active = active[(B - A > tol) & (FC != 0)]
+    return np.where(fa == 0, a, np.where(fb == 0, b, (a + b) / 2))
+
+
+def find_events(space, t0, t1, definitions, step=None, tol=EVENT_TOL, chunk=CHUNK):
+    # Llista de (temps, definició, esdeveniment, satèl·lits) ordenada per temps.
+    rows, period, epsilon, a, M0 = satellite_elements(space)
+    definitions = list(definitions)
+    members = [_members(space, rows, d) for d in definitions]
+    if t1 <= t0:
+        return []
+    # definicions agrupades pel seu pas
+    groups = {}
+    for d, (definition, m) in enumerate(zip(definitions, members)):
+        if len(m):
+            own = step if step is not None else _step(definition, m, period, epsilon, a)
+            groups.setdefault(own, []).append(d)
+
+    brackets = [[] for _ in definitions]
+    for own, chosen in groups.items():
+        times = _times(t0, t1, own)
+        involved = np.unique(np.concatenate([members[d].ravel() for d in chosen]))
+        # posició de cada satèl·lit implicat dins la propagació per blocs
+        local = np.full(len(rows), -1, dtype=np.int64)
+        local[involved] = np.arange(len(involved))
+        sub = (period[involved], epsilon[involved], a[involved], M0[involved])
+        for start in range(0, len(times) - 1, chunk):
+            # cada bloc comparteix la primera mostra amb l'últim del bloc anterior
+            block = times[start:start + chunk + 1]
+            X, Y = propagate(*sub, block[:, None])
+            for d in chosen:
+                definition, cols = definitions[d], local[members[d]]
+                G = definition.g(block[:, None], [X[:, cols[:, s]] for s in range(definition.arity)],
+                                 [Y[:, cols[:, s]] for s in range(definition.arity)])
+                positive = G > 0
+                k, ch = np.nonzero(positive[:-1] != positive[1:])
+                if len(k):
+                    brackets[d].append((ch, block[k], block[k + 1], G[k, ch], G[k + 1, ch]))
+
+    events = []
+    for definition, m, found in zip(definitions, members, brackets):
+        if not found:
+            continue
+        ch, lo, hi, glo, ghi = (np.concatenate(v) for v in zip(*found))
+
+        def g(idx, t, definition=definition, m=m, ch=ch):
+            chosen = m[ch[idx]]
+            xs, ys = [], []
+            for s in range(definition.arity):
+                j = chosen[:, s]
+                x, y = propagate(period[j], epsilon[j], a[j], M0[j], t)
+                xs.append(x)
+                ys.append(y)
+            return definition.g(t, xs, ys)
+
+        roots = _refine(g, lo, hi, glo, ghi, tol)
+        channels = definition.satellites()
+        events.extend((t, definition, definition.label(rising), channels[c])
+                      for t, rising, c in zip(roots.tolist(), (ghi > 0).tolist(), ch.tolist()))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def find_events_sampled(space, t0, t1, definitions, step):
+    # referència per força bruta: mostreig fi sense refinament
+    rows, period, epsilon, a, M0 = satellite_elements(space)
+    events = []
+    times = _times(t0, t1, step)
+    for definition in definitions:
+        m = _members(space, rows, definition)
+        if len(m) == 0:
+            continue
+        xs, ys = [], []
+        for s in range(definition.arity):
+            j = m[:, s]
+            x, y = propagate(period[j], epsilon[j], a[j], M0[j], times[:, None])
+            xs.append(x)
+            ys.append(y)
+        positive = definition.g(times[:, None], xs, ys) > 0
+        k, ch = np.nonzero(positive[:-1] != positive[1:])
+        channels = definition.satellites()
+        events.extend(((times[i] + times[i + 1]) / 2, definition, definition.label(bool(positive[i + 1, c])),
+                       channels[c]) for i, c in zip(k.tolist(), ch.tolist()))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+if __name__ == "__main__":
+    from synthetic import synthetic_space, EARTH_R
+
+    parser = argparse.ArgumentParser(description="Compara la detecció d'esdeveniments amb el mostreig fi")
+    parser.add_argument("--satellites", type=int, default=2000)
+    parser.add_argument("--span", type=float, default=86400.0)
+    parser.add_argument("--fine-step", type=float, default=1.0)
+    args = parser.parse_args()
+    space = synthetic_space(args.satellites)
+    sats = list(space.satellites)
+    rng = np.random.default_rng(2)
+    pairs = [(sats[i], sats[j]) for i, j in rng.integers(0, len(sats), (200, 2)) if i != j]
+    definitions = [RadiusCrossing(EARTH_R + 2000, sats),
+                   SectorCrossing(math.pi, math.radians(8.5), sats, rate=2 * math.pi / 31557600),
+                   Proximity(pairs, 20000.0)]
+    start = time.perf_counter()
+    events = find_events(space, 0.0, args.span, definitions)
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    sampled = find_events_sampled(space, 0.0, args.span, definitions, args.fine_step)
+    slow = time.perf_counter() - start
+    print(f"graella + refinament: {len(events)} esdeveniments en {fast:.2f} s; "
+          f"mostreig a {args.fine_step} s: {len(sampled)} en {slow:.2f} s")
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import struct
+import threading
+import time
+import numpy as np
+
+# Canal local de posicions en directe. Un FeedServer llegeix el darrer estat
+# publicat per un SimulationEngine `rate` vegades per segon i l'envia per TCP o
+# per un socket Unix a cada client subscrit.
+#
+# Trames (little-endian): capçalera FRAME + dades
+#   CATALOG: noms dels satèl·lits subscrits, UTF-8 separats per "\n"; fixa
+#            l'ordre de les posicions de les trames següents
+#   KEY:     x i y quantitzades (round(x / quantum)) com a int32
+#   DELTA:   diferència en int16 respecte de la darrera trama enviada a aquest
+#            client; si algun valor no hi cap s'envia una KEY
+#
+# Client -> servidor: línies JSON, {"subscribe": ["SAT1", ...]} o
+# {"subscribe": null} per a tots.
+#
+# Contrapressió: cada client només guarda la darrera trama pendent. Si un
+# client va lent es salta tics (el delta és sempre respecte del que ha rebut),
+# i ni el motor ni la resta de clients l'esperen.
+
+MAGIC = b"ORBF"
+VERSION = 1
+FRAME = struct.Struct("<4sBBIddII")     # màgic, versió, tipus, seqüència, temps, quantum, nombre, bytes
+CATALOG, KEY, DELTA = 0, 1, 2
+QUANTUM = 0.01           # km
+KEY_INTERVAL = 100       # trames entre KEY forçades
+RATE = 10.0              # Hz
+
+
+def _frame(kind, seq, t, quantum, count, payload):
+    return FRAME.pack(MAGIC, VERSION, kind, seq & 0xFFFFFFFF, t, quantum, count, len(payload)) + payload
+
+
+class _Client:
+    __slots__ = ("writer", "select", "names", "last", "since_key", "pending", "wake", "catalog")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.select = None       # índexs dins el catàleg de l'espai (None = tots)
+        self.names = None        # noms subscrits (None = tots)
+        self.last = None         # darrera posició quantitzada enviada (2, k)
+        self.since_key = 0
+        self.pending = None      # (seq, temps, q) del darrer tic no enviat
+        self.wake = asyncio.Event()
+        self.catalog = None      # versió del catàleg enviada
+
+
+class FeedServer:
+    def __init__(self, engine, rate=RATE, quantum=QUANTUM):
+        self.engine = engine
+        self.rate = rate
+        self.quantum = quantum
+        self.clients = set()
+        self.seq = 0
+        self.current = None      # (seq, temps, q) del darrer tic publicat
+        self.names = []
+        self.index = {}
+        self.version = 0
+        self._server = None
+        self._publisher = None
+        self._loop = None
+        self._thread = None
+
+    # --- costat del motor ---
+
+    def _catalog(self, version, names):
+        # noms publicats pel motor amb la mateixa instantània que les posicions
+        if version == self.version:
+            return
+        self.names = names
+        self.index = {name: k for k, name in reversed(list(enumerate(names)))}
+        self.version = version
+        for client in self.clients:
+            self._resolve(client)
+
+    def _resolve(self, client):
+        if client.names is None:
+            client.select = None
+        else:
+            client.select = np.array([self.index[n] for n in client.names if n in self.index],
+                                     dtype=np.int64)
+        client.last = None
+
+    async def _publish(self):
+        period = 1.0 / self.rate
+        last_time = None
+        while True:
+            start = time.perf_counter()
+            snapshot = self.engine.latest(names=True)
+            if snapshot is not None and snapshot[0] != last_time:
+                t, x, y, version, names = snapshot
+                last_time = t
+                if len(names) != len(x):
+                    print(f"ERROR: catàleg de {len(names)} noms per a {len(x)} posicions a t = {t}")
+                    await asyncio.sleep(period)
+                    continue
+                self._catalog(version, names)
+                q = np.empty((2, len(x)), dtype=np.int64)
+                np.rint(x / self.quantum, out=x)
+                np.rint(y / self.quantum, out=y)
+                q[0], q[1] = x, y
+                self.seq += 1
+                self.current = (self.seq, t, q)
+                for client in self.clients:
+                    client.pending = self.current
+                    client.wake.set()
+            await asyncio.sleep(max(0.0, period - (time.perf_counter() - start)))
+
+    # --- costat dels clients ---
+
+    def _encode(self, client, seq, t, q):
+        frames = []
+        if client.catalog != self.version:
+            names = self.names if client.select is None else [self.names[k] for k in client.select.tolist()]
+            frames.append(_frame(CATALOG, seq, t, self.quantum, len(names),
+                                 "\n".join(names).encode("utf-8")))
+            client.catalog = self.version
+            client.last = None
+        sub = q if client.select is None else q[:, client.select]
+        count = sub.shape[1]
+        if client.last is not None and client.since_key < KEY_INTERVAL:
+            delta = sub - client.last
+            if count == 0 or (delta.min() >= -32768 and delta.max() <= 32767):
+                frames.append(_frame(DELTA, seq, t, self.quantum, count,
+                                     delta.astype("<i2").tobytes()))
+                client.since_key += 1
+                client.last = sub
+                return b"".join(frames)
+        frames.append(_frame(KEY, seq, t, self.quantum, count, sub.astype("<i4").tobytes()))
+        client.since_key = 0
+        client.last = sub
+        return b"".join(frames)
+
+    async def _send(self, client):
+        # un error en un client el desconnecta sense afectar la resta
+        try:
+            while True:
+                await client.wake.wait()
+                client.wake.clear()
+                seq, t, q = client.pending
+                client.writer.write(self._encode(client, seq, t, q))
+                await client.writer.drain()
+        except ConnectionError:
+            pass
+        except Exception as error:
+            print(f"ERROR enviant al client: {error!r}")
+        finally:
+            self.clients.discard(client)
+            client.writer.close()
+
+    async def _listen(self, client, reader):
+        async for line in reader:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            # només {"subscribe": [noms] | null}; la resta s'ignora
+            if not isinstance(request, dict) or "subscribe" not in request:
+                continue
+            names = request["subscribe"]
+            if names is not None and not (isinstance(names, list)
+                                          and all(isinstance(n, str) for n in names)):
+                continue
+            client.names = names
+            self._resolve(client)
+            client.catalog = None
+            # el nou subscriptor rep l'últim tic sense esperar el següent
+            if self.current is not None:
+                client.pending = self.current
+                client.wake.set()
+
+    async def _handle(self, reader, writer):
+        client = _Client(writer)
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self._send(client))
+        try:
+            await self._listen(client, reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        # retorna l'adreça on escolta: (host, port) o el camí del socket Unix
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+            address = path
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            address = self._server.sockets[0].getsockname()[:2]
+        self._publisher = asyncio.ensure_future(self._publish())
+        return address
+
+    async def close(self):
+        if self._publisher is not None:
+            self._publisher.cancel()
+        if self._server is not None:
+            self._server.close()
+            for client in list(self.clients):
+                client.writer.close()
+            await self._server.wait_closed()
+
+    def start_in_thread(self, host="127.0.0.1", port=0, path=None):
+        # bucle asyncio en un fil propi (p. ex. al costat de la interfície Qt)
+        ready = threading.Event()
+        result = {}
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            result["address"] = self._loop.run_until_complete(self.start(host, port, path))
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="feed", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return result["address"]
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+
+class FeedDecoder:
+    # Estat del costat client: decode(capçalera, dades) aplica una trama i
+    # retorna (seqüència, temps, x, y) per a les de posicions o None per al catàleg.
+    def __init__(self):
+        self.names = []
+        self.q = None
+
+    def decode(self, header, payload):
+        magic, version, kind, seq, t, quantum, count, _ = header
+        if kind == CATALOG:
+            self.names = payload.decode("utf-8").split("\n") if count else []
+            self.q = None
+            return None
+        if kind == KEY:
+            self.q = np.frombuffer(payload, dtype="<i4").reshape(2, count).astype(np.int64)
+        elif self.q is None:
+            raise ValueError("DELTA sense KEY prèvia")
+        else:
+            self.q = self.q + np.frombuffer(payload, dtype="<i2").reshape(2, count)
+        return seq, t, self.q[0] * quantum, self.q[1] * quantum
+
+
+async def read_frame(reader):
+    # (capçalera desempaquetada, dades) de la trama següent
+    header = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if header[0] != MAGIC or header[1] != VERSION:
+        raise ValueError("trama no vàlida")
+    return header, await reader.readexactly(header[7])
+
+
+async def subscribe(host="127.0.0.1", port=None, path=None, names=None):
+    # Generador asíncron de (temps, noms, x, y) per als satèl·lits `names`
+    # (tots si és None).
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({"subscribe": names}) + "\n").encode())
+    await writer.drain()
+    decoder = FeedDecoder()
+    try:
+        while True:
+            decoded = decoder.decode(*await read_frame(reader))
+            if decoded is not None:
+                _, t, x, y = decoded
+                yield t, decoder.names, x, y
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    from engine import SimulationEngine
+    from space import Space, load_orbits, load_satellites
+
+    parser = argparse.ArgumentParser(description="Servidor de posicions en directe")
+    parser.add_argument("--orbits")
+    parser.add_argument("--satellites")
+    parser.add_argument("--synthetic", type=int, default=100000,
+                        help="satèl·lits sintètics si no es donen fitxers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", help="camí d'un socket Unix en lloc de TCP")
+    parser.add_argument("--rate", type=float, default=RATE)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--check", type=float, default=0.0,
+                        help="connecta-hi un client durant aquests segons i informa del ritme")
+    args = parser.parse_args()
+
+    if args.orbits and args.satellites:
+        space = Space()
+        load_orbits(space, args.orbits)
+        load_satellites(space, args.satellites)
+    else:
+        from synthetic import synthetic_space
+        space = synthetic_space(args.synthetic)
+    engine = SimulationEngine(space, speed=args.speed)
+    engine.set_time(0.0)
+    engine.start()
+    server = FeedServer(engine, rate=args.rate)
+    address = server.start_in_thread(args.host, args.port, args.unix)
+    print(f"escoltant a {address}, {len(space.satellites)} satèl·lits a {args.rate} Hz")
+
+    async def check(seconds):
+        frames, received, start = 0, 0, time.perf_counter()
+        port = None if args.unix else address[1]
+        async for t, names, x, y in subscribe(args.host, port, args.unix):
+            frames += 1
+            received += len(x)
+            if time.perf_counter() - start >= seconds:
+                break
+        elapsed = time.perf_counter() - start
+        print(f"{frames / elapsed:.1f} trames/s, {received / elapsed:,.0f} posicions/s")
+
+    try:
+        if args.check > 0:
+            asyncio.run(check(args.check))
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop_thread()
+        engine.stop()
@@ -1,35 +1,22 @@
-from space import (load_orbits, load_satellites,save_orbits, save_satellites,update_all_positions, Space, get_orbit)
+from space import (load_orbits, load_satellites,save_orbits, save_satellites,update_all_positions, Space, get_orbit, get_satellite)
 from orbit import Orbit
-from satellite import Satellite, change_orbit
-from PySide6.QtWidgets import (QApplication, QSlider, QComboBox, QMainWindow, QWidget, QFrame, QTabWidget,QVBoxLayout, QHBoxLayout, QGridLayout, QLabel,QPushButton, QFileDialog, QMessageBox,QGroupBox, QFormLayout, QLineEdit)
+from ephemeris import EphemerisCache
+from maneuver import maneuver_cost
+from render import SpaceRenderer
+from engine import SimulationEngine
+from profiling import PROFILER
+from PySide6.QtWidgets import (QApplication, QSlider, QComboBox, QMainWindow, QWidget, QFrame, QTabWidget,QVBoxLayout, QHBoxLayout, QGridLayout, QLabel,QPushButton, QFileDialog, QMessageBox,QGroupBox, QFormLayout, QLineEdit, QCheckBox)
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from PySide6.QtCore import Qt, QTimer, QPropertyAnimation
+from matplotlib.figure import Figure
+from PySide6.QtCore import Qt, QTimer, QPropertyAnimation, Signal
 import math
-
-def plot(space, ax):
-    # Dibuixa la Terra
-    terra = patches.Circle((0, 0), 6371, color='lightblue', label='Terra')
-    ax.add_patch(terra)
-    # Dibuixa les òrbites
-    for orbit in space.orbits:
-        x0 = -orbit.a * orbit.epsilon
-        ellipse = patches.Ellipse((x0, 0), 2*orbit.a, 2*orbit.b,fill=False, linestyle='--', label=orbit.name)
-        ax.add_patch(ellipse)
-    # Dibuixa els satèl·lits
-    for sat in space.satellites:
-        x, y = sat.orbit.x, sat.orbit.y
-        ax.plot(x, y, 'ro')
-        ax.text(x+300, y+300, sat.name, fontsize=8)
-    ax.set_aspect('equal')
-    ax.set_xlabel("X (km)")
-    ax.set_ylabel("Y (km)")
-    ax.set_title("Òrbites i satèl·lits al voltant de la Terra")
-    ax.legend(loc='upper right')
-    ax.grid(True)
+import time
+import numpy as np
 
 class OrbitViewer(QWidget):
+    # s'emet després de moure's per la línia de temps (l'estructura pot haver canviat)
+    seeked = Signal(float)
+
     def __init__(self):
         super().__init__()
 
@@ -39,8 +26,15 @@ class OrbitViewer(QWidget):
         center_layout    = QVBoxLayout()
         right_layout     = QVBoxLayout()
 
-        self.figure, self.ax = plt.subplots(figsize=(10, 6))
+        # Figure directa en lloc de pyplot: no cal carregar-ne el gestor de finestres
+        self.figure = Figure(figsize=(10, 6))
         self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.add_subplot()
+        # blit=True: artistes persistents i només es repinta la capa mòbil;
+        # blit=False: es redibuixa tot a cada fotograma com abans
+        self.blit = True
+        self.renderer = SpaceRenderer(self.ax)
+        self.frame_time = None
 
         #Timer
         timer_frame = QFrame(self)
@@ -53,6 +47,38 @@ class OrbitViewer(QWidget):
         self.time_label.setAlignment(Qt.AlignCenter)
         self.time_label.setStyleSheet("font: bold 14px; color: #fff;")
         tf_layout.addWidget(self.time_label)
+        self.fps_label = QLabel("", self)
+        self.fps_label.setAlignment(Qt.AlignCenter)
+        self.fps_label.setStyleSheet("font: 11px; color: #aaa;")
+        tf_layout.addWidget(self.fps_label)
+        # barra de desplaçament: de l'inici fins al temps més llunyà assolit
+        self.scrub_slider = QSlider(Qt.Horizontal, self)
+        self.scrub_slider.setRange(0, 0)
+        self.scrub_slider.sliderMoved.connect(self._on_scrub)
+        tf_layout.addWidget(self.scrub_slider)
+        self.horizon = 0.0
+        # superposició de perfil: latències per etapa (PROFILER)
+        profile_row = QHBoxLayout()
+        self.profile_check = QCheckBox("Perfil", self)
+        self.profile_check.setStyleSheet("color: #aaa;")
+        self.profile_check.setChecked(PROFILER.enabled)
+        self.profile_check.toggled.connect(self._on_profile_toggled)
+        profile_row.addWidget(self.profile_check)
+        self.profile_export_btn = QPushButton("Exportar", self)
+        self.profile_export_btn.clicked.connect(self._export_profile)
+        profile_row.addWidget(self.profile_export_btn)
+        tf_layout.addLayout(profile_row)
+        # propagació numèrica amb J2 i fregament en lloc de Kepler
+        self.numerical_check = QCheckBox("Numèric (J2 + fregament)", self)
+        self.numerical_check.setStyleSheet("color: #aaa;")
+        self.numerical_check.toggled.connect(self._on_numerical_toggled)
+        tf_layout.addWidget(self.numerical_check)
+        self.profile_label = QLabel("", self)
+        self.profile_label.setStyleSheet("font: 10px monospace; color: #8f8;")
+        self.profile_label.setVisible(PROFILER.enabled)
+        tf_layout.addWidget(self.profile_label)
+        self.profile_interval = 0.5
+        self.profile_shown = 0.0
 
         #Accelerador
         acc_frame = QFrame(self)
@@ -66,7 +92,7 @@ class OrbitViewer(QWidget):
         self.speed_label.setStyleSheet("font: 13px; color: #ddd;")
         af_layout.addWidget(self.speed_label)
         self.speed_slider = QSlider(Qt.Horizontal, self)
-        self.speed_slider.setRange(0, 3)
+        self.speed_slider.setRange(0, 12)
         self.speed_slider.setValue(0)
         self.speed_slider.setTickPosition(QSlider.TicksBelow)
         self.speed_slider.setTickInterval(1)
@@ -84,6 +110,10 @@ class OrbitViewer(QWidget):
         layout.addLayout(center_layout,    1)
         layout.addLayout(right_layout,     0)
 
+        # el temps l'avança el SimulationEngine en un altre fil; aquest
+        # temporitzador només agafa el darrer estat publicat i el dibuixa
+        self.engine = None
+        self.frame_interval = 33
         self.timer = QTimer(self)
         self.timer.timeout.connect(self._update_time)
 
@@ -93,23 +123,139 @@ class OrbitViewer(QWidget):
         anim.setEndValue(1.0)
         anim.start()
 
+    def set_space(self, space):
+        self.space = space
+        self.engine = SimulationEngine(space, speed=self.speed)
+        # la línia de temps (timeline.py) es crea amb el primer esdeveniment o
+        # desplaçament; fins llavors l'estat de l'espai és el seu origen
+        self.timeline = None
+        self.timeline_start = 0.0
+
+    def _timeline(self):
+        if self.timeline is None:
+            from timeline import Timeline
+            self.timeline = Timeline(self.space, self.timeline_start)
+        return self.timeline
+
+    def record(self, event):
+        # aplica l'esdeveniment a l'espai i el desa a la línia de temps
+        return self._timeline().record(self.space, event)
+
     def _on_speed_change(self, val: int):
         self.speed = 2 ** val
         self.speed_label.setText(f"x{self.speed}")
+        if self.engine is not None:
+            self.engine.speed = self.speed
+
+    def start(self, t=0):
+        self.engine.set_time(t)
+        self.engine.start()
+        self.timer.start(self.frame_interval)
 
     def refresh(self, space, t=None):
-        if t is None:
-            t = self.time
-        update_all_positions(space, t)
-        self.ax.clear()
-        plot(space, self.ax)
-        self.canvas.draw()
+        if self.engine is not None:
+            if t is None:
+                t = self.engine.time
+            with self.engine.lock:
+                self.engine.set_time(t)
+                self._draw(space)
+        else:
+            with PROFILER.stage("propagate"):
+                update_all_positions(space, self.time if t is None else t)
+            self._draw(space)
+
+    def _draw(self, space, xy=None):
+        start = time.perf_counter()
+        with PROFILER.stage("frame"):
+            if self.blit:
+                self.renderer.draw(space, xy)
+            else:
+                self.renderer.invalidate()
+                self.ax.clear()
+                from plotting import plot
+                with PROFILER.stage("plot"):
+                    plot(space, self.ax)
+                with PROFILER.stage("canvas_draw"):
+                    self.canvas.draw()
+        elapsed = time.perf_counter() - start
+        if self.frame_time is None:
+            self.frame_time = elapsed
+        else:
+            self.frame_time = 0.9 * self.frame_time + 0.1 * elapsed
+        self.fps_label.setText(f"{1.0 / max(self.frame_time, 1e-6):.0f} FPS")
+        if PROFILER.enabled and start - self.profile_shown >= self.profile_interval:
+            self.profile_shown = start
+            self.profile_label.setText(PROFILER.report())
+
+    def _on_profile_toggled(self, checked):
+        PROFILER.enabled = checked
+        if checked:
+            PROFILER.reset()
+        self.profile_label.setVisible(checked)
+
+    def _on_numerical_toggled(self, checked):
+        if self.engine is None:
+            return
+        with self.engine.lock:
+            if checked:
+                from numerical import NumericalPropagator, J2, Drag
+                self.space.propagator = NumericalPropagator([J2(), Drag()])
+            else:
+                self.space.propagator = None
+            self.engine.step()
+
+    def _export_profile(self):
+        fname, _ = QFileDialog.getSaveFileName(self, "Exportar perfil", "", "JSON (*.json);;CSV (*.csv)")
+        if fname:
+            PROFILER.export(fname)
+
+    def _set_horizon(self, t):
+        if self.timeline is None:
+            start, end = self.timeline_start, t
+        else:
+            start, end = self.timeline.start, self.timeline.end
+        self.horizon = max(self.horizon, end, t)
+        self.scrub_slider.setRange(int(start), int(math.ceil(self.horizon)))
+        if not self.scrub_slider.isSliderDown():
+            self.scrub_slider.setValue(int(t))
+
+    def _on_scrub(self, value):
+        t = float(value)
+        with self.engine.lock:
+            self._timeline().seek(self.space, t)
+            self.engine.set_time(t)
+        self.time = t
+        self.time_label.setText(f"Temps: {t:.0f} s")
+        self._draw(self.space)
+        self.seeked.emit(t)
+
+    def reset_timeline(self, t=0.0):
+        # l'estat actual de l'espai passa a ser l'origen de la línia de temps
+        with self.engine.lock:
+            self.timeline_start = t
+            if self.timeline is not None:
+                self.timeline.reset(self.space, t)
+        self.horizon = t
+        self._set_horizon(t)
 
     def _update_time(self):
-        self.time += self.speed
-        self.time_label.setText(f"Temps: {self.time} s")
-        if hasattr(self, 'space'):
-            self.refresh(self.space, self.time)
+        snapshot = self.engine.latest() if self.engine is not None else None
+        if snapshot is None:
+            return
+        t, x, y = snapshot
+        if self.timeline is not None and self.timeline.due(t):
+            # després de tornar enrere, els esdeveniments ja registrats es
+            # tornen a aplicar quan el temps hi arriba
+            with self.engine.lock:
+                self.timeline.seek(self.space, self.engine.time)
+                self.engine.step()
+            self.seeked.emit(t)
+            snapshot = self.engine.latest()
+            t, x, y = snapshot
+        self.time = t
+        self.time_label.setText(f"Temps: {t:.0f} s")
+        self._set_horizon(t)
+        self._draw(self.space, np.column_stack([x, y]))
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -118,6 +264,7 @@ class MainWindow(QMainWindow):
         self.resize(1200, 800)
 
         self.space = Space()
+        self.space.ephemeris = EphemerisCache()
 
         tabs = QTabWidget()
         self.setCentralWidget(tabs)
@@ -204,7 +351,8 @@ class MainWindow(QMainWindow):
         tabs.addTab(cfg_tab, "Configuració")
 
         self.viewer = OrbitViewer()
-        self.viewer.space = self.space
+        self.viewer.set_space(self.space)
+        self.engine = self.viewer.engine
         tabs.addTab(self.viewer, "Visualització")
 
         self.btn_load_data.clicked.connect(self._load_both)
@@ -218,6 +366,7 @@ class MainWindow(QMainWindow):
         for w in (self.co_period_edit, self.co_eps_edit, self.co_a_edit):
             w.textChanged.connect(self._update_dv)
         self.co_change_btn.clicked.connect(self._change_orbit)
+        self.viewer.seeked.connect(lambda t: self._refresh_selectors())
 
         self._refresh_selectors()
         self.viewer.refresh(self.space)
@@ -229,14 +378,20 @@ class MainWindow(QMainWindow):
         sat_file, _ = QFileDialog.getOpenFileName(self, "Selecciona fitxer de satèl·lits", "", "Text Files (*.txt);;All Files (*)")
         if not sat_file:
             return
-        load_orbits(self.space, orbit_file)
-        load_satellites(self.space, sat_file)
-        update_all_positions(self.space, 0)
-        self._refresh_selectors()
-        self.viewer.refresh(self.space)
-        self.viewer.time = 0
+        with self.engine.lock:
+            load_orbits(self.space, orbit_file)
+            load_satellites(self.space, sat_file)
+            update_all_positions(self.space, 0)
+            self._refresh_selectors()
+            self.viewer.time = 0
+            self.viewer.reset_timeline(0.0)
+            self.viewer.refresh(self.space, 0)
         self.viewer.time_label.setText("Temps: 0 s")
-        self.viewer.timer.start(1000)
+        self.viewer.start(0)
+
+    def closeEvent(self, event):
+        self.engine.stop()
+        super().closeEvent(event)
 
     def _save_orbits(self):
         fname, _ = QFileDialog.getSaveFileName(self, "Desar òrbites", "", "Text Files (*.txt);;All Files (*)")
@@ -259,8 +414,11 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Dades d'òrbita no vàlides.\n{e}")
             return
-        self.space.orbits.append(orbit)
-        self.viewer.refresh(self.space)
+        from timeline import AddOrbit
+        with self.engine.lock:
+            self.viewer.record(AddOrbit(self.engine.time, orbit.name, orbit.period,
+                                        orbit.epsilon, orbit.a))
+            self.viewer.refresh(self.space)
         self._refresh_selectors()
         QMessageBox.information(self, "✔", f"Òrbita «{orbit.name}» afegida.")
 
@@ -272,20 +430,21 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", f"Òrbita «{orbitname}» no trobada.")
             return
         try:
-            sat = Satellite(name, orbit,
-                            float(self.sat_mass_edit.text()),
-                            float(self.sat_fuel_edit.text()))
+            mass = float(self.sat_mass_edit.text())
+            fuel = float(self.sat_fuel_edit.text())
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Dades de satèl·lit no vàlides.\n{e}")
             return
-        self.space.satellites.append(sat)
-        self.viewer.refresh(self.space)
+        from timeline import AddSatellite
+        with self.engine.lock:
+            self.viewer.record(AddSatellite(self.engine.time, name, orbit.name, mass, fuel))
+            self.viewer.refresh(self.space)
         self._refresh_selectors()
-        QMessageBox.information(self, "✔", f"Satèl·lit «{sat.name}» afegit.")
+        QMessageBox.information(self, "✔", f"Satèl·lit «{name}» afegit.")
 
     def _change_orbit(self):
         sat_name = self.co_sat_combo.currentText()
-        sat = next((s for s in self.space.satellites if s.name == sat_name), None)
+        sat = get_satellite(self.space, sat_name)
         if not sat:
             QMessageBox.warning(self, "Error", "Satèl·lit no vàlid.")
             return
@@ -298,34 +457,32 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Valors numèrics invàlids.")
             return
 
-        # perigeu no pot ser interior a la Terra ni més baix que r_now
-        EARTH_R = 6371.0
-        x0, y0  = sat.orbit.x, sat.orbit.y
-        r_now   = math.hypot(x0, y0)
-        if a * (1 - epsilon) < max(r_now, EARTH_R):
+        # la posició i el temps han de ser coherents amb el fil de simulació
+        with self.engine.lock:
+            # perigeu no pot ser interior a la Terra ni més baix que r_now
+            EARTH_R = 6371.0
+            x0, y0  = sat.x, sat.y
+            r_now   = math.hypot(x0, y0)
+            if a * (1 - epsilon) < max(r_now, EARTH_R):
+                valid = False
+            else:
+                valid = True
+                dest_name = self.co_dest_combo.currentText() or sat.orbit.name
+                now = self.engine.time
+                # space.maneuver_satellite, desat a la línia de temps
+                from timeline import Maneuver
+                changed = self.viewer.record(Maneuver(now, sat.name, dest_name, period, epsilon, a))
+                if changed:
+                    self.viewer.refresh(self.space, now)
+
+        if not valid:
             QMessageBox.warning(self, "Paràmetres invàlids",
                                 "El perigeu quedaria dins la Terra o per sota de la posició actual.")
-            return
-
-        dest_name = self.co_dest_combo.currentText() or sat.orbit.name
-        new_orbit = Orbit(dest_name, period, epsilon, a)
-        self.space.orbits.append(new_orbit)
-
-        now = self.viewer.time
-        if change_orbit(sat, new_orbit, now):
-            # fusiona còpies homònimes
-            for o in [o for o in self.space.orbits if o.name == dest_name and o is not new_orbit]:
-                for s in self.space.satellites:
-                    if s.orbit is o:
-                        s.orbit = new_orbit
-                self.space.orbits.remove(o)
-
-            self.viewer.refresh(self.space, now)
+        elif changed:
             self._update_dv()
             QMessageBox.information(self, "✔",
                                      f"{sat.name} → nova òrbita «{dest_name}»")
         else:
-            self.space.orbits.remove(new_orbit)
             QMessageBox.warning(self, "Combustible insuficient",
                                 f"{sat.name} no pot assolir l'òrbita desitjada.")
 
@@ -351,37 +508,24 @@ class MainWindow(QMainWindow):
 
     def _update_dv(self):
         sat_name = self.co_sat_combo.currentText()
-        sat = next((s for s in self.space.satellites if s.name == sat_name), None)
+        sat = get_satellite(self.space, sat_name)
         if not sat:
             self.co_dv_edit.clear()
             self.co_dv_avail_edit.clear()
             return
+        dest = get_orbit(self.space, self.co_dest_combo.currentText())
         try:
-            a2_km = float(self.co_a_edit.text())
+            a = float(self.co_a_edit.text())
+            epsilon = float(self.co_eps_edit.text())
         except ValueError:
-            dest = get_orbit(self.space, self.co_dest_combo.currentText())
-            a2_km = dest.a if dest else None
-        if a2_km is None:
-            self.co_dv_edit.clear()
-            self.co_dv_avail_edit.clear()
-            return
-        MU  = 3.986e14
-        ISP = 450
-        G0  = 9.80665
-        a1 = sat.orbit.a * 1_000
-        a2 = a2_km * 1_000
-        if abs(a1 - a2) < 1e-3:
-            dv_need = 0.0
-        else:
-            dv1 = math.sqrt(MU / a1) * (math.sqrt(2 * a2 / (a1 + a2)) - 1)
-            dv2 = math.sqrt(MU / a2) * (1 - math.sqrt(2 * a1 / (a1 + a2)))
-            dv_need = abs(dv1) + abs(dv2)
-        m0   = sat.mass
-        fuel = sat.fuel
-        dv_avail = 0.0
-        if fuel > 0 and m0 > fuel:
-            m_dry = m0 - fuel
-            dv_avail = ISP * G0 * math.log(m0 / m_dry)
+            if not dest:
+                self.co_dv_edit.clear()
+                self.co_dv_avail_edit.clear()
+                return
+            a, epsilon = dest.a, dest.epsilon
+        # mateix model que change_orbit, des de la posició actual del satèl·lit
+        dv_need, dv_avail, _, _ = maneuver_cost(math.hypot(sat.x, sat.y), sat.mass,
+                                                sat.fuel, epsilon, a)
         self.co_dv_edit.setText(f"{dv_need:.1f}")
         self.co_dv_avail_edit.setText(f"{dv_avail:.1f}")
 
@@ -0,0 +1,194 @@
+import numpy as np
+
+# Model de transferència únic per a change_orbit, la interfície i la
+# planificació de tota la flota: des de la posició actual (radi r_now) un sol
+# impuls tangencial porta l'apogeu a a(1 + e) de l'òrbita de destinació, el
+# perigeu de la qual es limita a max(r_now, Terra). El combustible surt de
+# l'equació de Tsiolkovski. Totes les funcions accepten escalars o vectors i
+# fan broadcasting.
+
+EARTH_R = 6371.0        # km
+MU = 3.986e5            # km³/s²
+ISP = 450.0             # s
+G0 = 9.80665            # m/s²
+VE = ISP * G0           # velocitat d'escapament, m/s
+BLOCK = 1 << 16         # elements per bloc a maneuver_matrix
+APSIS_TOL = 1.0         # km; distància màxima a un àpside per encendre-hi
+
+
+def clamp_perigee(r_now, epsilon, a):
+    # excentricitat de destinació un cop garantit perigeu ≥ max(r_now, Terra)
+    r_p = a * (1 - epsilon)
+    return np.where(r_p < np.maximum(r_now, EARTH_R - 1e-3), 1.0 - r_now / a, epsilon)
+
+
+def transfer_dv(r_now, epsilon, a):
+    # Δv (m/s) de l'impuls tangencial; epsilon ja ha de passar per clamp_perigee.
+    # Si a < r_now / 2 cap el·lipse hi és tangent (epsilon ≤ -1): Δv infinit.
+    r2 = a * (1 + epsilon)
+    with np.errstate(invalid="ignore"):
+        dv = np.abs(np.sqrt(MU / r_now) * (np.sqrt(2 * r2 / (r_now + r2)) - 1)) * 1000.0
+    dv = np.where(epsilon <= -1.0, np.inf, dv)
+    return np.where(np.abs(r2 - r_now) < 1e-6, 0.0, dv)
+
+
+def fuel_for_dv(mass, dv):
+    # combustible infinit per a un Δv infinit: la maniobra mai no és factible
+    return np.where(np.isinf(dv), np.inf, mass - mass / np.exp(dv / VE))
+
+
+def dv_available(mass, fuel):
+    # Δv màxim que permet el combustible; 0 si no n'hi ha o si no queda massa
+    # seca (fuel >= mass), com feia la interfície
+    valid = (fuel > 0) & (mass > fuel)
+    return np.where(valid, VE * np.log(mass / np.where(valid, mass - fuel, 1.0)), 0.0)
+
+
+def maneuver_cost(r_now, mass, fuel, epsilon, a):
+    # (Δv necessari, Δv disponible, combustible, factible) d'un satèl·lit o
+    # d'un conjunt de parelles satèl·lit-òrbita
+    dv = transfer_dv(r_now, clamp_perigee(r_now, epsilon, a), a)
+    needed = np.where(dv == 0.0, 0.0, fuel_for_dv(mass, dv))
+    return dv, dv_available(mass, fuel), needed, fuel >= needed
+
+
+# Estratègies de dos i tres impulsos. Com que totes les òrbites del model
+# tenen la línia d'àpsides sobre l'eix x, les el·lipses de transferència també
+# i els impulsos només poden ser sobre aquest eix, a la banda side (+1 si
+# x > 0, -1 si x < 0) on és el satèl·lit, a radi r1. El primer impuls deixa el
+# satèl·lit amb velocitat horitzontal; si v1 té un angle de trajectòria γ
+# (cos_gamma) el cost és el del vector Δv. Cada tram dura mig període: la
+# Hohmann arriba a l'àpside r2 de la destinació de la banda oposada i la
+# bi-el·líptica, després de l'apoapsi intermèdia a l'altra banda, torna a
+# l'àpside de la mateixa banda. Retornen (Δv en m/s, r2, temps de vol en s,
+# radi intermedi).
+
+STRATEGIES = ("tangential", "hohmann", "bielliptic")
+BIELLIPTIC_FACTORS = (1.5, 2.0, 3.0, 5.0, 8.0, 12.0, 20.0)
+
+
+def vis_viva(r, a):
+    return np.sqrt(MU * (2 / r - 1 / a))
+
+
+def cos_flight_path(r, a, epsilon):
+    # cos γ = h / (r·v) a radi r d'una òrbita (a, epsilon); 1 als àpsides
+    h = np.sqrt(MU * a * (1 - np.asarray(epsilon, dtype=float)**2))
+    return np.minimum(h / (r * vis_viva(r, a)), 1.0)
+
+
+def _first_burn(v1, vt, cos_gamma):
+    # |Δv| (km/s) entre la velocitat actual i l'horitzontal de mòdul vt
+    return np.sqrt(np.maximum(v1**2 + vt**2 - 2 * v1 * vt * cos_gamma, 0.0))
+
+
+def _half_period(a):
+    return np.pi * np.sqrt(a**3 / MU)
+
+
+def apsis_radius(epsilon, a, side):
+    # radi de l'òrbita sobre l'eix x a la banda side (perigeu a x > 0)
+    return a * (1 - epsilon * side)
+
+
+def leg_epsilon(r_from, r_to, side):
+    # excentricitat (amb signe) del mig tram d'el·lipse que surt de r_from a
+    # la banda side i arriba a r_to a la banda oposada
+    return side * (r_to - r_from) / (r_from + r_to)
+
+
+def hohmann_dv(r1, v1, epsilon, a, cos_gamma=1.0, side=1.0):
+    r2 = apsis_radius(epsilon, a, -side)
+    at = (r1 + r2) / 2
+    dv = (_first_burn(v1, vis_viva(r1, at), cos_gamma)
+          + np.abs(vis_viva(r2, a) - vis_viva(r2, at))) * 1000.0
+    return dv, r2 + 0 * dv, _half_period(at) + 0 * dv, np.nan + 0 * dv
+
+
+def bielliptic_dv(r1, v1, epsilon, a, via=None, cos_gamma=1.0, side=1.0):
+    # via: radi de l'apoapsi intermèdia; si és None es prova BIELLIPTIC_FACTORS
+    # vegades el radi més gran i es pren el millor
+    def leg(r2, rb):
+        a1 = (r1 + rb) / 2
+        a2 = (rb + r2) / 2
+        dv = (_first_burn(v1, vis_viva(r1, a1), cos_gamma)
+              + np.abs(vis_viva(rb, a2) - vis_viva(rb, a1))
+              + np.abs(vis_viva(r2, a) - vis_viva(r2, a2))) * 1000.0
+        return dv, r2 + 0 * dv, _half_period(a1) + _half_period(a2), rb + 0 * dv
+
+    r2 = apsis_radius(epsilon, a, side)
+    if via is not None:
+        return leg(r2, np.maximum(via, np.maximum(r1, r2)))
+    best = None
+    for factor in BIELLIPTIC_FACTORS:
+        candidate = leg(r2, factor * np.maximum(r1, r2))
+        if best is None:
+            best = candidate
+        else:
+            take = candidate[0] < best[0]
+            best = tuple(np.where(take, c, b) for c, b in zip(candidate, best))
+    return best
+
+
+def transfer_cost(strategy, r1, a1, epsilon, a, via=None, epsilon1=0.0, side=1.0):
+    # (Δv, r2, temps de vol, via) de l'estratègia des del radi r1 d'una òrbita
+    # (a1, epsilon1), a la banda side de l'eix x; tangential és el model de
+    # change_orbit, sense temps de vol
+    if strategy == "tangential":
+        dv = transfer_dv(r1, clamp_perigee(r1, epsilon, a), a)
+        nan = np.full(np.shape(dv), np.nan)
+        return dv, nan, np.zeros(np.shape(dv)), nan
+    v1 = vis_viva(r1, a1)
+    cos_gamma = cos_flight_path(r1, a1, epsilon1)
+    if strategy == "hohmann":
+        return hohmann_dv(r1, v1, epsilon, a, cos_gamma, side)
+    if strategy == "bielliptic":
+        return bielliptic_dv(r1, v1, epsilon, a, via, cos_gamma, side)
+    raise ValueError(f"estratègia desconeguda: {strategy!r}")
+
+
+class ManeuverMatrix:
+    # Matrius denses (satèl·lits × òrbites). satellites i orbits són les files
+    # de les taules de l'espai (orbits és None si les destinacions s'han donat
+    # com a vectors). available és una vista sense còpia del vector per satèl·lit.
+    __slots__ = ("satellites", "orbits", "dv", "available", "fuel", "feasible")
+
+    def __init__(self, satellites, orbits, dv, available, fuel, feasible):
+        self.satellites = satellites
+        self.orbits = orbits
+        self.dv = dv
+        self.available = available
+        self.fuel = fuel
+        self.feasible = feasible
+
+
+def maneuver_matrix(space, epsilon=None, a=None, block=BLOCK):
+    # Cost de portar cada satèl·lit viu a cada òrbita viva de l'espai (o a les
+    # destinacions (epsilon, a) donades) des de la seva posició actual, és a
+    # dir, la de l'últim update_all_positions.
+    sats = space.satellite_table
+    rows = np.flatnonzero(sats.alive[:sats.n])
+    orbit_rows = None
+    if epsilon is None or a is None:
+        orbits = space.orbit_table
+        orbit_rows = np.flatnonzero(orbits.alive[:orbits.n])
+        epsilon = orbits.col("epsilon")[orbit_rows]
+        a = orbits.col("a")[orbit_rows]
+    epsilon = np.asarray(epsilon, dtype=float).reshape(1, -1)
+    a = np.asarray(a, dtype=float).reshape(1, -1)
+    r_now = np.hypot(sats.col("x")[rows], sats.col("y")[rows])
+    mass = sats.col("mass")[rows]
+    fuel = sats.col("fuel")[rows]
+
+    n, m = len(rows), a.shape[1]
+    dv = np.empty((n, m))
+    needed = np.empty((n, m))
+    feasible = np.empty((n, m), dtype=bool)
+    # per blocs de files perquè els temporals càpiguen a la memòria cau
+    block = max(1, block // max(m, 1))
+    for start in range(0, n, block):
+        part = slice(start, start + block)
+        dv[part], _, needed[part], feasible[part] = maneuver_cost(
+            r_now[part, None], mass[part, None], fuel[part, None], epsilon, a)
+    available = np.broadcast_to(dv_available(mass, fuel)[:, None], (n, m))
+    return ManeuverMatrix(rows, orbit_rows, dv, available, needed, feasible)
@@ -0,0 +1,264 @@
+import argparse
+import math
+import time
+import numpy as np
+from propagator import kepler_E_batch
+
+# Propagació numèrica: en lloc de resoldre Kepler, s'integren les equacions
+# del moviment (x, y, vx, vy) de tota la constel·lació com un sol vector
+# d'estat, amb RK4 de pas fix o Dormand-Prince 5(4) de pas adaptatiu.
+# S'activa per espai:
+#
+#   space.propagator = NumericalPropagator([J2(), Drag()])
+#
+# i llavors update_all_positions hi delega. El μ de cada satèl·lit surt de la
+# seva òrbita (μ = 4π²a³/T²), de manera que sense pertorbacions es reprodueix
+# la trajectòria de Kepler encara que període i semieix no siguin coherents
+# amb el μ terrestre.
+#
+# Cada satèl·lit es sembra (posició i velocitat de Kepler) la primera vegada i
+# cada cop que li canvien l'òrbita o la fase (change_orbit, timeline...); la
+# resta continuen la integració des de l'instant anterior, també cap enrere.
+# Un satèl·lit que baixa per sota de la superfície queda aturat a `decayed`.
+#
+# Una pertorbació és qualsevol objecte cridable term(t, r, v, batch) que
+# retorna l'acceleració (m, 2) en km/s²; batch té mu, mass i rows dels
+# satèl·lits que s'integren.
+
+EARTH_R = 6371.0               # km
+EARTH_RE = 6378.137            # km, radi equatorial per a J2
+EARTH_J2 = 1.08262668e-3
+EARTH_OMEGA = 7.2921159e-5     # rad/s
+STEPS_PER_PERIOD = 512         # RK4: pas màxim = període més curt / STEPS_PER_PERIOD
+RTOL = 1e-10
+ATOL = 1e-7                    # km, km/s
+METHODS = ("rk4", "dopri5")
+
+
+class J2:
+    # achatament terrestre al pla equatorial: a = -3/2·J2·μ·R²·r/|r|⁵
+    def __init__(self, j2=EARTH_J2, radius=EARTH_RE):
+        self.j2 = j2
+        self.radius = radius
+
+    def __call__(self, t, r, v, batch):
+        r2 = np.einsum("ij,ij->i", r, r)[:, None]
+        return (-1.5 * self.j2 * self.radius**2) * batch.mu * r / (r2**2 * np.sqrt(r2))
+
+
+class Drag:
+    # fregament amb atmosfera exponencial que gira amb la Terra:
+    # a = -½·ρ(h)·Cd·A/m·|v_rel|·v_rel, amb la massa de cada satèl·lit
+    def __init__(self, cd=2.2, area=1.0, rho0=3.725e-12, h0=400.0, scale=58.5,
+                 omega=EARTH_OMEGA):
+        # area en m², rho0 en kg/m³ a l'altura h0 (km), scale en km
+        self.cd = cd
+        self.area = area
+        self.rho0 = rho0
+        self.h0 = h0
+        self.scale = scale
+        self.omega = omega
+
+    def __call__(self, t, r, v, batch):
+        h = np.sqrt(np.einsum("ij,ij->i", r, r)) - EARTH_R
+        rho = self.rho0 * np.exp(-(h - self.h0) / self.scale)
+        with np.errstate(divide="ignore"):
+            ballistic = np.where(batch.mass > 0, self.cd * self.area / batch.mass, 0.0)
+        rel = v - self.omega * np.column_stack([-r[:, 1], r[:, 0]])
+        speed = np.sqrt(np.einsum("ij,ij->i", rel, rel))
+        # ρ·(m²/kg)·(km/s)² = 1e6 m/s² = 1e3 km/s²
+        return (-0.5e3 * rho * ballistic * speed)[:, None] * rel
+
+
+class _Batch:
+    __slots__ = ("rows", "mu", "mass", "period")
+
+    def __init__(self, rows, mu, mass, period):
+        self.rows = rows
+        self.mu = mu
+        self.mass = mass
+        self.period = period
+
+
+def kepler_state(period, epsilon, a, M0, t):
+    # posició i velocitat (n, 2) sobre l'el·lipse de Kepler a l'instant t
+    epsilon = np.asarray(epsilon, dtype=float)
+    motion = 2 * np.pi / np.asarray(period, dtype=float)
+    E = kepler_E_batch(M0 + motion * t, epsilon)
+    b = a * np.sqrt(1 - epsilon**2)
+    rate = motion / (1 - epsilon * np.cos(E))
+    r = np.column_stack([a * (np.cos(E) - epsilon), b * np.sin(E)])
+    v = np.column_stack([-a * np.sin(E) * rate, b * np.cos(E) * rate])
+    return r, v
+
+
+# Dormand-Prince 5(4)
+DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0)
+DP_A = ((),
+        (1 / 5,),
+        (3 / 40, 9 / 40),
+        (44 / 45, -56 / 15, 32 / 9),
+        (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+        (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+        (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84))
+DP_B = DP_A[6] + (0.0,)
+DP_E = tuple(b - e for b, e in zip(DP_B, (5179 / 57600, 0.0, 7571 / 16695, 393 / 640,
+                                          -92097 / 339200, 187 / 2100, 1 / 40)))
+
+
+class NumericalPropagator:
+    def __init__(self, perturbations=(), method="rk4", steps_per_period=STEPS_PER_PERIOD,
+                 rtol=RTOL, atol=ATOL):
+        if method not in METHODS:
+            raise ValueError(f"mètode desconegut: {method!r}")
+        self.perturbations = list(perturbations)
+        self.method = method
+        self.steps_per_period = steps_per_period
+        self.rtol = rtol
+        self.atol = atol
+        self.reset()
+
+    def reset(self):
+        # es tornen a sembrar tots els satèl·lits al pròxim update_positions
+        self.time = None
+        self.state = np.zeros((0, 4))    # per fila de la taula: x, y, vx, vy
+        self.key = np.zeros((5, 0))      # òrbita, M0, període, epsilon, a en sembrar
+        self.decayed = np.zeros(0, dtype=bool)
+        self.names = None
+        self.h = None                    # darrer pas acceptat de dopri5
+        self.evaluations = 0
+
+    def _derivative(self, t, Y, batch):
+        r, v = Y[:, :2], Y[:, 2:]
+        r2 = np.einsum("ij,ij->i", r, r)[:, None]
+        acc = -batch.mu * r / (r2 * np.sqrt(r2))
+        for term in self.perturbations:
+            acc = acc + term(t, r, v, batch)
+        self.evaluations += 1
+        return np.hstack([v, acc])
+
+    def _rk4(self, t, Y, h, batch):
+        k1 = self._derivative(t, Y, batch)
+        k2 = self._derivative(t + h / 2, Y + (h / 2) * k1, batch)
+        k3 = self._derivative(t + h / 2, Y + (h / 2) * k2, batch)
+        k4 = self._derivative(t + h, Y + h * k3, batch)
+        return Y + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def _dopri(self, t0, t1, Y, batch):
+        # pas comú a tota la constel·lació, controlat per l'error màxim
+        span = t1 - t0
+        direction = 1.0 if span > 0 else -1.0
+        h = min(self.h or abs(span), abs(span), float(batch.period.min()) / 16)
+        t = t0
+        while direction * (t1 - t) > 0:
+            h = min(h, direction * (t1 - t))
+            k = [self._derivative(t, Y, batch)]
+            for c, row in zip(DP_C[1:], DP_A[1:]):
+                Yi = Y + (direction * h) * sum(a * ki for a, ki in zip(row, k) if a)
+                k.append(self._derivative(t + direction * h * c, Yi, batch))
+            Y5 = Y + (direction * h) * sum(b * ki for b, ki in zip(DP_B, k) if b)
+            err = (direction * h) * sum(e * ki for e, ki in zip(DP_E, k) if e)
+            norm = float(np.max(np.abs(err) / (self.atol + self.rtol * np.abs(Y5)))) if len(Y) else 0.0
+            if norm <= 1.0:
+                t += direction * h
+                Y = Y5
+                self.h = h
+            h *= min(5.0, max(0.2, 0.9 * norm ** -0.2)) if norm > 0 else 5.0
+        return Y
+
+    def integrate(self, Y, t0, t1, batch):
+        if t1 == t0 or len(Y) == 0:
+            return Y
+        if self.method == "dopri5":
+            return self._dopri(t0, t1, Y, batch)
+        h_max = float(batch.period.min()) / self.steps_per_period
+        steps = max(1, math.ceil(abs(t1 - t0) / h_max))
+        h = (t1 - t0) / steps
+        for k in range(steps):
+            Y = self._rk4(t0 + k * h, Y, h, batch)
+        return Y
+
+    def update_positions(self, space, time):
+        # equivalent a update_all_positions
+        sats = space.satellite_table
+        orbits = space.orbit_table
+        n = sats.n
+        link = sats.col("orbit")
+        period = orbits.data["period"][link]
+        epsilon = orbits.data["epsilon"][link]
+        a = orbits.data["a"][link]
+        key = np.stack([link.astype(float), sats.col("M0"), period, epsilon, a])
+        alive = sats.alive[:n]
+
+        if self.time is None or self.names is not sats.names or n < len(self.state):
+            # primer cop o taula reconstruïda (càrrega, compactació, timeline)
+            self.state = np.zeros((n, 4))
+            self.decayed = np.zeros(n, dtype=bool)
+            fresh = alive.copy()
+        else:
+            old = len(self.state)
+            self.state = np.concatenate([self.state, np.zeros((n - old, 4))])
+            self.decayed = np.concatenate([self.decayed, np.zeros(n - old, dtype=bool)])
+            fresh = np.ones(n, dtype=bool)
+            fresh[:old] = np.any(key[:, :old] != self.key, axis=0)
+            fresh &= alive
+
+        moving = np.flatnonzero(alive & ~fresh & ~self.decayed)
+        if len(moving) and time != self.time:
+            mu = 4 * np.pi**2 * a[moving]**3 / period[moving]**2
+            batch = _Batch(moving, mu[:, None], sats.col("mass")[moving], period[moving])
+            Y = self.integrate(self.state[moving], self.time, time, batch)
+            r = np.sqrt(np.einsum("ij,ij->i", Y[:, :2], Y[:, :2]))
+            down = r < EARTH_R
+            if down.any():
+                Y[down, :2] *= (EARTH_R / r[down])[:, None]
+                Y[down, 2:] = 0.0
+                self.decayed[moving[down]] = True
+            self.state[moving] = Y
+
+        seed = np.flatnonzero(fresh)
+        if len(seed):
+            r, v = kepler_state(period[seed], epsilon[seed], a[seed], sats.col("M0")[seed], time)
+            self.state[seed, :2] = r
+            self.state[seed, 2:] = v
+            self.decayed[seed] = False
+
+        self.key = key
+        self.time = time
+        self.names = sats.names
+        sats.col("x")[:] = self.state[:, 0]
+        sats.col("y")[:] = self.state[:, 1]
+        # l'estat de Kepler ja no correspon a la posició
+        sats.col("E")[:] = np.nan
+        sats.col("M")[:] = np.nan
+        sats.col("iterations")[:] = 0
+
+
+if __name__ == "__main__":
+    from space import update_all_positions
+    from synthetic import synthetic_space
+
+    parser = argparse.ArgumentParser(description="Propagació numèrica contra Kepler")
+    parser.add_argument("--satellites", type=int, default=5000)
+    parser.add_argument("--span", type=float, default=86400.0)
+    parser.add_argument("--dt", type=float, default=60.0, help="pas entre tics (s)")
+    parser.add_argument("--method", choices=METHODS, default="rk4")
+    args = parser.parse_args()
+
+    reference = synthetic_space(args.satellites)
+    ticks = np.arange(0.0, args.span + args.dt / 2, args.dt)
+    for name, perturbations in (("sense pertorbacions", []), ("J2 + fregament", [J2(), Drag()])):
+        space = synthetic_space(args.satellites)
+        space.propagator = NumericalPropagator(perturbations, method=args.method)
+        start = time.perf_counter()
+        for t in ticks:
+            update_all_positions(space, float(t))
+        elapsed = (time.perf_counter() - start) / len(ticks)
+        update_all_positions(reference, float(ticks[-1]))
+        ref = reference.satellite_table
+        sats = space.satellite_table
+        error = np.hypot(sats.col("x") - ref.col("x"), sats.col("y") - ref.col("y"))
+        print(f"{name} ({args.method}): {elapsed * 1e3:.2f} ms/tic, "
+              f"{space.propagator.evaluations / len(ticks):.1f} avaluacions/tic; "
+              f"diferència amb Kepler a t = {ticks[-1]:.0f} s: mediana {np.median(error) * 1e3:.1f} m, "
+              f"màxim {error.max() * 1e3:.1f} m, {int(space.propagator.decayed.sum())} reentrades")
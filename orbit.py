@@ -1,29 +1,100 @@
 import math
+from store import Table, View, column
+
+# Criteri d'aturada de Newton (rad) i distància màxima en anomalia mitjana
+# (rad) per reaprofitar l'E del tic anterior com a punt de partida.
+KEPLER_TOL = 1e-12
+WARM_START_MAX_DM = 0.5
+
+# Columnes de la taula d'òrbites. E i M guarden l'estat del darrer càlcul
+# (arrencada en calent; NaN si encara no n'hi ha cap) i iterations les
+# iteracions de Newton que ha necessitat. Una òrbita de transferència té un
+# final: a l'instant until els seus satèl·lits passen a l'òrbita next (fila
+# de la mateixa taula) amb fase next_M0.
+ORBIT_COLUMNS = {
+    "period": (float, 0.0), "epsilon": (float, 0.0), "a": (float, 0.0),
+    "b": (float, 0.0), "M0": (float, 0.0), "x": (float, 0.0), "y": (float, 0.0),
+    "E": (float, math.nan), "M": (float, math.nan), "iterations": (int, 0),
+    "until": (float, math.inf), "next": (int, -1), "next_M0": (float, 0.0),
+}
+
 #KSA1
 #KSP
-class Orbit:
+class Orbit(View):
+    __slots__ = ()
+    period = column("period")
+    epsilon = column("epsilon")
+    a = column("a")
+    #Semi-minor axis
+    b = column("b")
+    M0 = column("M0")
+    x = column("x")
+    y = column("y")
+    E = column("E")
+    M = column("M")
+    iterations = column("iterations", int)
+    until = column("until")
+    next_M0 = column("next_M0")
+
     def __init__(self, name, period, epsilon, a):
-        self.name = name
-        self.period = period
-        self.epsilon = epsilon
-        self.a = a
-        #Semi-minor axis
-        self.b = a * (1 - epsilon**2) ** 0.5
-        self.x = 0
-        self.y = 0
-        self.M0= 0.0
-
-    def kepler_E(self, M):
-        E = M
-        for _ in range(20):
-            f = E - self.epsilon * math.sin(E) - M
-            f_prime = 1 - self.epsilon * math.cos(E)
+        # una òrbita creada fora d'un Space té una taula pròpia d'una fila;
+        # en afegir-la a space.orbits passa a la taula de l'espai
+        Table(ORBIT_COLUMNS, Orbit, capacity=1, self_link="next").add(
+            name, view=self, period=period, epsilon=epsilon, a=a,
+            b=a * (1 - epsilon**2) ** 0.5)
+
+    @property
+    def next(self):
+        i = int(self._table.data["next"][self._i])
+        return self._table.get_view(i) if i >= 0 else None
+
+    @next.setter
+    def next(self, orbit):
+        # l'òrbita següent s'incorpora a la taula d'aquesta
+        if orbit is not None and orbit._table is not self._table:
+            self._table.adopt(orbit)
+        self._table.data["next"][self._i] = -1 if orbit is None else orbit._i
+
+    def kepler_E(self, M, tol=KEPLER_TOL, max_iter=20, E0=None):
+        epsilon = self.epsilon
+        E = kepler_starter(M, epsilon) if E0 is None else E0
+        iterations = 0
+        for _ in range(max_iter):
+            f = E - epsilon * math.sin(E) - M
+            f_prime = 1 - epsilon * math.cos(E)
+            iterations += 1
             if f_prime != 0:
-                E = E - f / f_prime
+                step = f / f_prime
+                E = E - step
+                if abs(step) <= tol:
+                    break
+        self.iterations = iterations
         return E
 
-    def new_position(self, time):
-        M = self.M0 + (2 * math.pi / self.period) * time
-        E = self.kepler_E(M)
-        self.x = self.a * (math.cos(E) - self.epsilon)
-        self.y = self.b * math.sin(E)
+    def state_at(self, time, M0, E_prev=math.nan, M_prev=math.nan):
+        # posició sobre aquesta òrbita per a una fase M0 donada; E_prev/M_prev
+        # són l'estat del tic anterior (NaN si no n'hi ha)
+        M = M0 + (2 * math.pi / self.period) * time
+        E0 = None
+        # abans del primer càlcul M_prev és NaN i la comparació és falsa; E_prev
+        # també pot ser NaN amb M_prev finit (EphemerisCache només desa M)
+        if abs(M - M_prev) <= WARM_START_MAX_DM and math.isfinite(E_prev):
+            # predicció de primer ordre a partir de l'E del tic anterior
+            E0 = E_prev + (M - M_prev) / (1 - self.epsilon * math.cos(E_prev))
+        E = self.kepler_E(M, E0=E0)
+        x = self.a * (math.cos(E) - self.epsilon)
+        y = self.b * math.sin(E)
+        return x, y, E, M
+
+    def new_position(self, time, warm=True):
+        if warm:
+            self.x, self.y, self.E, self.M = self.state_at(time, self.M0, self.E, self.M)
+        else:
+            self.x, self.y, self.E, self.M = self.state_at(time, self.M0)
+
+def kepler_starter(M, epsilon):
+    # E = M + e·sin(M) per a òrbites gairebé circulars; per a excentricitats
+    # altes (HEO) el valor inicial de Danby convergeix molt més de pressa
+    if abs(epsilon) < 0.8:
+        return M + epsilon * math.sin(M)
+    return M + 0.85 * epsilon * math.copysign(1.0, math.sin(M))
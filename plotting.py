@@ -0,0 +1,39 @@
+import numpy as np
+from render import (HEATMAP_THRESHOLD, add_static_layer, density, in_view, pick_labels,
+                    satellite_xy)
+
+# Dibuix estàtic d'un Space amb matplotlib. Està separat de space.py perquè el
+# model, la lectura de fitxers i la propagació es puguin importar sense
+# carregar matplotlib ni un backend gràfic.
+
+
+def plot(space, ax):
+    # mateixos nivells de detall que SpaceRenderer, però tot en una sola passada
+    add_static_layer(ax, space)
+    draw_satellites(ax, space)
+
+
+def draw_satellites(ax, space):
+    xy = satellite_xy(space)
+    visible = in_view(ax, xy)
+    if int(np.count_nonzero(visible)) > HEATMAP_THRESHOLD:
+        xlim, ylim = ax.get_xlim(), ax.get_ylim()
+        ax.imshow(density(ax, xy[visible]), origin="lower", cmap="inferno",
+                  interpolation="nearest", zorder=2, extent=xlim + ylim)
+        ax.set_xlim(xlim)
+        ax.set_ylim(ylim)
+        return
+    ax.scatter(xy[:, 0], xy[:, 1], c='r', s=12, zorder=3)
+    sats = space.satellite_table
+    names = [sats.names[i] for i in sats.rows()]
+    for i in pick_labels(ax, xy, visible).tolist():
+        ax.text(xy[i, 0] + 300, xy[i, 1] + 300, names[i], fontsize=8, zorder=4)
+
+
+def plot_space(space):
+    # pyplot (i el seu backend de finestres) només per a aquesta figura independent
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 8))
+    plot(space, ax)
+    plt.show()
@@ -0,0 +1,124 @@
+import collections
+import contextlib
+import os
+import threading
+import time
+import numpy as np
+
+# Cronòmetres per etapes del bucle de simulació i de dibuix. Cada etapa guarda
+# les últimes `window` durades en una cua circular; a partir d'aquí es calcula
+# un histograma mòbil (percentils i barres) per a la superposició del visor o
+# per exportar-lo. Amb el perfilador desactivat, stage() retorna sempre el
+# mateix nullcontext i el cost és una crida de funció.
+#
+#   with PROFILER.stage("propagate"):
+#       update_all_positions(space, t)
+
+WINDOW = 512
+BARS = "▁▂▃▄▅▆▇█"
+_NULL = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self, window=WINDOW, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self.samples.setdefault(name, collections.deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+    def stages(self):
+        # {etapa: vector de durades (s)}, còpia consistent per llegir des d'un altre fil
+        with self._lock:
+            items = list(self.samples.items())
+        return {name: np.array(samples) for name, samples in items}
+
+    def summary(self):
+        # {etapa: {count, mean, p50, p95, max}} en segons
+        out = {}
+        for name, values in self.stages().items():
+            if len(values) == 0:
+                continue
+            p50, p95 = np.percentile(values, (50, 95))
+            out[name] = {"count": len(values), "mean": float(values.mean()),
+                         "p50": float(p50), "p95": float(p95), "max": float(values.max())}
+        return out
+
+    def histogram(self, name, bins=16, low=1e-5, high=1.0):
+        # recompte per intervals logarítmics entre low i high segons
+        values = self.stages().get(name, np.zeros(0))
+        edges = np.geomspace(low, high, bins + 1)
+        counts, _ = np.histogram(np.clip(values, low, high), edges)
+        return counts, edges
+
+    def sparkline(self, name, bins=16):
+        counts, _ = self.histogram(name, bins)
+        if counts.max() == 0:
+            return " " * bins
+        levels = np.ceil(counts / counts.max() * (len(BARS) - 1)).astype(int)
+        return "".join(BARS[k] if c else " " for k, c in zip(levels.tolist(), counts.tolist()))
+
+    def report(self):
+        # text per a la superposició: una línia per etapa en mil·lisegons
+        lines = []
+        for name, s in sorted(self.summary().items()):
+            lines.append(f"{name:<12s} p50 {s['p50'] * 1e3:6.2f}  p95 {s['p95'] * 1e3:6.2f} ms "
+                         f"{self.sparkline(name)}")
+        return "\n".join(lines)
+
+    def export(self, filename):
+        # .csv: una fila "stage,seconds" per mostra; altrament JSON amb el
+        # resum, els histogrames i les mostres
+        import json
+        stages = self.stages()
+        if filename.endswith(".csv"):
+            with open(filename, "w") as f:
+                f.write("stage,seconds\n")
+                for name, values in stages.items():
+                    f.writelines(f"{name},{v:.9f}\n" for v in values.tolist())
+            return
+        histograms = {}
+        for name in stages:
+            counts, edges = self.histogram(name)
+            histograms[name] = {"counts": counts.tolist(), "edges": edges.tolist()}
+        with open(filename, "w") as f:
+            json.dump({"window": self.window, "summary": self.summary(),
+                       "histograms": histograms,
+                       "samples": {name: values.tolist() for name, values in stages.items()}},
+                      f, indent=2)
+
+
+# perfilador compartit pel motor, el visor i el renderitzador; ORBIT_PROFILE=1
+# l'activa des de l'inici
+PROFILER = Profiler(enabled=os.environ.get("ORBIT_PROFILE") == "1")
@@ -0,0 +1,217 @@
+import numpy as np
+import matplotlib.patches as patches
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from profiling import PROFILER
+
+EARTH_R = 6371.0
+
+# Nivells de detall: totes les òrbites són una sola LineCollection i tots els
+# satèl·lits una sola col·lecció scatter. Només s'etiqueten com a molt
+# MAX_LABELS satèl·lits dins la vista, un per cel·la de LABEL_CELL píxels, i
+# per sobre de HEATMAP_THRESHOLD satèl·lits visibles el scatter se substitueix
+# per un mapa de densitat de la vista actual.
+ORBIT_POINTS = 128
+LEGEND_MAX = 10
+MAX_LABELS = 20
+LABEL_CELL = 60          # px
+HEATMAP_THRESHOLD = 20000
+HEATMAP_BINS = 192
+
+
+def orbit_lines(space):
+    # (m, ORBIT_POINTS, 2) punts de cada el·lipse viva, amb el focus a l'origen
+    orbits = space.orbit_table
+    rows = np.flatnonzero(orbits.alive[:orbits.n])
+    a = orbits.col("a")[rows, None]
+    b = orbits.col("b")[rows, None]
+    epsilon = orbits.col("epsilon")[rows, None]
+    E = np.linspace(0, 2 * np.pi, ORBIT_POINTS)
+    return np.stack([a * (np.cos(E) - epsilon), b * np.sin(E)], axis=-1), rows
+
+
+def add_static_layer(ax, space):
+    # Terra, òrbites, eixos i llegenda (amb una entrada per òrbita només si
+    # n'hi ha poques)
+    # la Terra per sobre del mapa de densitat
+    ax.add_patch(patches.Circle((0, 0), EARTH_R, color='lightblue', label='Terra', zorder=2.5))
+    lines, rows = orbit_lines(space)
+    names = space.orbit_table.names
+    few = len(rows) <= LEGEND_MAX
+    colors = [f"C{k % 10}" for k in range(len(rows))] if few else "tab:blue"
+    ax.add_collection(LineCollection(lines, colors=colors, linestyles='--',
+                                     linewidths=1.0 if few else 0.5))
+    extent = EARTH_R
+    if len(rows):
+        extent = max(extent, float(np.abs(lines).max()))
+    extent *= 1.05
+    ax.set_xlim(-extent, extent)
+    ax.set_ylim(-extent, extent)
+    ax.set_aspect('equal')
+    ax.set_xlabel("X (km)")
+    ax.set_ylabel("Y (km)")
+    ax.set_title("Òrbites i satèl·lits al voltant de la Terra")
+    handles = [patches.Patch(color='lightblue', label='Terra')]
+    if few:
+        handles += [Line2D([], [], color=colors[k], linestyle='--', label=names[i])
+                    for k, i in enumerate(rows.tolist())]
+    else:
+        handles.append(Line2D([], [], color="tab:blue", linestyle='--',
+                              label=f"{len(rows)} òrbites"))
+    with PROFILER.stage("legend"):
+        ax.legend(handles=handles, loc='upper right')
+    ax.grid(True)
+
+
+def satellite_xy(space):
+    sats = space.satellite_table
+    alive = sats.alive[:sats.n]
+    return np.column_stack([sats.col("x")[alive], sats.col("y")[alive]])
+
+
+def in_view(ax, xy):
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    return ((xy[:, 0] >= min(x0, x1)) & (xy[:, 0] <= max(x0, x1))
+            & (xy[:, 1] >= min(y0, y1)) & (xy[:, 1] <= max(y0, y1)))
+
+
+def pick_labels(ax, xy, visible, max_labels=MAX_LABELS, cell=LABEL_CELL):
+    # índexs dels satèl·lits a etiquetar: un per cel·la de pantalla, els
+    # primers de cada cel·la, fins a max_labels
+    candidates = np.flatnonzero(visible)
+    if len(candidates) == 0:
+        return candidates
+    pixels = ax.transData.transform(xy[candidates])
+    cells = np.floor(pixels / cell).astype(np.int64)
+    key = cells[:, 0] * (1 << 20) + cells[:, 1]
+    _, first = np.unique(key, return_index=True)
+    return candidates[np.sort(first)[:max_labels]]
+
+
+def density(ax, xy, bins=HEATMAP_BINS):
+    # recompte per cel·la de la vista actual (files = y cap amunt, per a
+    # origin="lower"); bincount és molt més ràpid que histogram2d
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    x0, x1, y0, y1 = min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1)
+    ix = np.clip(((xy[:, 0] - x0) * (bins / (x1 - x0))).astype(np.int64), 0, bins - 1)
+    iy = np.clip(((xy[:, 1] - y0) * (bins / (y1 - y0))).astype(np.int64), 0, bins - 1)
+    counts = np.bincount(iy * bins + ix, minlength=bins * bins).reshape(bins, bins)
+    return np.ma.masked_equal(counts, 0)
+
+
+class SpaceRenderer:
+    # Dibuix amb artistes persistents: la Terra, les òrbites i la llegenda es
+    # construeixen un sol cop (capa estàtica) i a cada fotograma només es
+    # mouen els satèl·lits (una sola col·lecció scatter o el mapa de densitat,
+    # més les etiquetes triades) i es repinta aquesta capa sobre el fons desat
+    # amb blitting. Si canvien els límits de l'eix (zoom) es redibuixa tot.
+    def __init__(self, ax):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.signature = None
+        self.background = None
+        self.view = None
+        self.scatter = None
+        self.heatmap = None
+        self.labels = []
+        self.names = []
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _signature(self, space):
+        orbits = space.orbit_table
+        m = orbits.n
+        return (m, orbits.alive[:m].tobytes(), orbits.data["a"][:m].tobytes(),
+                orbits.data["b"][:m].tobytes(), orbits.data["epsilon"][:m].tobytes(),
+                tuple(orbits.names), tuple(space.satellite_table.names),
+                space.satellite_table.alive[:space.satellite_table.n].tobytes())
+
+    def _view(self):
+        return (self.ax.get_xlim(), self.ax.get_ylim(), tuple(self.ax.bbox.bounds))
+
+    def build(self, space):
+        ax = self.ax
+        ax.clear()
+        add_static_layer(ax, space)
+        # sense blitting la capa mòbil es dibuixa amb la resta
+        animated = self.canvas.supports_blit
+        self.scatter = ax.scatter([], [], c='r', s=12, zorder=3, animated=animated)
+        xlim, ylim = ax.get_xlim(), ax.get_ylim()
+        self.heatmap = ax.imshow(np.ma.masked_all((2, 2)), origin="lower", cmap="inferno",
+                                 interpolation="nearest", zorder=2, animated=animated,
+                                 extent=xlim + ylim, visible=False)
+        ax.set_xlim(xlim)
+        ax.set_ylim(ylim)
+        self.labels = [ax.text(0, 0, "", fontsize=8, zorder=4, animated=animated,
+                               visible=False) for _ in range(MAX_LABELS)]
+        sats = space.satellite_table
+        self.names = [sats.names[i] for i in sats.rows()]
+        self.signature = self._signature(space)
+        self.background = None
+
+    def _move(self, space, xy=None):
+        if xy is None:
+            xy = satellite_xy(space)
+        visible = in_view(self.ax, xy)
+        dense = int(np.count_nonzero(visible)) > HEATMAP_THRESHOLD
+        self.scatter.set_visible(not dense)
+        self.heatmap.set_visible(dense)
+        if dense:
+            (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+            counts = density(self.ax, xy[visible])
+            self.heatmap.set_data(counts)
+            self.heatmap.set_clim(1, max(int(counts.max() or 1), 2))
+            self.heatmap.set_extent((min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1)))
+            chosen = np.zeros(0, dtype=np.int64)
+        else:
+            self.scatter.set_offsets(xy)
+            chosen = pick_labels(self.ax, xy, visible)
+        for label, i in zip(self.labels, chosen.tolist()):
+            x, y = xy[i]
+            label.set_position((x + 300, y + 300))
+            label.set_text(self.names[i])
+            label.set_visible(True)
+        for label in self.labels[len(chosen):]:
+            label.set_visible(False)
+
+    def _draw_moving(self):
+        self.ax.draw_artist(self.heatmap if self.heatmap.get_visible() else self.scatter)
+        for label in self.labels:
+            if label.get_visible():
+                self.ax.draw_artist(label)
+
+    def _on_draw(self, event):
+        # després d'un dibuix complet (primer cop, canvi de mida o de zoom) es
+        # desa el fons sense la capa mòbil
+        if self.scatter is None or not self.canvas.supports_blit:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.view = self._view()
+        self._draw_moving()
+
+    def draw(self, space, xy=None):
+        # xy: posicions (n, 2) ja calculades (p. ex. d'un SimulationEngine);
+        # per defecte es llegeixen de les columnes de l'espai
+        if self.signature != self._signature(space):
+            with PROFILER.stage("build"):
+                self.build(space)
+        with PROFILER.stage("move"):
+            self._move(space, xy)
+        if (self.background is None or not self.canvas.supports_blit
+                or self.view != self._view()):
+            with PROFILER.stage("canvas_draw"):
+                self.canvas.draw()
+        else:
+            with PROFILER.stage("blit"):
+                self.canvas.restore_region(self.background)
+                self._draw_moving()
+                self.canvas.blit(self.ax.bbox)
+
+    def invalidate(self):
+        # cal cridar-la si algú altre neteja o redibuixa l'eix
+        self.signature = None
+        self.background = None
+        self.view = None
+        self.scatter = None
+        self.heatmap = None
+        self.labels = []
+        self.names = []
@@ -1,53 +1,95 @@
 import math
-class Satellite:
-    def __init__(self, name, orbit, mass, fuel):
-        self.name=name
-        self.orbit=orbit
-        self.mass=mass
-        self.fuel=fuel
-        
+from store import Table, View, column
+from maneuver import (clamp_perigee, transfer_dv, fuel_for_dv, transfer_cost, leg_epsilon,
+                      APSIS_TOL, MU)
+from orbit import Orbit
+
+# Columnes de la taula de satèl·lits; "orbit" és l'índex de fila de l'òrbita
+# a la taula enllaçada. Cada satèl·lit té la seva pròpia fase (M0, anomalia
+# mitjana a t = 0) i la seva posició, de manera que diversos satèl·lits poden
+# compartir òrbita en punts diferents. E, M i iterations tenen el mateix
+# significat que a ORBIT_COLUMNS.
+SATELLITE_COLUMNS = {
+    "orbit": (int, -1), "mass": (float, 0.0), "fuel": (float, 0.0),
+    "M0": (float, 0.0), "x": (float, 0.0), "y": (float, 0.0),
+    "E": (float, math.nan), "M": (float, math.nan), "iterations": (int, 0),
+}
+
+class Satellite(View):
+    __slots__ = ()
+    mass = column("mass")
+    fuel = column("fuel")
+    M0 = column("M0")
+    x = column("x")
+    y = column("y")
+    E = column("E")
+    M = column("M")
+    iterations = column("iterations", int)
+
+    def __init__(self, name, orbit, mass, fuel, M0=None):
+        # per defecte el satèl·lit pren la fase de l'òrbita
+        table = Table(SATELLITE_COLUMNS, Satellite, capacity=1,
+                      link=orbit._table, link_column="orbit")
+        table.add(name, view=self, orbit=orbit._i, mass=mass, fuel=fuel,
+                  M0=orbit.M0 if M0 is None else M0)
+
+    @property
+    def orbit(self):
+        return self._table.link.get_view(int(self._table.data["orbit"][self._i]))
+
+    @orbit.setter
+    def orbit(self, orbit):
+        # una òrbita d'una altra taula s'incorpora a la de l'espai
+        link = self._table.link
+        if orbit._table is not link:
+            link.adopt(orbit)
+        self._table.data["orbit"][self._i] = orbit._i
+
     def update_position(self, time):
-        self.orbit.new_position(time)
+        # en acabar una òrbita de transferència el satèl·lit passa a la següent
+        orbit = self.orbit
+        while time >= orbit.until:
+            self.M0 = orbit.next_M0
+            orbit = orbit.next
+            self.orbit = orbit
+            self.E, self.M = math.nan, math.nan
+        self.x, self.y, self.E, self.M = orbit.state_at(time, self.M0, self.E, self.M)
+        self.iterations = orbit.iterations
 
 def relative_position_to(sat1, sat2):
-    x1, y1 = sat1.orbit.x, sat1.orbit.y
-    x2, y2 = sat2.orbit.x, sat2.orbit.y
+    x1, y1 = sat1.x, sat1.y
+    x2, y2 = sat2.x, sat2.y
     dx = x2 - x1
     dy = y2 - y1
     return (dx, dy)
 
 
-def change_orbit(satellite, new_orbit, now=0):
-    EARTH_R = 6371.0                      # km
-    isp, g0  = 450.0, 9.80665            # s, m/s²
-    mu_km    = 3.986e5                   # km³/s²
-
+def change_orbit(satellite, new_orbit, now=0, strategy="tangential", via=None):
     # punt i radi actuals
-    x0, y0   = satellite.orbit.x, satellite.orbit.y
+    x0, y0   = satellite.x, satellite.y
     r_now    = math.hypot(x0, y0)        # km
 
+    if strategy != "tangential":
+        return _transfer_to_apsis(satellite, new_orbit, now, r_now, strategy, via)
+
     # garanteix perigeu ≥ max(r_now, Terra)
-    r_p = new_orbit.a * (1 - new_orbit.epsilon)
-    if r_p < max(r_now, EARTH_R - 1e-3):
-        new_orbit.epsilon = 1.0 - r_now / new_orbit.a
+    epsilon = float(clamp_perigee(r_now, new_orbit.epsilon, new_orbit.a))
+    if epsilon <= -1.0:
+        return False                     # a < r_now / 2: cap el·lipse tangent
+    if epsilon != new_orbit.epsilon:
+        new_orbit.epsilon = epsilon
         new_orbit.b       = new_orbit.a * math.sqrt(1 - new_orbit.epsilon**2)
 
-    # Δv: un únic impuls tangencial que eleva l’apogeu
-    r1 = r_now
-    r2 = new_orbit.a * (1 + new_orbit.epsilon)
-    if abs(r2 - r1) < 1e-6:
-        delta_v_ms = 0.0
-    else:
-        dv1_km = math.sqrt(mu_km / r1) * (math.sqrt(2 * r2 / (r1 + r2)) - 1)
-        delta_v_ms = abs(dv1_km) * 1000.0
+    # Δv: un únic impuls tangencial que eleva l’apogeu (model de maneuver.py)
+    delta_v_ms = float(transfer_dv(r_now, new_orbit.epsilon, new_orbit.a))
 
     if delta_v_ms == 0.0:
         return True
 
     # combustible (Tsiolkovski)
     m0 = satellite.mass
-    mf = m0 / math.exp(delta_v_ms / (isp * g0))
-    fuel_needed = m0 - mf
+    fuel_needed = float(fuel_for_dv(m0, delta_v_ms))
+    mf = m0 - fuel_needed
     if satellite.fuel < fuel_needed:
         return False
 
@@ -55,12 +97,62 @@ def change_orbit(satellite, new_orbit, now=0):
     satellite.mass  = mf
     satellite.fuel -= fuel_needed
 
-    # fase inicial M0 perquè passi per (x0, y0) a t = now
+    # fase inicial M0 del satèl·lit perquè passi per (x0, y0) a t = now
     cosE = max(-1.0, min(1.0, x0 / new_orbit.a + new_orbit.epsilon))
     sinE = y0 / new_orbit.b
     E    = math.atan2(sinE, cosE)
     M    = E - new_orbit.epsilon * math.sin(E)
-    new_orbit.M0 = M - (2 * math.pi / new_orbit.period) * now
+    satellite.M0 = M - (2 * math.pi / new_orbit.period) * now
+    satellite.E, satellite.M = math.nan, math.nan
 
     satellite.orbit = new_orbit
     return True
+
+
+def _transfer_to_apsis(satellite, new_orbit, now, r_now, strategy, via):
+    # Hohmann o bi-el·líptica (maneuver.transfer_cost) des d'un àpside de
+    # l'òrbita actual. Cada mig tram d'el·lipse és una òrbita de transferència
+    # a la taula de la destinació (until/next a ORBIT_COLUMNS): el satèl·lit hi
+    # vola fins a l'instant until, passa a la següent i, en acabar, queda a
+    # new_orbit a l'àpside r2.
+    if abs(satellite.y) > APSIS_TOL:
+        return False
+    side = 1.0 if satellite.x > 0 else -1.0
+    orbit = satellite.orbit
+    dv, r2, _, rb = (float(v) for v in transfer_cost(
+        strategy, r_now, orbit.a, new_orbit.epsilon, new_orbit.a, via, orbit.epsilon, side))
+    m0 = satellite.mass
+    fuel_needed = float(fuel_for_dv(m0, dv))
+    if not satellite.fuel >= fuel_needed:
+        return False
+
+    satellite.mass  = m0 - fuel_needed
+    satellite.fuel -= fuel_needed
+
+    table = satellite._table.link
+    if new_orbit._table is not table:
+        table.adopt(new_orbit)
+    radii = [r_now, r2] if strategy == "hohmann" else [r_now, rb, r2]
+    t = now
+    legs = []
+    for k, (r_from, r_to) in enumerate(zip(radii, radii[1:]), 1):
+        a = (r_from + r_to) / 2
+        leg = Orbit(f"{new_orbit.name}~{k}", 2 * math.pi * math.sqrt(a**3 / MU),
+                    float(leg_epsilon(r_from, r_to, side)), a)
+        table.adopt(leg)
+        # x > 0 a M = 0, x < 0 a M = π
+        M0 = (0.0 if side > 0 else math.pi) - (2 * math.pi / leg.period) * t
+        if legs:
+            legs[-1].next, legs[-1].next_M0 = leg, M0
+        else:
+            satellite.M0 = M0
+        t += leg.period / 2
+        leg.until = t
+        legs.append(leg)
+        side = -side
+    legs[-1].next = new_orbit
+    legs[-1].next_M0 = (0.0 if side > 0 else math.pi) - (2 * math.pi / new_orbit.period) * t
+    satellite.E, satellite.M = math.nan, math.nan
+
+    satellite.orbit = legs[0]
+    return True
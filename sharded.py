@@ -0,0 +1,227 @@
+import argparse
+import multiprocessing as mp
+import os
+import time
+from multiprocessing.shared_memory import SharedMemory
+from threading import BrokenBarrierError
+import numpy as np
+from propagator import warm_start, kepler_E_batch
+
+# Propagació repartida entre processos. Els satèl·lits vius es divideixen en
+# `workers` trams contigus; els elements (de l'òrbita de cada satèl·lit), la
+# fase, l'estat del tic anterior (E, M) i les sortides (x, y, iterations) són
+# en un sol bloc de multiprocessing.shared_memory, de manera que per tic no es
+# serialitza res: el procés principal escriu el temps, allibera els treballadors
+# amb una barrera i espera que tots hi tornin.
+#
+# Cada treballador fa exactament les mateixes operacions que
+# update_all_positions sobre el seu tram, i la solució de Kepler de cada
+# element no depèn de la resta del lot, així que el resultat és idèntic bit a
+# bit al del camí d'un sol procés. Els efemèrides (space.ephemeris) no s'hi
+# fan servir.
+#
+# Com a space.propagator, update_all_positions crida update_positions(), que
+# copia a cada tic els elements, la fase i l'estat de l'espai (com els llegeix
+# el camí d'un sol procés) i reinicia els treballadors si la taula de
+# satèl·lits ha canviat d'estructura. step()/update() fan servir el que hi ha
+# a la memòria compartida; després d'un canvi a l'espai cal cridar reload().
+# Si un treballador mor o no torna a la barrera en `timeout` s, es tanca tot i
+# es llança RuntimeError.
+
+FIELDS = ("period", "epsilon", "a", "b", "M0", "E", "M", "x", "y")
+FLOAT = {name: k for k, name in enumerate(FIELDS)}
+TIMEOUT = 30.0           # s
+
+
+def _views(shm, n):
+    floats = np.ndarray((len(FIELDS), n), dtype=np.float64, buffer=shm.buf)
+    iterations = np.ndarray(n, dtype=np.int64, buffer=shm.buf, offset=floats.nbytes)
+    return floats, iterations
+
+
+def _worker(name, n, start, end, barrier, clock, stop):
+    shm = SharedMemory(name=name)
+    floats, iterations = _views(shm, n)
+    period, epsilon, a, b, M0, E, M, x, y = (row[start:end] for row in floats)
+    its = iterations[start:end]
+    try:
+        while True:
+            barrier.wait()
+            if stop.value:
+                break
+            t = clock.value
+            M_now = M0 + (2 * np.pi / period) * t
+            E0 = warm_start(M_now, epsilon, E, M)
+            E_now, count = kepler_E_batch(M_now, epsilon, E0=E0, return_iterations=True)
+            x[:] = a * (np.cos(E_now) - epsilon)
+            y[:] = b * np.sin(E_now)
+            E[:] = E_now
+            M[:] = M_now
+            its[:] = count
+            barrier.wait()
+    except BrokenBarrierError:
+        pass                             # el procés principal ha plegat
+    finally:
+        # les vistes han de desaparèixer abans de tancar el bloc
+        del floats, iterations, period, epsilon, a, b, M0, E, M, x, y, its
+        shm.close()
+
+
+class ShardedPropagator:
+    def __init__(self, space, workers=None, context="spawn", timeout=TIMEOUT):
+        self.space = space
+        self.workers = workers or os.cpu_count()
+        self.ctx = mp.get_context(context)
+        self.timeout = timeout
+        self.shm = None
+        self.processes = []
+        self.reload()
+
+    def reload(self):
+        # torna a llegir els satèl·lits vius de l'espai i reinicia els treballadors
+        self.close()
+        sats = self.space.satellite_table
+        self.rows = np.flatnonzero(sats.alive[:sats.n])
+        self.signature = (sats.n, sats.live)
+        self.names = sats.names
+        n = len(self.rows)
+        self.n = n
+        size = max(1, (len(FIELDS) + 1) * 8 * n)
+        self.shm = SharedMemory(create=True, size=size)
+        self.floats, self.iterations = _views(self.shm, n)
+        self._load()
+        self.iterations[:] = sats.col("iterations")[self.rows]
+
+        workers = max(1, min(self.workers, n))
+        bounds = np.linspace(0, n, workers + 1).astype(int)
+        self.barrier = self.ctx.Barrier(workers + 1)
+        self.clock = self.ctx.Value("d", 0.0, lock=False)
+        self.stop = self.ctx.Value("b", 0, lock=False)
+        self.processes = [self.ctx.Process(target=_worker, daemon=True,
+                                           args=(self.shm.name, n, int(lo), int(hi),
+                                                 self.barrier, self.clock, self.stop))
+                          for lo, hi in zip(bounds[:-1], bounds[1:])]
+        for p in self.processes:
+            p.start()
+
+    def _load(self):
+        # elements de l'òrbita de cada satèl·lit, fase i estat del tic anterior
+        sats = self.space.satellite_table
+        orbits = self.space.orbit_table
+        link = sats.col("orbit")[self.rows]
+        for name in ("period", "epsilon", "a", "b"):
+            np.take(orbits.data[name], link, out=self.floats[FLOAT[name]])
+        for name in ("M0", "E", "M", "x", "y"):
+            np.take(sats.col(name), self.rows, out=self.floats[FLOAT[name]])
+
+    def update_positions(self, space, time):
+        # interfície de space.propagator (vegeu update_all_positions)
+        sats = space.satellite_table
+        if (space is not self.space or self.shm is None or sats.names is not self.names
+                or (sats.n, sats.live) != self.signature):
+            self.space = space
+            self.reload()
+        else:
+            self._load()
+        self.update(time)
+
+    def _wait(self):
+        # un treballador mort o penjat no ha de deixar el procés principal
+        # esperant per sempre: es tanca tot i l'error arriba a qui crida
+        dead = [p for p in self.processes if not p.is_alive()]
+        if not dead:
+            try:
+                self.barrier.wait(self.timeout)
+                return
+            except BrokenBarrierError:
+                dead = [p for p in self.processes if not p.is_alive()]
+        codes = [p.exitcode for p in dead]
+        self.close()
+        if dead:
+            raise RuntimeError(f"propagació repartida: {len(dead)} treballadors aturats "
+                               f"(codis de sortida {codes})")
+        raise RuntimeError(f"propagació repartida: els treballadors no responen en {self.timeout} s")
+
+    def step(self, time):
+        # propaga tots els trams a `time`; les sortides queden a la memòria compartida
+        self.clock.value = time
+        self._wait()
+        self._wait()
+
+    def update(self, time):
+        # com update_all_positions: propaga i escriu x, y, E, M i iterations a l'espai
+        self.step(time)
+        sats = self.space.satellite_table
+        for name in ("E", "M", "x", "y"):
+            sats.data[name][self.rows] = self.floats[FLOAT[name]]
+        sats.data["iterations"][self.rows] = self.iterations
+
+    def positions(self):
+        # vistes (sense còpia) de x i y a la memòria compartida, en l'ordre de self.rows
+        return self.floats[FLOAT["x"]], self.floats[FLOAT["y"]]
+
+    def close(self):
+        if self.processes:
+            self.stop.value = 1
+            if not all(p.is_alive() for p in self.processes):
+                self.barrier.abort()
+            try:
+                self.barrier.wait(self.timeout)
+            except BrokenBarrierError:
+                pass
+            for p in self.processes:
+                p.join(self.timeout)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+            self.processes = []
+        if self.shm is not None:
+            self.floats = self.iterations = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+if __name__ == "__main__":
+    from space import update_all_positions
+    from synthetic import synthetic_space
+
+    parser = argparse.ArgumentParser(description="Escalat de la propagació repartida")
+    parser.add_argument("--satellites", type=int, default=1000000)
+    parser.add_argument("--ticks", type=int, default=20, help="almenys 3")
+    parser.add_argument("--dt", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, os.cpu_count()} - {0}))
+    args = parser.parse_args()
+
+    reference = synthetic_space(args.satellites)
+    update_all_positions(reference, 0.0)
+    start = time.perf_counter()
+    for k in range(1, args.ticks + 1):
+        update_all_positions(reference, k * args.dt)
+    serial = (time.perf_counter() - start) / args.ticks
+    print(f"1 procés (update_all_positions): {serial * 1e3:.1f} ms/tic")
+    expected = [reference.satellite_table.col(c).copy() for c in ("x", "y", "E", "iterations")]
+
+    for workers in args.workers:
+        space = synthetic_space(args.satellites)
+        update_all_positions(space, 0.0)
+        with ShardedPropagator(space, workers) as sharded:
+            # mateixa seqüència de tics que la referència; l'últim, per update()
+            sharded.step(1 * args.dt)
+            start = time.perf_counter()
+            for k in range(2, args.ticks):
+                sharded.step(k * args.dt)
+            tick = (time.perf_counter() - start) / max(args.ticks - 2, 1)
+            sharded.update(args.ticks * args.dt)
+        same = all(np.array_equal(e, space.satellite_table.col(c))
+                   for e, c in zip(expected, ("x", "y", "E", "iterations")))
+        print(f"{workers} processos: {tick * 1e3:.1f} ms/tic, acceleració {serial / tick:.2f}x, "
+              f"{'idèntic' if same else 'DIFERENT'}")
@@ -0,0 +1,172 @@
+import argparse
+import struct
+import numpy as np
+from space import Space, load_orbits, load_satellites, save_orbits, save_satellites
+
+# Format binari de captura d'un Space (little-endian):
+#
+#   capçalera (64 bytes): màgic, versió, època (s), nombre d'òrbites, nombre
+#                         de satèl·lits i mida en bytes de les dues taules de noms
+#   òrbites:    period, epsilon, a, b, M0, until (float64), next (int64),
+#               next_M0 (float64) i alive (uint8)
+#   satèl·lits: orbit (int64), mass, fuel, M0 (float64)
+#   noms:       noms d'òrbites i de satèl·lits en UTF-8 separats per "\n"
+#
+# Cada secció comença en un múltiple de 64 bytes, de manera que les columnes
+# es poden obrir directament com a vistes d'un numpy.memmap: obrir una
+# constel·lació gran no llegeix res fins que no es toca una pàgina. El mapa és
+# en mode còpia en escriptura; els canvis a l'espai no modifiquen el fitxer.
+
+MAGIC = b"ORBSNAP\0"
+VERSION = 2
+HEADER = struct.Struct("<8sIIdQQQQ")
+ALIGN = 64
+ORBIT_FIELDS = (("period", "<f8"), ("epsilon", "<f8"), ("a", "<f8"), ("b", "<f8"),
+                ("M0", "<f8"), ("until", "<f8"), ("next", "<i8"), ("next_M0", "<f8"),
+                ("alive", "u1"))
+# les captures de la versió 1 no tenen until, next ni next_M0
+ORBIT_FIELDS_V1 = tuple(f for f in ORBIT_FIELDS if f[0] not in ("until", "next", "next_M0"))
+SATELLITE_FIELDS = (("orbit", "<i8"), ("mass", "<f8"), ("fuel", "<f8"), ("M0", "<f8"))
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(n_orbits, n_satellites, orbit_names, satellite_names, orbit_fields=ORBIT_FIELDS):
+    # desplaçament de cada secció, en el mateix ordre en què s'escriuen
+    offsets = {}
+    offset = _aligned(HEADER.size)
+    for prefix, fields, count in (("orbit.", orbit_fields, n_orbits),
+                                  ("satellite.", SATELLITE_FIELDS, n_satellites)):
+        for name, dtype in fields:
+            offsets[prefix + name] = offset
+            offset = _aligned(offset + count * np.dtype(dtype).itemsize)
+    offsets["orbit.names"] = offset
+    offset = _aligned(offset + orbit_names)
+    offsets["satellite.names"] = offset
+    return offsets, offset + satellite_names
+
+
+def save_snapshot(space, filename, epoch=0.0):
+    orbits = space.orbit_table
+    sats = space.satellite_table
+    # es desen les òrbites vives i les mortes que encara fa servir algun satèl·lit
+    sat_rows = np.flatnonzero(sats.alive[:sats.n])
+    links = sats.col("orbit")[sat_rows]
+    keep = orbits.alive[:orbits.n].copy()
+    keep[links] = True
+    # i les òrbites on acaben les transferències en curs
+    following = orbits.col("next")[keep]
+    following = following[following >= 0]
+    while len(following) and not keep[following].all():
+        fresh = following[~keep[following]]
+        keep[fresh] = True
+        following = orbits.col("next")[fresh]
+        following = following[following >= 0]
+    orbit_rows = np.flatnonzero(keep)
+    mapping = np.full(orbits.n + 1, -1, dtype=np.int64)
+    mapping[orbit_rows] = np.arange(len(orbit_rows))
+
+    orbit_names = "\n".join(orbits.names[i] for i in orbit_rows.tolist()).encode("utf-8")
+    satellite_names = "\n".join(sats.names[i] for i in sat_rows.tolist()).encode("utf-8")
+    offsets, size = _layout(len(orbit_rows), len(sat_rows), len(orbit_names), len(satellite_names))
+    columns = {
+        "orbit.period": orbits.col("period")[orbit_rows],
+        "orbit.epsilon": orbits.col("epsilon")[orbit_rows],
+        "orbit.a": orbits.col("a")[orbit_rows],
+        "orbit.b": orbits.col("b")[orbit_rows],
+        "orbit.M0": orbits.col("M0")[orbit_rows],
+        "orbit.until": orbits.col("until")[orbit_rows],
+        "orbit.next": mapping[orbits.col("next")[orbit_rows]],
+        "orbit.next_M0": orbits.col("next_M0")[orbit_rows],
+        "orbit.alive": orbits.alive[:orbits.n][orbit_rows],
+        "satellite.orbit": mapping[links],
+        "satellite.mass": sats.col("mass")[sat_rows],
+        "satellite.fuel": sats.col("fuel")[sat_rows],
+        "satellite.M0": sats.col("M0")[sat_rows],
+    }
+    dtypes = {"orbit." + n: d for n, d in ORBIT_FIELDS}
+    dtypes.update({"satellite." + n: d for n, d in SATELLITE_FIELDS})
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, float(epoch), len(orbit_rows), len(sat_rows),
+                            len(orbit_names), len(satellite_names)))
+        for key, values in columns.items():
+            f.seek(offsets[key])
+            f.write(np.ascontiguousarray(values, dtype=dtypes[key]).tobytes())
+        f.seek(offsets["orbit.names"])
+        f.write(orbit_names)
+        f.seek(offsets["satellite.names"])
+        f.write(satellite_names)
+        f.truncate(size)
+
+
+def load_snapshot(filename):
+    # Retorna (space, època). Les columnes d'elements, massa i combustible són
+    # vistes del fitxer mapat; no es copien fins que l'espai no creix.
+    with open(filename, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{filename}: capçalera incompleta")
+    magic, version, _, epoch, n_orbits, n_satellites, orbit_bytes, satellite_bytes = \
+        HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{filename}: no és una captura d'òrbites")
+    if version not in (1, VERSION):
+        raise ValueError(f"{filename}: versió {version} no suportada")
+    orbit_fields = ORBIT_FIELDS if version == VERSION else ORBIT_FIELDS_V1
+    offsets, size = _layout(n_orbits, n_satellites, orbit_bytes, satellite_bytes, orbit_fields)
+    mm = np.memmap(filename, dtype=np.uint8, mode="c", shape=(size,))
+
+    def section(key, dtype, count):
+        start = offsets[key]
+        return mm[start:start + count * np.dtype(dtype).itemsize].view(dtype)
+
+    def names(key, nbytes, count):
+        if count == 0:
+            return []
+        start = offsets[key]
+        return bytes(mm[start:start + nbytes]).decode("utf-8").split("\n")
+
+    space = Space()
+    orbit_columns = {n: section("orbit." + n, d, n_orbits) for n, d in orbit_fields}
+    alive = orbit_columns.pop("alive")
+    space.orbit_table.attach(names("orbit.names", orbit_bytes, n_orbits), orbit_columns, alive)
+    space.satellite_table.attach(
+        names("satellite.names", satellite_bytes, n_satellites),
+        {n: section("satellite." + n, d, n_satellites) for n, d in SATELLITE_FIELDS})
+    return space, epoch
+
+
+def text_to_snapshot(orbits_file, satellites_file, filename, epoch=0.0):
+    space = Space()
+    load_orbits(space, orbits_file)
+    load_satellites(space, satellites_file)
+    save_snapshot(space, filename, epoch)
+    return space
+
+
+def snapshot_to_text(filename, orbits_file, satellites_file):
+    space, epoch = load_snapshot(filename)
+    save_orbits(space, orbits_file)
+    save_satellites(space, satellites_file)
+    return space, epoch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversió entre fitxers de text i captures binàries")
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_bin = commands.add_parser("to-bin", help="orbits.txt + satellites.txt -> captura")
+    to_bin.add_argument("orbits")
+    to_bin.add_argument("satellites")
+    to_bin.add_argument("snapshot")
+    to_bin.add_argument("--epoch", type=float, default=0.0)
+    to_text = commands.add_parser("to-text", help="captura -> orbits.txt + satellites.txt")
+    to_text.add_argument("snapshot")
+    to_text.add_argument("orbits")
+    to_text.add_argument("satellites")
+    args = parser.parse_args()
+    if args.command == "to-bin":
+        text_to_snapshot(args.orbits, args.satellites, args.snapshot, args.epoch)
+    else:
+        snapshot_to_text(args.snapshot, args.orbits, args.satellites)
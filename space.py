@@ -1,37 +1,188 @@
-from orbit import Orbit
-from satellite import Satellite
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+from itertools import islice
+import math
+import numpy as np
+from orbit import Orbit, ORBIT_COLUMNS
+from satellite import Satellite, SATELLITE_COLUMNS, change_orbit
+from store import Table, ViewList
+from propagator import warm_start, kepler_E_batch
 class Space:
     def __init__(self):
-        self.orbits=[]
-        self.satellites=[]
+        # taules columnars; orbits/satellites s'hi recorren com a llistes
+        self.orbit_table = Table(ORBIT_COLUMNS, Orbit, self_link="next")
+        self.satellite_table = Table(SATELLITE_COLUMNS, Satellite,
+                                     link=self.orbit_table, link_column="orbit")
+        self.orbits = ViewList(self.orbit_table)
+        self.satellites = ViewList(self.satellite_table)
+        # EphemerisCache opcional per evitar resoldre Kepler a cada tic
+        self.ephemeris = None
+        # NumericalPropagator opcional (numerical.py) en lloc de Kepler, o
+        # ShardedPropagator (sharded.py) per repartir Kepler entre processos
+        self.propagator = None
 
 def get_orbit(space, name):
-    for orbit in space.orbits:
-        if orbit.name == name:
-            return orbit
-    return None
+    i = space.orbit_table.find(name)
+    return space.orbit_table.get_view(i) if i >= 0 else None
+
+def get_satellite(space, name):
+    i = space.satellite_table.find(name)
+    return space.satellite_table.get_view(i) if i >= 0 else None
+
+def maneuver_satellite(space, satellite, orbit_name, period, epsilon, a, now,
+                       strategy="tangential", via=None):
+    # Passa `satellite` a una òrbita nova (orbit_name, period, epsilon, a) a
+    # l'instant now i fusiona les òrbites homònimes: els seus satèl·lits passen
+    # a la nova i les velles s'eliminen. Retorna False si no hi ha combustible
+    # o la maniobra no és possible, i llavors l'espai no canvia.
+    # La posició de partida es recalcula en fred a `now`, perquè la mateixa
+    # maniobra doni el mateix resultat en directe i en reproduir-la (timeline.py).
+    satellite.E, satellite.M = math.nan, math.nan
+    satellite.update_position(now)
+    new_orbit = Orbit(orbit_name, period, epsilon, a)
+    space.orbits.append(new_orbit)
+    if not change_orbit(satellite, new_orbit, now, strategy, via):
+        space.orbits.remove(new_orbit)
+        return False
+    orbits = space.orbit_table
+    sats = space.satellite_table
+    same = [orbits.get_view(i) for i in orbits.rows()
+            if orbits.names[i] == orbit_name and i != new_orbit._i]
+    if same:
+        links = sats.col("orbit")
+        links[np.isin(links, [o._i for o in same]) & sats.alive[:sats.n]] = new_orbit._i
+        # i també les òrbites de transferència que hi porten
+        following = orbits.col("next")
+        following[np.isin(following, [o._i for o in same])] = new_orbit._i
+        for o in same:
+            space.orbits.remove(o)
+    return True
+
+def satellite_elements(space):
+    # elements dels satèl·lits vius com a vectors: (files, període, epsilon, a, M0)
+    sats = space.satellite_table
+    rows = np.flatnonzero(sats.alive[:sats.n])
+    orbit = sats.col("orbit")[rows]
+    orbits = space.orbit_table
+    return (rows, orbits.data["period"][orbit], orbits.data["epsilon"][orbit],
+            orbits.data["a"][orbit], sats.col("M0")[rows])
 
 def update_all_positions(space, time):
-    for sat in space.satellites:
-        sat.update_position(time)
+    # Els termes que només depenen de l'òrbita (moviment mitjà·t, a, b, e) es
+    # calculen un cop per òrbita i es reparteixen als satèl·lits per índex;
+    # cada satèl·lit hi suma la seva fase i resol Kepler partint del seu E
+    # del tic anterior, de manera que un tren de satèl·lits sobre una mateixa
+    # òrbita costa una o dues iteracions vectorials per satèl·lit.
+    sats = space.satellite_table
+    if sats.live == 0:
+        return
+    _arrive(space, time)
+    if space.propagator is not None:
+        space.propagator.update_positions(space, time)
+        return
+    if space.ephemeris is not None:
+        space.ephemeris.update_positions(space, time)
+        return
+    orbits = space.orbit_table
+    m = orbits.n
+    motion = (2 * np.pi / orbits.data["period"][:m]) * time
+    rows = sats.col("orbit")
+    epsilon = orbits.data["epsilon"][:m][rows]
+    M = sats.col("M0") + motion[rows]
+    E0 = warm_start(M, epsilon, sats.col("E"), sats.col("M"))
+    E, iterations = kepler_E_batch(M, epsilon, E0=E0, return_iterations=True)
+    # directament sobre les columnes, sense temporals
+    x, y = sats.col("x"), sats.col("y")
+    np.cos(E, out=x)
+    x -= epsilon
+    x *= orbits.data["a"][:m][rows]
+    np.sin(E, out=y)
+    y *= orbits.data["b"][:m][rows]
+    sats.col("E")[:] = E
+    sats.col("M")[:] = M
+    sats.col("iterations")[:] = iterations
+
+def _arrive(space, time):
+    # els satèl·lits d'una òrbita de transferència acabada (until <= time)
+    # passen a la següent; les que ja no fa servir cap satèl·lit s'eliminen
+    orbits = space.orbit_table
+    until = orbits.col("until")
+    if not (until <= time).any():
+        return
+    sats = space.satellite_table
+    alive = sats.alive[:sats.n]
+    rows = sats.col("orbit")
+    due = alive & (until[rows] <= time)
+    while due.any():
+        old = rows[due]
+        rows[due] = orbits.col("next")[old]
+        sats.col("M0")[due] = orbits.col("next_M0")[old]
+        sats.col("E")[due] = np.nan
+        sats.col("M")[due] = np.nan
+        due &= until[rows] <= time
+    done = (until <= time) & orbits.alive[:orbits.n]
+    done[rows[alive]] = False
+    for orbit in [orbits.get_view(i) for i in np.flatnonzero(done).tolist()]:
+        space.orbits.remove(orbit)
+
+CHUNK_LINES = 65536
+MAX_REPORTED = 20
+
+def _read_chunks(source, chunk_size):
+    # accepta un nom de fitxer o un objecte fitxer ja obert; llegeix per blocs
+    # de línies perquè la memòria no depengui de la mida del catàleg
+    if isinstance(source, str):
+        with open(source, "r") as f:
+            yield from _read_chunks(f, chunk_size)
+        return
+    lineno = 1
+    while True:
+        lines = list(islice(source, chunk_size))
+        if not lines:
+            return
+        yield lineno, lines
+        lineno += len(lines)
 
-def load_orbits(space, filename):
+def _report(rejected, kind):
+    for lineno, line, reason in rejected[:MAX_REPORTED]:
+        print(f"ERROR {kind}, línia {lineno}: {reason}: {line!r}")
+    if len(rejected) > MAX_REPORTED:
+        print(f"ERROR {kind}: {len(rejected) - MAX_REPORTED} línies rebutjades més")
+
+def load_orbits(space, source, chunk_size=CHUNK_LINES):
+    # Retorna la llista de línies rebutjades com a (número, línia, motiu).
     space.orbits.clear()
+    rejected = []
     try:
-        with open(filename, "r") as f:
-            for line in f:
-                parts = line.strip().split()
+        for first, lines in _read_chunks(source, chunk_size):
+            names, periods, epsilons, axes = [], [], [], []
+            for lineno, line in enumerate(lines, first):
+                parts = line.split()
+                if not parts:
+                    continue
                 if len(parts) != 4:
+                    rejected.append((lineno, line.rstrip("\n"), "s'esperaven 4 camps"))
+                    continue
+                try:
+                    period, epsilon, a = float(parts[1]), float(parts[2]), float(parts[3])
+                except ValueError:
+                    rejected.append((lineno, line.rstrip("\n"), "valor numèric invàlid"))
                     continue
-                name, period, epsilon, a = parts
-                orbit = Orbit(name, float(period), float(epsilon), float(a))
-                space.orbits.append(orbit)
+                if not (period > 0 and a > 0 and 0 <= epsilon < 1):
+                    rejected.append((lineno, line.rstrip("\n"), "paràmetres d'òrbita fora de rang"))
+                    continue
+                names.append(parts[0])
+                periods.append(period)
+                epsilons.append(epsilon)
+                axes.append(a)
+            a = np.array(axes)
+            epsilon = np.array(epsilons)
+            space.orbit_table.extend(names, period=periods, epsilon=epsilon, a=a,
+                                     b=a * np.sqrt(1 - epsilon**2))
     except FileNotFoundError:
-        print(f"ERROR: No s'ha trobat el fitxer {filename}")
+        print(f"ERROR: No s'ha trobat el fitxer {source}")
     except Exception as e:
         print(f"ERROR llegint òrbites: {e}")
+    _report(rejected, "òrbites")
+    return rejected
 
 def save_orbits(space, filename):
     try:
@@ -41,57 +192,60 @@ def save_orbits(space, filename):
     except Exception as e:
         print(f"ERROR escrivint òrbites: {e}")
 
-def load_satellites(space, filename):
+def load_satellites(space, source, chunk_size=CHUNK_LINES):
+    # Les òrbites es resolen amb l'índex nom -> fila de space.orbit_table.
+    # Retorna la llista de línies rebutjades com a (número, línia, motiu).
     space.satellites.clear()
+    rejected = []
+    orbits = space.orbit_table
     try:
-        with open(filename, "r") as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) != 4:
+        for first, lines in _read_chunks(source, chunk_size):
+            names, rows, masses, fuels, phases = [], [], [], [], []
+            for lineno, line in enumerate(lines, first):
+                parts = line.split()
+                if not parts:
                     continue
-                name, orbit_name, mass, fuel = parts
-                orbit = get_orbit(space, orbit_name)
-                if orbit:
-                    satellite = Satellite(name, orbit, float(mass), float(fuel))
-                    space.satellites.append(satellite)
+                if len(parts) not in (4, 5):
+                    rejected.append((lineno, line.rstrip("\n"), "s'esperaven 4 o 5 camps"))
+                    continue
+                row = orbits.index.get(parts[1])
+                if row is None:
+                    rejected.append((lineno, line.rstrip("\n"), f"òrbita «{parts[1]}» desconeguda"))
+                    continue
+                try:
+                    mass, fuel = float(parts[2]), float(parts[3])
+                    # sense fase explícita el satèl·lit pren la de l'òrbita
+                    M0 = float(parts[4]) if len(parts) == 5 else orbits.data["M0"][row]
+                except ValueError:
+                    rejected.append((lineno, line.rstrip("\n"), "valor numèric invàlid"))
+                    continue
+                if not (mass > 0 and 0 <= fuel < mass and math.isfinite(mass) and math.isfinite(M0)):
+                    rejected.append((lineno, line.rstrip("\n"), "paràmetres de satèl·lit fora de rang"))
+                    continue
+                names.append(parts[0])
+                rows.append(row)
+                masses.append(mass)
+                fuels.append(fuel)
+                phases.append(M0)
+            space.satellite_table.extend(names, orbit=rows, mass=masses, fuel=fuels, M0=phases)
     except FileNotFoundError:
-        print(f"ERROR: No s'ha trobat el fitxer {filename}")
+        print(f"ERROR: No s'ha trobat el fitxer {source}")
     except Exception as e:
         print(f"ERROR llegint satèl·lits: {e}")
+    _report(rejected, "satèl·lits")
+    return rejected
 
 def save_satellites(space, filename):
     try:
         with open(filename, "w") as f:
             for sat in space.satellites:
-                f.write(f"{sat.name} {sat.orbit.name} {sat.mass} {sat.fuel}\n")
+                # la fase només s'escriu si no és zero
+                phase = f" {sat.M0}" if sat.M0 else ""
+                f.write(f"{sat.name} {sat.orbit.name} {sat.mass} {sat.fuel}{phase}\n")
     except Exception as e:
         print(f"ERROR escrivint satèl·lits: {e}")
 
 def plot_space(space):
-    fig, ax = plt.subplots(figsize=(8, 8))
-
-    terra = patches.Circle((0, 0), 6371, color='lightblue', label='Terra')
-    ax.add_patch(terra)
-
-    for orbit in space.orbits:
-        x_center = -orbit.a * orbit.epsilon
-        ellipse = patches.Ellipse(
-            (x_center, 0), width=2 * orbit.a, height=2 * orbit.b,
-            fill=False, color='blue', linestyle='--'
-        )
-        ax.add_patch(ellipse)
-
-    for sat in space.satellites:
-        x, y = sat.orbit.x, sat.orbit.y
-        ax.plot(x, y, 'ro')
-        ax.text(x + 300, y + 300, sat.name, fontsize=8)
-
-    ax.set_aspect('equal')
-    ax.set_xlabel("X (km)")
-    ax.set_ylabel("Y (km)")
-    ax.set_title("Òrbites i satèl·lits al voltant de la Terra")
-    ax.grid(True)
-    plt.legend()
-    plt.show()
-
-
+    # matplotlib només es carrega quan algú dibuixa (vegeu plotting.py)
+    from plotting import plot_space as plot
+    plot(space)
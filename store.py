@@ -0,0 +1,322 @@
+import weakref
+import numpy as np
+
+# Magatzem columnar (struct-of-arrays). Cada Table guarda els camps de totes
+# les files en vectors NumPy contigus, més una llista de noms i un índex
+# nom -> fila. Orbit i Satellite són vistes lleugeres (taula, fila) que només
+# es creen quan algú les demana.
+
+
+class View:
+    __slots__ = ("_table", "_i", "__weakref__")
+
+    @property
+    def name(self):
+        return self._table.names[self._i]
+
+    @name.setter
+    def name(self, value):
+        self._table.rename(self._i, value)
+
+
+def column(name, cast=float):
+    def fget(self):
+        return cast(self._table.data[name][self._i])
+
+    def fset(self, value):
+        self._table.data[name][self._i] = value
+
+    return property(fget, fset)
+
+
+class Table:
+    # columns: {nom: (tipus, valor per defecte)}. Si link no és None, la
+    # columna link_column conté índexs de files de la taula link; self_link és
+    # una columna amb índexs de files d'aquesta mateixa taula (-1 = cap).
+    def __init__(self, columns, view, capacity=16, link=None, link_column=None, self_link=None):
+        self.columns = columns
+        self.view = view
+        self.link = link
+        self.link_column = link_column
+        self.self_link = self_link
+        self.referrers = weakref.WeakSet()
+        if link is not None:
+            link.referrers.add(self)
+        self.n = 0
+        self.live = 0
+        self.names = []
+        self.index = {}
+        self.duplicates = 0
+        self.views = weakref.WeakValueDictionary()
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.data = {c: np.full(capacity, default, dtype=kind)
+                     for c, (kind, default) in columns.items()}
+
+    def __len__(self):
+        return self.live
+
+    def col(self, name):
+        return self.data[name][:self.n]
+
+    def reserve(self, size):
+        capacity = len(self.alive)
+        if size <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < size:
+            capacity *= 2
+        for c, (kind, default) in self.columns.items():
+            grown = np.full(capacity, default, dtype=kind)
+            grown[:self.n] = self.data[c][:self.n]
+            self.data[c] = grown
+        grown = np.zeros(capacity, dtype=bool)
+        grown[:self.n] = self.alive[:self.n]
+        self.alive = grown
+
+    def add(self, name, view=None, **values):
+        i = self.n
+        self.reserve(i + 1)
+        for c, value in values.items():
+            self.data[c][i] = value
+        self.alive[i] = True
+        self.names.append(name)
+        self.n += 1
+        self.live += 1
+        self._index_name(name, i)
+        if view is not None:
+            view._table, view._i = self, i
+            self.views[i] = view
+        return i
+
+    def extend(self, names, **arrays):
+        start = self.n
+        count = len(names)
+        self.reserve(start + count)
+        for c, values in arrays.items():
+            self.data[c][start:start + count] = values
+        self.alive[start:start + count] = True
+        self.names.extend(names)
+        self.n += count
+        self.live += count
+        # dict() sobre la seqüència invertida deixa la primera aparició de cada nom
+        rows = range(start, start + count)
+        fresh = dict(zip(reversed(names), reversed(rows)))
+        taken = fresh.keys() & self.index.keys()
+        for name in taken:
+            del fresh[name]
+        self.duplicates += count - len(fresh)
+        self.index.update(fresh)
+        return rows
+
+    def attach(self, names, arrays, alive=None):
+        # substitueix el contingut per columnes ja construïdes (p. ex. vistes
+        # d'un numpy.memmap) sense copiar-les; la resta s'omplen per defecte
+        n = len(names)
+        for c, (kind, default) in self.columns.items():
+            if c in arrays:
+                self.data[c] = arrays[c]
+            else:
+                self.data[c] = np.full(n, default, dtype=kind)
+        self.alive = np.ones(n, dtype=bool) if alive is None else np.array(alive, dtype=bool)
+        self.n = n
+        self.live = int(np.count_nonzero(self.alive))
+        self.names = list(names)
+        self.views = weakref.WeakValueDictionary()
+        self._reindex()
+
+    def get_view(self, i):
+        view = self.views.get(i)
+        if view is None:
+            view = self.view.__new__(self.view)
+            view._table, view._i = self, i
+            self.views[i] = view
+        return view
+
+    def find(self, name):
+        return self.index.get(name, -1)
+
+    def rows(self):
+        if self.live == self.n:
+            return range(self.n)
+        return np.flatnonzero(self.alive[:self.n]).tolist()
+
+    def rename(self, i, name):
+        old = self.names[i]
+        self.names[i] = name
+        if self.alive[i]:
+            self._unindex_name(old, i)
+            self._index_name(name, i)
+
+    def adopt(self, view):
+        # copia la fila de la vista a aquesta taula i hi reenllaça la vista
+        src, j = view._table, view._i
+        values = {c: src.data[c][j] for c in self.columns}
+        if self.link is not None:
+            target = src.link.get_view(int(values[self.link_column]))
+            if target._table is not self.link:
+                self.link.adopt(target)
+            values[self.link_column] = target._i
+        if self.self_link is not None:
+            values[self.self_link] = -1
+            k = int(src.data[self.self_link][j]) if src.self_link is not None else -1
+            if k >= 0 and k != j:
+                target = src.get_view(k)
+                if target._table is not self:
+                    self.adopt(target)
+                values[self.self_link] = target._i
+        if src.alive[j]:
+            src.kill(j)
+        src.views.pop(j, None)
+        i = self.add(src.names[j], view=view, **values)
+        # les taules que només apunten a aquesta fila (p. ex. la privada d'un
+        # satèl·lit creat abans d'afegir la seva òrbita) passen a apuntar aquí
+        for ref in list(src.referrers):
+            links = ref.data[ref.link_column][:ref.n]
+            if ref is not self and ref.n and (links == j).all():
+                src.referrers.discard(ref)
+                ref.link = self
+                self.referrers.add(ref)
+                links[:] = i
+        return i
+
+    def kill(self, i):
+        self.alive[i] = False
+        self.live -= 1
+        self._unindex_name(self.names[i], i)
+
+    def remove(self, i):
+        self.kill(i)
+        if self.n - self.live > max(16, self.live):
+            self.compact()
+
+    def clear(self):
+        self.alive[:self.n] = False
+        self.live = 0
+        self.index.clear()
+        self.duplicates = 0
+        self.compact()
+
+    def compact(self):
+        # elimina les files mortes que ja no referencia cap altra taula; les
+        # vistes encara vives d'aquestes files passen a una taula pròpia
+        keep = self.alive[:self.n].copy()
+        for links in self._links():
+            keep[links[links >= 0]] = True
+        if self.self_link is not None:
+            links = self.col(self.self_link)[self.alive[:self.n]]
+            keep[links[links >= 0]] = True
+        if keep.all():
+            return
+        for i, view in list(self.views.items()):
+            if not keep[i]:
+                self._detach(view)
+        rows = np.flatnonzero(keep)
+        mapping = np.full(self.n + 1, -1, dtype=np.int64)
+        mapping[rows] = np.arange(len(rows))
+        for c in self.columns:
+            self.data[c][:len(rows)] = self.data[c][rows]
+        self.alive[:len(rows)] = self.alive[rows]
+        self.alive[len(rows):self.n] = False
+        self.names = [self.names[i] for i in rows.tolist()]
+        views = weakref.WeakValueDictionary()
+        for i, view in list(self.views.items()):
+            view._i = int(mapping[i])
+            views[view._i] = view
+        self.views = views
+        self.n = len(rows)
+        for links in self._links():
+            links[:] = mapping[links]
+        if self.self_link is not None:
+            links = self.col(self.self_link)
+            links[:] = mapping[links]
+        self._reindex()
+        if self.link is not None and self.link.n > self.link.live:
+            self.link.compact()
+
+    def _links(self):
+        # columnes d'altres taules amb índexs de files d'aquesta
+        return [ref.data[ref.link_column][:ref.n] for ref in list(self.referrers)]
+
+    def _detach(self, view):
+        i = view._i
+        private = Table(self.columns, self.view, capacity=1, link=self.link,
+                        link_column=self.link_column, self_link=self.self_link)
+        values = {c: self.data[c][i] for c in self.columns}
+        if self.self_link is not None:
+            values[self.self_link] = -1
+        private.add(self.names[i], view=view, **values)
+        if not self.alive[i]:
+            private.kill(0)
+        del self.views[i]
+
+    def _index_name(self, name, i):
+        if name in self.index:
+            self.duplicates += 1
+        else:
+            self.index[name] = i
+
+    def _unindex_name(self, name, i):
+        if self.index.get(name) != i:
+            return
+        del self.index[name]
+        if self.duplicates:
+            for j in range(i + 1, self.n):
+                if self.alive[j] and self.names[j] == name:
+                    self.index[name] = j
+                    self.duplicates -= 1
+                    break
+
+    def _reindex(self):
+        rows = np.flatnonzero(self.alive[:self.n]).tolist()
+        names = [self.names[i] for i in rows]
+        self.index = dict(zip(reversed(names), reversed(rows)))
+        self.duplicates = len(rows) - len(self.index)
+
+
+class ViewList:
+    # Vista amb interfície de llista sobre les files vives d'una taula, perquè
+    # space.orbits / space.satellites es continuïn fent servir com abans.
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.live
+
+    def __iter__(self):
+        table = self.table
+        for i in table.rows():
+            yield table.get_view(i)
+
+    def __getitem__(self, k):
+        rows = self.table.rows()
+        if isinstance(k, slice):
+            return [self.table.get_view(i) for i in rows[k]]
+        return self.table.get_view(rows[k])
+
+    def __contains__(self, view):
+        return getattr(view, "_table", None) is self.table and bool(self.table.alive[view._i])
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, view):
+        if view in self:
+            return
+        self.table.adopt(view)
+
+    def extend(self, views):
+        for view in views:
+            self.append(view)
+
+    def remove(self, view):
+        if view not in self:
+            raise ValueError(f"{view.name!r} no és a la llista")
+        self.table.remove(view._i)
+
+    def index(self, view):
+        if view not in self:
+            raise ValueError(f"{view.name!r} no és a la llista")
+        return self.table.rows().index(view._i)
+
+    def clear(self):
+        self.table.clear()
@@ -0,0 +1,30 @@
+import numpy as np
+from space import Space
+
+MU = 3.986e5          # km³/s²
+EARTH_R = 6371.0      # km
+
+# Constel·lacions sintètiques per a proves de rendiment: òrbites entre LEO i
+# GEO amb el període de la tercera llei de Kepler i satèl·lits repartits a
+# l'atzar (fase, massa i combustible) entre aquestes òrbites.
+
+
+def synthetic_space(n_satellites, n_orbits=None, seed=0):
+    rng = np.random.default_rng(seed)
+    if n_orbits is None:
+        n_orbits = max(1, min(1000, n_satellites // 50))
+    space = Space()
+    a = EARTH_R + rng.uniform(400, 36000, n_orbits)
+    # la majoria gairebé circulars, alguna d'excèntrica (perigeu per sobre de 400 km)
+    epsilon = np.where(rng.random(n_orbits) < 0.9, rng.uniform(0, 0.01, n_orbits),
+                       rng.uniform(0, 0.3, n_orbits))
+    epsilon = np.minimum(epsilon, 1 - (EARTH_R + 400) / a)
+    period = 2 * np.pi * np.sqrt(a**3 / MU)
+    space.orbit_table.extend([f"ORB{i}" for i in range(n_orbits)], period=period,
+                             epsilon=epsilon, a=a, b=a * np.sqrt(1 - epsilon**2))
+    mass = rng.uniform(100, 2000, n_satellites)
+    space.satellite_table.extend([f"SAT{i}" for i in range(n_satellites)],
+                                 orbit=rng.integers(0, n_orbits, n_satellites),
+                                 mass=mass, fuel=mass * rng.uniform(0.1, 0.4, n_satellites),
+                                 M0=rng.uniform(0, 2 * np.pi, n_satellites))
+    return space
@@ -0,0 +1,55 @@
+import csv
+import numpy as np
+import pytest
+from batch import propagate_to_file, read_trajectory
+from space import update_all_positions
+from synthetic import synthetic_space
+
+
+def expected(start, stop, step, n=30):
+    space = synthetic_space(n, 4, seed=2)
+    times = np.arange(start, stop + step / 2, step)
+    rows = []
+    for t in times:
+        update_all_positions(space, t)
+        rows.append([(s.name, s.x, s.y) for s in space.satellites])
+    return times, rows
+
+
+@pytest.mark.parametrize("chunk", [1, 4, 256])
+def test_binary_output_reads_back(tmp_path, chunk):
+    out = str(tmp_path / "traj.bin")
+    steps, _ = propagate_to_file(synthetic_space(30, 4, seed=2), 0.0, 900.0, 60.0, out,
+                                 fmt="bin", chunk=chunk)
+    times, rows = expected(0.0, 900.0, 60.0)
+    assert steps == len(times) == 16
+    names, chunks = read_trajectory(out)
+    read = list(chunks)
+    assert names == [name for name, _, _ in rows[0]]
+    assert len(read) == -(-steps // chunk)
+    t = np.concatenate([c[0] for c in read])
+    x = np.concatenate([c[1] for c in read])
+    y = np.concatenate([c[2] for c in read])
+    assert np.array_equal(t, times)
+    assert np.array_equal(x, [[r[1] for r in row] for row in rows])
+    assert np.array_equal(y, [[r[2] for r in row] for row in rows])
+
+
+def test_csv_output_has_one_row_per_satellite_and_step(tmp_path):
+    out = tmp_path / "traj.csv"
+    propagate_to_file(synthetic_space(30, 4, seed=2), 0.0, 300.0, 60.0, str(out), chunk=4)
+    times, rows = expected(0.0, 300.0, 60.0)
+    with open(out) as f:
+        lines = list(csv.DictReader(f))
+    assert len(lines) == len(times) * 30
+    for line, (t, (name, x, y)) in zip(lines, ((t, r) for t, row in zip(times, rows) for r in row)):
+        assert float(line["time"]) == t and line["satellite"] == name
+        assert float(line["x"]) == pytest.approx(x, abs=1e-6)
+        assert float(line["y"]) == pytest.approx(y, abs=1e-6)
+
+
+def test_foreign_trajectory_is_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        read_trajectory(str(path))
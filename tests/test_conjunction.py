@@ -0,0 +1,71 @@
+import math
+from collections import Counter
+import pytest
+from conjunction import screen_conjunctions, screen_conjunctions_brute
+from orbit import Orbit
+from satellite import Satellite
+from space import Space
+
+MU = 398600.4418
+
+
+def make_orbit(name, rp, ra):
+    a = (rp + ra) / 2
+    return Orbit(name, 2 * math.pi * math.sqrt(a**3 / MU), (ra - rp) / (ra + rp), a)
+
+
+@pytest.fixture
+def crossing():
+    # A i B: veïns a 6.988 km sobre la mateixa òrbita circular; Z*: un tren
+    # sobre una el·líptica que talla la circular; Z0 hi passa alhora que A
+    space = Space()
+    circle = make_orbit("C", 7000, 7000)
+    ellipse = make_orbit("X", 6600, 7400)
+    space.orbits.extend([circle, ellipse])
+    theta = math.atan2(ellipse.b, -ellipse.a * ellipse.epsilon)
+    t_cross = theta / (2 * math.pi / circle.period)
+    M0 = math.pi / 2 - ellipse.epsilon - 2 * math.pi / ellipse.period * t_cross
+    space.satellites.extend([Satellite("A", circle, 100, 10, 0.0),
+                             Satellite("B", circle, 100, 10, 6.988 / 7000)])
+    space.satellites.extend([Satellite(f"Z{k}", ellipse, 100, 10, M0 + k * 0.0004)
+                             for k in range(5)])
+    return space, t_cross
+
+
+def pairs(reports):
+    return Counter((s1.name, s2.name) for _, _, s1, s2 in reports)
+
+
+def test_co_orbital_neighbours_are_one_approach(crossing):
+    space, _ = crossing
+    reports = screen_conjunctions(space, 0.0, 6000.0, 20.0)
+    counts = pairs(reports)
+    assert counts[("A", "B")] == 1
+    assert max(counts.values()) == 1
+    (_, miss, _, _), = [r for r in reports if (r[2].name, r[3].name) == ("A", "B")]
+    assert miss == pytest.approx(6.988, abs=1e-2)
+
+
+def test_grid_matches_brute_force(crossing):
+    space, t_cross = crossing
+    grid = screen_conjunctions(space, 0.0, 6000.0, 20.0)
+    brute = screen_conjunctions_brute(space, 0.0, 6000.0, 20.0)
+    assert pairs(grid) == pairs(brute)
+    # A-B, A-Z*, B-Z* i les parelles del tren de Z, una vegada cadascuna
+    assert len(grid) == 21
+    for g, b in zip(grid, brute):
+        assert g[2] is b[2] and g[3] is b[3]
+        assert g[0] == pytest.approx(b[0], abs=1e-3)
+        assert g[1] == pytest.approx(b[1], abs=1e-6)
+    # Z0 arriba a la intersecció alhora que A
+    (tca, miss, _, _), = [r for r in grid if (r[2].name, r[3].name) == ("A", "Z0")]
+    assert tca == pytest.approx(t_cross, abs=1.0)
+    assert miss < 0.1
+
+
+def test_far_apart_orbits_have_no_approaches():
+    space = Space()
+    low, high = make_orbit("LEO", 7000, 7000), make_orbit("GEO", 42164, 42164)
+    space.orbits.extend([low, high])
+    space.satellites.extend([Satellite("L", low, 100, 10), Satellite("G", high, 100, 10)])
+    assert screen_conjunctions(space, 0.0, 86400.0, 50.0) == []
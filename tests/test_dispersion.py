@@ -0,0 +1,58 @@
+import math
+import numpy as np
+import pytest
+from dispersion import disperse
+from orbit import Orbit
+from satellite import Satellite
+from space import Space, update_all_positions
+from synthetic import synthetic_space
+
+TIMES = (0.0, 600.0, 3600.0, 86400.0)
+
+
+def test_zero_sigma_collapses_to_nominal():
+    space = synthetic_space(20, 4, seed=6)
+    result = disperse(space, TIMES, samples=16)
+    for k, t in enumerate(TIMES):
+        update_all_positions(space, t)
+        nominal = np.array([(s.x, s.y) for s in space.satellites])
+        assert result.nominal[k] == pytest.approx(nominal, abs=1e-6)
+        assert result.mean[k] == pytest.approx(result.nominal[k], abs=1e-6)
+    assert np.abs(result.covariance).max() < 1e-9
+    assert np.abs(result.percentiles).max() < 1e-6
+
+
+def test_phase_error_on_circular_orbit():
+    # en una òrbita circular la distància a la nominal és 2a·sin(|δ|/2) ≈ a·|δ|
+    space = Space()
+    orbit = Orbit("C", 6000.0, 0.0, 7000.0)
+    space.orbits.append(orbit)
+    space.satellites.append(Satellite("S", orbit, 100.0, 10.0, 0.0))
+    sigma = 1e-3
+    result = disperse(space, TIMES, sigma_M0=sigma, samples=20000, levels=(50.0, 95.0))
+    assert result.percentiles[:, 0, 0] == pytest.approx(7000.0 * sigma * 0.6745, rel=0.05)
+    assert result.percentiles[:, 0, 1] == pytest.approx(7000.0 * sigma * 1.96, rel=0.05)
+    # la variància total és a²σ²
+    trace = result.covariance[:, 0, 0, 0] + result.covariance[:, 0, 1, 1]
+    assert trace == pytest.approx((7000.0 * sigma)**2, rel=0.05)
+
+
+def test_semi_major_axis_error_drifts_with_time():
+    space = synthetic_space(5, 2, seed=7)
+    result = disperse(space, TIMES, sigma_a=0.5, samples=2000)
+    median = result.percentiles[:, :, 0]
+    assert (np.diff(median, axis=0) > 0).all()
+    # sense la tercera llei de Kepler no hi ha deriva de fase
+    flat = disperse(space, TIMES, sigma_a=0.5, samples=2000, kepler_period=False)
+    assert flat.percentiles[-1, :, 0].max() < 1.0 < median[-1].min()
+
+
+def test_selected_satellites_and_blocks():
+    space = synthetic_space(12, 3, seed=8)
+    chosen = [space.satellites[3], space.satellites[9]]
+    result = disperse(space, TIMES, satellites=chosen, samples=4, block=4)
+    assert result.satellites == ["SAT3", "SAT9"]
+    assert result.nominal.shape == (len(TIMES), 2, 2)
+    full = disperse(space, TIMES, samples=4)
+    assert result.nominal == pytest.approx(full.nominal[:, [3, 9]])
+    assert math.isfinite(result.percentiles.sum())
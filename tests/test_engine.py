@@ -0,0 +1,75 @@
+import time
+import numpy as np
+from engine import SimulationEngine
+from orbit import Orbit
+from satellite import Satellite
+from space import Space, update_all_positions
+
+
+def constellation(n):
+    space = Space()
+    space.orbits.extend([Orbit("LOW", 5800.0, 0.01, 6900.0), Orbit("HIGH", 43000.0, 0.2, 26000.0)])
+    space.satellites.extend(Satellite(f"S{k}", space.orbits[k % 2], 100.0, 10.0, 0.3 * k)
+                            for k in range(n))
+    return space
+
+
+def test_step_publishes_a_copy_of_the_positions():
+    engine = SimulationEngine(constellation(30))
+    assert engine.latest() is None
+    engine.set_time(500.0)
+    t, x, y = engine.latest()
+    reference = constellation(30)
+    update_all_positions(reference, 500.0)
+    assert t == 500.0
+    assert np.array_equal(x, reference.satellite_table.col("x"))
+    assert np.array_equal(y, reference.satellite_table.col("y"))
+    # el tic següent escriu a l'altre buffer i no toca la còpia llegida
+    engine.set_time(900.0)
+    assert engine.latest()[0] == 900.0
+    assert np.array_equal(x, reference.satellite_table.col("x"))
+    assert engine._buffers[0] is not engine._buffers[1]
+
+
+def test_removed_satellites_are_not_published():
+    space = constellation(10)
+    engine = SimulationEngine(space)
+    with engine.lock:
+        space.satellites.remove(space.satellites[4])
+    engine.set_time(60.0)
+    _, x, _ = engine.latest()
+    assert len(x) == 9
+
+
+def test_thread_advances_time_until_stopped():
+    engine = SimulationEngine(constellation(10), speed=100.0, rate=200.0)
+    engine.start()
+    try:
+        deadline = time.perf_counter() + 5.0
+        while engine.steps < 5 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        engine.pause()
+        with engine.lock:
+            paused = engine.time
+        time.sleep(0.05)
+        assert engine.steps >= 5 and engine.time == paused > 0.0
+    finally:
+        engine.stop()
+    assert not engine.running
+
+
+def test_catalog_changes_only_with_the_table_structure():
+    space = constellation(6)
+    engine = SimulationEngine(space)
+    engine.set_time(10.0)
+    _, _, _, catalog, names = engine.latest(names=True)
+    assert names == [f"S{k}" for k in range(6)]
+    engine.set_time(20.0)
+    assert engine.latest(names=True)[3:] == (catalog, names)
+    with engine.lock:
+        space.satellites.remove(space.satellites[2])
+    engine.set_time(30.0)
+    _, x, _, changed, fresh = engine.latest(names=True)
+    assert changed > catalog and len(fresh) == len(x) == 5 and "S2" not in fresh
+    # la llista publicada abans no es modifica
+    assert names == [f"S{k}" for k in range(6)]
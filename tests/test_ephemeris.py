@@ -0,0 +1,30 @@
+import numpy as np
+from ephemeris import EphemerisCache
+from propagator import kepler_E_batch
+
+
+def shape(epsilon, a):
+    return epsilon, a, a * np.sqrt(1 - epsilon**2)
+
+
+def test_lookup_is_within_tolerance():
+    cache = EphemerisCache(tol=1e-3)
+    M = np.linspace(-10.0, 10.0, 5001)
+    for epsilon, a in ((0.001, 6800.0), (0.3, 12000.0), (0.7, 26600.0)):
+        x, y = cache.lookup(*shape(epsilon, a), M)
+        E = kepler_E_batch(M, epsilon)
+        # tol és per coordenada, verificada entre nodes
+        assert np.abs(x - a * (np.cos(E) - epsilon)).max() < 1.5e-3
+        assert np.abs(y - a * np.sqrt(1 - epsilon**2) * np.sin(E)).max() < 1.5e-3
+
+
+def test_least_recently_used_table_is_evicted():
+    cache = EphemerisCache(tol=1e-3)
+    first, second, third = (shape(e, 7000.0) for e in (0.001, 0.002, 0.003))
+    # hi caben dues taules (de la mateixa mida) i prou
+    cache.max_bytes = cache.table(*first).nbytes + cache.table(*second).nbytes
+    cache.table(*first)                  # la primera passa a ser la més recent
+    cache.table(*third)
+    assert list(cache.entries) == [first, third]
+    assert cache.nbytes == sum(t.nbytes for t in cache.entries.values())
+    assert (cache.hits, cache.misses) == (1, 3)
@@ -0,0 +1,75 @@
+import math
+import pytest
+from events import Proximity, RadiusCrossing, SectorCrossing, find_events, find_events_sampled
+from orbit import Orbit
+from satellite import Satellite
+from space import Space
+
+MU = 398600.4418
+
+
+def make_orbit(name, rp, ra):
+    a = (rp + ra) / 2
+    return Orbit(name, 2 * math.pi * math.sqrt(a**3 / MU), (ra - rp) / (ra + rp), a)
+
+
+@pytest.fixture
+def flyby():
+    # A, circular a 6800 km, i un tren Z d'una el·líptica (6500 x 20000 km) que
+    # la talla a t = 1000 s prop del perigeu: finestres de 25 km d'uns 10-40 s,
+    # molt més curtes que el pas per defecte (període / 64)
+    space = Space()
+    circle, ellipse = make_orbit("C", 6800, 6800), make_orbit("X", 6500, 20000)
+    space.orbits.extend([circle, ellipse])
+    E = math.acos((1 - 6800 / ellipse.a) / ellipse.epsilon)
+    x, y = ellipse.a * (math.cos(E) - ellipse.epsilon), ellipse.b * math.sin(E)
+    t_cross = 1000.0
+    MA = math.atan2(y, x) - 2 * math.pi / circle.period * t_cross
+    MZ = E - ellipse.epsilon * math.sin(E) - 2 * math.pi / ellipse.period * t_cross
+    space.satellites.append(Satellite("A", circle, 100, 10, MA))
+    space.satellites.extend([Satellite(f"Z{k}", ellipse, 100, 10, MZ + (k - 3) * 0.0005)
+                             for k in range(7)])
+    return space
+
+
+def test_short_proximity_windows_match_fine_sampling(flyby):
+    sats = list(flyby.satellites)
+    definitions = [Proximity([(sats[0], z) for z in sats[1:]], 25.0)]
+    events = find_events(flyby, 0.0, 3000.0, definitions)
+    sampled = find_events_sampled(flyby, 0.0, 3000.0, definitions, 0.05)
+    assert len(events) == len(sampled) == 14
+    for (t, _, label, channel), (ts, _, label_s, channel_s) in zip(events, sampled):
+        assert (label, channel) == (label_s, channel_s)
+        assert t == pytest.approx(ts, abs=0.05)
+
+
+def test_radius_crossings_of_an_ellipse(flyby):
+    ellipse = flyby.orbit_table.get_view(flyby.orbit_table.find("X"))
+    z = [s for s in flyby.satellites if s.name == "Z3"]
+    events = find_events(flyby, 0.0, 3 * ellipse.period, [RadiusCrossing(ellipse.a, z)])
+    sampled = find_events_sampled(flyby, 0.0, 3 * ellipse.period, [RadiusCrossing(ellipse.a, z)], 1.0)
+    # r = a quan E = ±π/2: dues vegades per òrbita, alternant el sentit
+    assert [e[2] for e in events] == [e[2] for e in sampled]
+    assert len(events) == 6
+    assert {events[0][2], events[1][2]} == {"outward", "inward"}
+    for (t, _, _, (sat,)), (ts, _, _, _) in zip(events, sampled):
+        assert math.hypot(*sat.orbit.state_at(t, sat.M0)[:2]) == pytest.approx(ellipse.a, abs=1e-3)
+        assert t == pytest.approx(ts, abs=1.0)
+
+
+def test_sector_crossings_of_a_circular_orbit(flyby):
+    circle = flyby.orbit_table.get_view(flyby.orbit_table.find("C"))
+    a = [s for s in flyby.satellites if s.name == "A"]
+    sector = SectorCrossing(math.pi, math.radians(10), a)
+    events = find_events(flyby, 0.0, circle.period, [sector])
+    assert sorted(e[2] for e in events) == ["enter", "exit"]
+    # a velocitat angular constant el sector de 20° dura 20/360 del període
+    enter, = [t for t, _, label, _ in events if label == "enter"]
+    exit, = [t for t, _, label, _ in events if label == "exit"]
+    assert (exit - enter) % circle.period == pytest.approx(circle.period / 18, abs=1e-2)
+
+
+def test_unknown_satellite_is_rejected(flyby):
+    stranger = Satellite("S", make_orbit("O", 7000, 7000), 100, 10)
+    with pytest.raises(ValueError):
+        find_events(flyby, 0.0, 100.0, [RadiusCrossing(7000, [stranger])])
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from engine import SimulationEngine
+from feed import CATALOG, DELTA, KEY, QUANTUM, FeedDecoder, FeedServer, read_frame
+from synthetic import synthetic_space
+
+
+@pytest.fixture
+def served():
+    space = synthetic_space(50)
+    engine = SimulationEngine(space)
+    engine.set_time(0.0)
+    server = FeedServer(engine, rate=100.0)
+    address = server.start_in_thread()
+    yield space, engine, address
+    server.stop_thread()
+
+
+def positions(space, names):
+    sats = {s.name: s for s in space.satellites}
+    return np.array([sats[n].x for n in names]), np.array([sats[n].y for n in names])
+
+
+def test_malformed_requests_are_ignored_and_frames_decode(served):
+    space, engine, (host, port) = served
+    wanted = [space.satellites[3].name, space.satellites[7].name]
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        # cap d'aquestes no ha de tombar la connexió ni subscriure res
+        for bad in ([1, 2], "SAT", 3, {"subscribe": wanted[0]}, {"subscribe": [1, 2]},
+                    {"other": None}):
+            writer.write((json.dumps(bad) + "\n").encode())
+        writer.write(b"no json\n")
+        writer.write((json.dumps({"subscribe": wanted}) + "\n").encode())
+        await writer.drain()
+        decoder = FeedDecoder()
+        kinds = []
+        header, payload = await asyncio.wait_for(read_frame(reader), 5)
+        kinds.append(header[2])
+        assert decoder.decode(header, payload) is None
+        assert decoder.names == wanted
+        header, payload = await asyncio.wait_for(read_frame(reader), 5)
+        kinds.append(header[2])
+        _, t, x, y = decoder.decode(header, payload)
+        ex, ey = positions(space, wanted)
+        assert np.abs(x - ex).max() <= QUANTUM / 2 + 1e-9
+        assert np.abs(y - ey).max() <= QUANTUM / 2 + 1e-9
+        # el tic següent arriba com a delta sobre l'anterior
+        engine.set_time(1.0)
+        header, payload = await asyncio.wait_for(read_frame(reader), 5)
+        kinds.append(header[2])
+        _, t, x, y = decoder.decode(header, payload)
+        assert t == 1.0
+        ex, ey = positions(space, wanted)
+        assert np.abs(x - ex).max() <= QUANTUM / 2 + 1e-9
+        assert np.abs(y - ey).max() <= QUANTUM / 2 + 1e-9
+        writer.close()
+        return kinds
+
+    assert asyncio.run(client()) == [CATALOG, KEY, DELTA]
+
+
+def test_delta_without_key_is_rejected():
+    decoder = FeedDecoder()
+    header = (b"ORBF", 1, DELTA, 1, 0.0, QUANTUM, 1, 4)
+    with pytest.raises(ValueError):
+        decoder.decode(header, np.zeros(2, dtype="<i2").tobytes())
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import pytest
+
+pytest.importorskip("PySide6")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK = """
+import sys
+from PySide6.QtWidgets import QApplication
+import interface
+app = QApplication([])
+window = interface.MainWindow()
+optional = ("timeline", "numerical", "plotting")
+print(*[m in sys.modules for m in optional])
+from timeline import AddOrbit
+window.viewer.record(AddOrbit(0.0, "LEO", 5800.0, 0.001, 6800.0))
+window.viewer._on_numerical_toggled(True)
+print(*[m in sys.modules for m in optional], len(window.space.orbits))
+window.engine.stop()
+"""
+
+
+def test_optional_subsystems_load_on_first_use():
+    # procés a part: els mòduls ja importats pels altres tests no hi compten
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    out = subprocess.run([sys.executable, "-c", CHECK], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=120, check=True).stdout.split("\n")
+    assert out[0] == "False False False"
+    assert out[1] == "True True False 1"
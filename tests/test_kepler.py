@@ -0,0 +1,46 @@
+import math
+import numpy as np
+from orbit import Orbit
+from propagator import kepler_E_batch, propagate, warm_start
+
+EPSILONS = (0.0, 0.01, 0.3, 0.7, 0.85, 0.9)
+
+
+def test_batch_solver_matches_the_scalar_solver():
+    M = np.linspace(-4 * np.pi, 4 * np.pi, 257)
+    for epsilon in EPSILONS:
+        orbit = Orbit("O", 6000.0, epsilon, 7000.0)
+        E = kepler_E_batch(M, epsilon)
+        assert np.abs(E - epsilon * np.sin(E) - M).max() < 1e-10
+        assert np.abs(E - [orbit.kepler_E(m) for m in M.tolist()]).max() < 1e-10
+
+
+def test_propagate_matches_new_position():
+    period = np.array([5800.0, 43000.0, 86164.0])
+    epsilon = np.array([0.001, 0.7, 0.0])
+    a = np.array([6800.0, 26600.0, 42164.0])
+    M0 = np.array([0.0, 1.0, -2.0])
+    times = np.array([[0.0], [123.4], [5000.0], [86400.0]])
+    x, y = propagate(period, epsilon, a, M0, times)
+    for j in range(3):
+        orbit = Orbit("O", period[j], epsilon[j], a[j])
+        orbit.M0 = M0[j]
+        for k, t in enumerate(times[:, 0].tolist()):
+            orbit.new_position(t, warm=False)
+            assert math.hypot(orbit.x - x[k, j], orbit.y - y[k, j]) < 1e-6
+
+
+def test_warm_start_needs_fewer_iterations_for_the_same_answer():
+    rng = np.random.default_rng(1)
+    epsilon = rng.uniform(0.0, 0.9, 1000)
+    M_prev = rng.uniform(-np.pi, np.pi, 1000)
+    E_prev = kepler_E_batch(M_prev, epsilon)
+    M = M_prev + 0.01
+    cold, cold_its = kepler_E_batch(M, epsilon, return_iterations=True)
+    E0 = warm_start(M, epsilon, E_prev, M_prev)
+    warm, warm_its = kepler_E_batch(M, epsilon, E0=E0, return_iterations=True)
+    assert np.abs(warm - cold).max() < 1e-11
+    assert warm_its.sum() < cold_its.sum()
+    # NaN o salts grans de M tornen a l'arrencada en freda
+    E0 = warm_start(M + 2.0, epsilon, np.full(1000, np.nan), M_prev)
+    assert np.isfinite(E0).all()
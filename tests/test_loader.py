@@ -0,0 +1,56 @@
+import io
+import math
+from space import Space, load_orbits, load_satellites
+
+ORBITS = """\
+LEO 5800 0.001 6800
+GEO 86164 0.0 42164
+BAD1 5800 0.001
+BAD2 5800 abc 6800
+BAD3 5800 1.2 6800
+BAD4 -1 0.1 6800
+"""
+
+SATELLITES = """\
+S1 LEO 500 50
+S2 GEO 1000 100 1.5
+S3 MEO 500 50
+S4 LEO 500
+S5 LEO nan 50
+S6 LEO -500 50
+S7 LEO 500 500
+S8 LEO 500 -1
+S9 LEO 500 50 inf
+S10 LEO 500 x
+"""
+
+
+def test_rejected_lines_are_reported_with_a_reason(capsys):
+    space = Space()
+    rejected = load_orbits(space, io.StringIO(ORBITS))
+    assert [lineno for lineno, _, _ in rejected] == [3, 4, 5, 6]
+    assert [o.name for o in space.orbits] == ["LEO", "GEO"]
+    rejected = load_satellites(space, io.StringIO(SATELLITES))
+    assert [(lineno, reason) for lineno, _, reason in rejected] == [
+        (3, "òrbita «MEO» desconeguda"),
+        (4, "s'esperaven 4 o 5 camps"),
+        (5, "paràmetres de satèl·lit fora de rang"),
+        (6, "paràmetres de satèl·lit fora de rang"),
+        (7, "paràmetres de satèl·lit fora de rang"),
+        (8, "paràmetres de satèl·lit fora de rang"),
+        (9, "paràmetres de satèl·lit fora de rang"),
+        (10, "valor numèric invàlid"),
+    ]
+    assert [s.name for s in space.satellites] == ["S1", "S2"]
+    assert space.satellites[1].M0 == 1.5 and space.satellites[1].orbit.name == "GEO"
+    assert all(math.isfinite(s.mass) for s in space.satellites)
+    assert "ERROR satèl·lits, línia 5" in capsys.readouterr().out
+
+
+def test_chunks_do_not_change_the_result():
+    whole, chunked = Space(), Space()
+    for space, chunk in ((whole, 1 << 16), (chunked, 2)):
+        load_orbits(space, io.StringIO(ORBITS), chunk_size=chunk)
+        load_satellites(space, io.StringIO(SATELLITES), chunk_size=chunk)
+    assert [s.name for s in whole.satellites] == [s.name for s in chunked.satellites]
+    assert [o.name for o in whole.orbits] == [o.name for o in chunked.orbits]
@@ -0,0 +1,41 @@
+import math
+import numpy as np
+import pytest
+from maneuver import dv_available, maneuver_cost, maneuver_matrix
+from space import update_all_positions
+from synthetic import synthetic_space
+
+
+@pytest.mark.parametrize("block", [1, 7, 1 << 16])
+def test_matrix_matches_scalar_cost(block):
+    space = synthetic_space(40, 9, seed=4)
+    update_all_positions(space, 1234.0)
+    matrix = maneuver_matrix(space, block=block)
+    assert matrix.dv.shape == (40, 9)
+    for i, sat in enumerate(space.satellites):
+        r_now = math.hypot(sat.x, sat.y)
+        for j, orbit in enumerate(space.orbits):
+            dv, available, fuel, feasible = maneuver_cost(r_now, sat.mass, sat.fuel,
+                                                          orbit.epsilon, orbit.a)
+            assert matrix.dv[i, j] == pytest.approx(float(dv), rel=1e-12)
+            assert matrix.available[i, j] == pytest.approx(float(available), rel=1e-12)
+            assert matrix.fuel[i, j] == pytest.approx(float(fuel), rel=1e-12)
+            assert matrix.feasible[i, j] == bool(feasible)
+
+
+def test_matrix_to_given_targets():
+    space = synthetic_space(10, 3, seed=5)
+    update_all_positions(space, 0.0)
+    epsilon, a = [0.0, 0.1], [8000.0, 30000.0]
+    matrix = maneuver_matrix(space, epsilon, a)
+    assert matrix.orbits is None and matrix.dv.shape == (10, 2)
+    for i, sat in enumerate(space.satellites):
+        dv, _, _, _ = maneuver_cost(math.hypot(sat.x, sat.y), sat.mass, sat.fuel,
+                                    np.array(epsilon), np.array(a))
+        assert matrix.dv[i] == pytest.approx(dv, rel=1e-12)
+
+
+def test_no_dv_without_dry_mass():
+    assert dv_available(100.0, 100.0) == 0.0
+    assert dv_available(100.0, 0.0) == 0.0
+    assert dv_available(100.0, 50.0) == pytest.approx(450.0 * 9.80665 * math.log(2.0))
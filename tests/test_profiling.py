@@ -0,0 +1,47 @@
+import json
+import pytest
+from profiling import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    first, second = profiler.stage("propagate"), profiler.stage("draw")
+    assert first is second
+    with first:
+        pass
+    assert profiler.summary() == {} and profiler.report() == ""
+
+
+def test_window_and_summary():
+    profiler = Profiler(window=4, enabled=True)
+    for seconds in (0.5, 0.001, 0.002, 0.003, 0.004):
+        profiler.record("propagate", seconds)
+    with profiler.stage("draw"):
+        pass
+    summary = profiler.summary()
+    # només queden les últimes 4 mostres
+    assert summary["propagate"]["count"] == 4
+    assert summary["propagate"]["max"] == pytest.approx(0.004)
+    assert summary["propagate"]["p50"] == pytest.approx(0.0025)
+    assert summary["draw"]["count"] == 1
+    counts, edges = profiler.histogram("propagate", bins=8)
+    assert counts.sum() == 4 and len(edges) == 9
+    lines = profiler.report().splitlines()
+    assert [line.split()[0] for line in lines] == ["draw", "propagate"]
+
+
+def test_export_csv_and_json(tmp_path):
+    profiler = Profiler(enabled=True)
+    for seconds in (0.01, 0.02):
+        profiler.record("propagate", seconds)
+    csv_path, json_path = tmp_path / "p.csv", tmp_path / "p.json"
+    profiler.export(str(csv_path))
+    profiler.export(str(json_path))
+    assert csv_path.read_text().splitlines() == ["stage,seconds", "propagate,0.010000000",
+                                                 "propagate,0.020000000"]
+    data = json.loads(json_path.read_text())
+    assert data["samples"] == {"propagate": [0.01, 0.02]}
+    assert data["summary"]["propagate"]["count"] == 2
+    assert sum(data["histograms"]["propagate"]["counts"]) == 2
+    profiler.reset()
+    assert profiler.stages() == {}
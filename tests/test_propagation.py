@@ -0,0 +1,94 @@
+import math
+import numpy as np
+import pytest
+from ephemeris import EphemerisCache
+from orbit import Orbit
+from satellite import Satellite
+from space import Space, update_all_positions
+
+MU = 3.986e5
+TIMES = (0.0, 37.5, 600.0, 5400.0, 86400.0)
+
+
+def scalar_positions(space, t):
+    # camí escalar de referència, en fred: Orbit.state_at sense estat anterior
+    return np.array([sat.orbit.state_at(t, sat.M0)[:2] for sat in space.satellites])
+
+
+def batch_positions(space):
+    sats = space.satellite_table
+    rows = sats.rows()
+    return np.column_stack([sats.col("x")[rows], sats.col("y")[rows]])
+
+
+@pytest.fixture
+def space():
+    # unes quantes òrbites, quasi circulars i excèntriques, amb diversos
+    # satèl·lits a fases diferents
+    rng = np.random.default_rng(0)
+    space = Space()
+    for k, epsilon in enumerate((0.0, 0.001, 0.01, 0.1, 0.3, 0.7)):
+        a = float(rng.uniform(7000.0, 42000.0))
+        space.orbits.append(Orbit(f"ORB{k}", 2 * math.pi * math.sqrt(a**3 / MU), epsilon, a))
+    orbits = list(space.orbits)
+    for i in range(300):
+        space.satellites.append(Satellite(f"SAT{i}", orbits[i % len(orbits)], 100.0, 10.0,
+                                          float(rng.uniform(0.0, 2 * math.pi))))
+    return space
+
+
+def test_update_all_positions_matches_the_scalar_path(space):
+    # amb arrencada en calent de tic en tic
+    for t in TIMES:
+        update_all_positions(space, t)
+        assert np.abs(batch_positions(space) - scalar_positions(space, t)).max() < 1e-6
+
+
+def test_update_position_matches_update_all_positions(space):
+    for t in TIMES:
+        update_all_positions(space, t)
+        expected = batch_positions(space)
+        for sat in space.satellites:
+            sat.update_position(t)
+        assert np.abs(batch_positions(space) - expected).max() < 1e-6
+
+
+def test_ephemeris_matches_the_scalar_path(space):
+    space.ephemeris = EphemerisCache(tol=1e-3)
+    for t in TIMES:
+        update_all_positions(space, t)
+        assert np.abs(batch_positions(space) - scalar_positions(space, t)).max() < 1e-3
+
+
+def test_scalar_update_after_ephemeris(space):
+    # EphemerisCache deixa E = NaN amb M finit; l'arrencada en calent escalar
+    # no l'ha de fer servir
+    space.ephemeris = EphemerisCache(tol=1e-3)
+    update_all_positions(space, 100.0)
+    for sat in space.satellites:
+        assert math.isnan(sat.E) and math.isfinite(sat.M)
+        sat.update_position(101.0)
+        assert math.isfinite(sat.x) and math.isfinite(sat.y) and math.isfinite(sat.E)
+    assert np.abs(batch_positions(space) - scalar_positions(space, 101.0)).max() < 1e-6
+
+
+def test_batch_update_after_ephemeris(space):
+    space.ephemeris = EphemerisCache(tol=1e-3)
+    update_all_positions(space, 100.0)
+    space.ephemeris = None
+    update_all_positions(space, 101.0)
+    assert np.abs(batch_positions(space) - scalar_positions(space, 101.0)).max() < 1e-6
+
+
+def test_satellites_on_one_orbit_keep_their_own_phase():
+    space = Space()
+    orbit = Orbit("LEO", 5800.0, 0.01, 6800.0)
+    space.orbits.append(orbit)
+    space.satellites.extend([Satellite(f"S{k}", orbit, 100.0, 10.0, 0.5 * k) for k in range(3)])
+    update_all_positions(space, 1000.0)
+    positions = batch_positions(space)
+    assert len({(round(x, 6), round(y, 6)) for x, y in positions.tolist()}) == 3
+    # la mateixa òrbita, desplaçada en el temps per la diferència de fase
+    lead = orbit.state_at(1000.0 + 0.5 * 5800.0 / (2 * math.pi), 0.0)
+    assert positions[1] == pytest.approx(lead[:2], abs=1e-6)
+    assert len(space.orbits) == 1
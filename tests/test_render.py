@@ -0,0 +1,64 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+import render
+from render import SpaceRenderer, density, pick_labels
+from space import update_all_positions
+from synthetic import synthetic_space
+
+
+@pytest.fixture
+def ax():
+    fig, ax = plt.subplots(figsize=(6, 6), dpi=100)
+    yield ax
+    plt.close(fig)
+
+
+def test_static_layer_is_built_once(ax):
+    space = synthetic_space(200, 30, seed=14)
+    renderer = SpaceRenderer(ax)
+    update_all_positions(space, 0.0)
+    renderer.draw(space)
+    scatter = renderer.scatter
+    assert renderer.background is not None
+    update_all_positions(space, 600.0)
+    renderer.draw(space)
+    # només es mouen els satèl·lits, sobre el fons desat
+    assert renderer.scatter is scatter
+    assert np.array_equal(scatter.get_offsets(), render.satellite_xy(space))
+    # amb moltes òrbites la llegenda en resumeix el nombre
+    assert [t.get_text() for t in ax.get_legend().get_texts()] == ["Terra", "30 òrbites"]
+    space.satellites.remove(space.satellites[0])
+    renderer.draw(space)
+    assert renderer.scatter is not scatter and len(renderer.names) == 199
+
+
+def test_labels_are_capped_one_per_cell(ax):
+    space = synthetic_space(500, 10, seed=15)
+    update_all_positions(space, 0.0)
+    renderer = SpaceRenderer(ax)
+    renderer.draw(space)
+    shown = [label for label in renderer.labels if label.get_visible()]
+    assert 0 < len(shown) <= render.MAX_LABELS
+    xy = render.satellite_xy(space)
+    chosen = pick_labels(ax, xy, render.in_view(ax, xy))
+    cells = np.floor(ax.transData.transform(xy[chosen]) / render.LABEL_CELL)
+    assert len({tuple(c) for c in cells.tolist()}) == len(chosen)
+
+
+def test_dense_view_switches_to_heatmap(ax, monkeypatch):
+    monkeypatch.setattr(render, "HEATMAP_THRESHOLD", 100)
+    space = synthetic_space(300, 5, seed=16)
+    update_all_positions(space, 0.0)
+    renderer = SpaceRenderer(ax)
+    renderer.draw(space)
+    assert renderer.heatmap.get_visible() and not renderer.scatter.get_visible()
+    assert not any(label.get_visible() for label in renderer.labels)
+    xy = render.satellite_xy(space)
+    assert density(ax, xy).sum() == 300
+    # amb zoom a una zona buida es torna al scatter
+    ax.set_xlim(1e6, 1e6 + 1)
+    renderer.draw(space)
+    assert renderer.scatter.get_visible() and not renderer.heatmap.get_visible()
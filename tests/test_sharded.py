@@ -0,0 +1,53 @@
+import os
+import signal
+import numpy as np
+import pytest
+from orbit import Orbit
+from satellite import Satellite
+from sharded import ShardedPropagator
+from space import update_all_positions
+from synthetic import synthetic_space
+
+COLUMNS = ("x", "y", "E", "M", "iterations")
+
+
+def state(space):
+    sats = space.satellite_table
+    return [sats.col(c).copy() for c in COLUMNS]
+
+
+def test_sharded_matches_serial_through_space_propagator():
+    serial, space = synthetic_space(500), synthetic_space(500)
+    space.propagator = ShardedPropagator(space, workers=2)
+    try:
+        for k in range(5):
+            if k == 2:
+                # un satèl·lit nou i un canvi d'òrbita entre tics
+                for s in (serial, space):
+                    s.satellites.append(Satellite("NEW", Orbit("N", 6000.0, 0.1, 7200.0), 100.0, 10.0))
+                    s.satellites[3].M0 += 0.5
+                    s.satellites[3].E = np.nan
+            update_all_positions(serial, 30.0 * k)
+            update_all_positions(space, 30.0 * k)
+            for expected, got in zip(state(serial), state(space)):
+                assert np.array_equal(expected, got)
+    finally:
+        space.propagator.close()
+
+
+def test_dead_worker_raises_instead_of_hanging():
+    space = synthetic_space(100)
+    sharded = ShardedPropagator(space, workers=2, timeout=5.0)
+    sharded.step(1.0)
+    os.kill(sharded.processes[0].pid, signal.SIGKILL)
+    sharded.processes[0].join()
+    with pytest.raises(RuntimeError):
+        sharded.step(2.0)
+    assert not sharded.processes and sharded.shm is None
+    # com a space.propagator es torna a engegar al tic següent
+    space.propagator = sharded
+    try:
+        update_all_positions(space, 3.0)
+        assert len(sharded.processes) == 2
+    finally:
+        sharded.close()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from satellite import Satellite
+from snapshot import load_snapshot, save_snapshot, snapshot_to_text, text_to_snapshot
+from space import Space, load_orbits, load_satellites, update_all_positions
+from synthetic import synthetic_space
+
+ORBIT_COLUMNS = ("period", "epsilon", "a", "b", "M0")
+SATELLITE_COLUMNS = ("mass", "fuel", "M0")
+
+
+def live(table, column):
+    return table.col(column)[np.flatnonzero(table.alive[:table.n])]
+
+
+def assert_same_space(loaded, space):
+    for table, copy, columns in ((space.orbit_table, loaded.orbit_table, ORBIT_COLUMNS),
+                                 (space.satellite_table, loaded.satellite_table, SATELLITE_COLUMNS)):
+        for column in columns:
+            assert np.array_equal(live(copy, column), live(table, column))
+    # les files de les òrbites es renumeren; es comparen pel nom
+    assert [(s.name, s.orbit.name) for s in loaded.satellites] == \
+        [(s.name, s.orbit.name) for s in space.satellites]
+    assert [o.name for o in loaded.orbits] == [o.name for o in space.orbits]
+
+
+def test_snapshot_round_trip(tmp_path):
+    space = synthetic_space(500, 20, seed=3)
+    path = str(tmp_path / "space.snap")
+    save_snapshot(space, path, epoch=123.5)
+    loaded, epoch = load_snapshot(path)
+    assert epoch == 123.5
+    assert_same_space(loaded, space)
+    update_all_positions(space, 4000.0)
+    update_all_positions(loaded, 4000.0)
+    assert np.array_equal(live(loaded.satellite_table, "x"), live(space.satellite_table, "x"))
+
+
+def test_snapshot_skips_removed_rows_and_stays_writable(tmp_path):
+    space = synthetic_space(50, 5, seed=1)
+    for sat in list(space.satellites)[10:20]:
+        space.satellites.remove(sat)
+    path = str(tmp_path / "space.snap")
+    save_snapshot(space, path)
+    loaded, _ = load_snapshot(path)
+    assert_same_space(loaded, space)
+    # el mapa és en còpia en escriptura: l'espai creix sense tocar el fitxer
+    loaded.satellites[0].fuel = 1.0
+    loaded.satellites.append(Satellite("NEW", loaded.orbits[0], 10.0, 1.0, 0.0))
+    again, _ = load_snapshot(path)
+    assert_same_space(again, space)
+
+
+def test_text_and_snapshot_convert_both_ways(tmp_path):
+    orbits, satellites = tmp_path / "orbits.txt", tmp_path / "satellites.txt"
+    orbits.write_text("LEO 5400 0.001 6771\nMEO 43200 0.01 13771\n")
+    satellites.write_text("SAT1 LEO 500 100\nSAT2 MEO 750 200 1.25\n")
+    path = str(tmp_path / "space.snap")
+    text_to_snapshot(str(orbits), str(satellites), path, epoch=60.0)
+    out_orbits, out_satellites = tmp_path / "o.txt", tmp_path / "s.txt"
+    loaded, epoch = snapshot_to_text(path, str(out_orbits), str(out_satellites))
+    assert epoch == 60.0
+    space = Space()
+    load_orbits(space, str(out_orbits))
+    load_satellites(space, str(out_satellites))
+    assert_same_space(loaded, space)
+    assert [s.M0 for s in space.satellites] == [0.0, 1.25]
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "other.snap"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
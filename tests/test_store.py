@@ -0,0 +1,148 @@
+import gc
+import math
+import weakref
+from orbit import Orbit
+from satellite import Satellite
+from space import Space, get_orbit, get_satellite
+
+
+def make_space(n_sats, n_orbits=2):
+    space = Space()
+    for k in range(n_orbits):
+        space.orbits.append(Orbit(f"ORB{k}", 6000.0 + 100 * k, 0.01 * k, 7000.0 + 500 * k))
+    orbits = list(space.orbits)
+    for i in range(n_sats):
+        space.satellites.append(Satellite(f"SAT{i}", orbits[i % n_orbits], 100.0 + i, 10.0, 0.1 * i))
+    return space
+
+
+def test_append_moves_views_into_the_space_tables():
+    space = Space()
+    orbit = Orbit("LEO", 5800.0, 0.001, 6800.0)
+    sat = Satellite("S", orbit, 500.0, 50.0)
+    space.orbits.append(orbit)
+    space.satellites.append(sat)
+    assert orbit._table is space.orbit_table
+    assert sat._table is space.satellite_table
+    # el satèl·lit es va crear abans d'afegir l'òrbita: no se'n fa una còpia
+    assert sat.orbit is orbit
+    assert len(space.orbits) == 1
+    sat.fuel = 20.0
+    assert space.satellite_table.col("fuel")[sat._i] == 20.0
+    # tornar-lo a afegir no el duplica
+    space.satellites.append(sat)
+    assert len(space.satellites) == 1
+
+
+def test_adopted_views_are_not_kept_alive():
+    space = Space()
+    orbit = Orbit("LEO", 5800.0, 0.001, 6800.0)
+    sat = Satellite("S", orbit, 500.0, 50.0)
+    private = orbit._table
+    space.orbits.append(orbit)
+    # la taula del satèl·lit ja apunta a la de l'espai, sense passar per la vella
+    assert sat._table.link is space.orbit_table
+    ref = weakref.ref(orbit)
+    del orbit
+    gc.collect()
+    assert ref() is None
+    assert not private.views
+    space.satellites.append(sat)
+    assert len(space.orbits) == 1
+    assert get_satellite(space, "S").orbit is get_orbit(space, "LEO")
+
+
+def test_satellite_append_adopts_its_orbit():
+    space = Space()
+    orbit = Orbit("GEO", 86164.0, 0.0, 42164.0)
+    space.satellites.append(Satellite("S", orbit, 1000.0, 100.0))
+    assert orbit._table is space.orbit_table
+    assert get_orbit(space, "GEO") is orbit
+
+
+def test_remove_compacts_and_keeps_live_views():
+    space = make_space(40)
+    sats = list(space.satellites)
+    table = space.satellite_table
+    for sat in sats[:30]:
+        space.satellites.remove(sat)
+    # es compacta en passar de 16 files mortes i de tantes com vives (a la 21a)
+    assert table.n == 19 and table.live == 10
+    table.compact()
+    assert table.n == 10
+    for i, sat in enumerate(sats[30:], start=30):
+        assert sat._table is table
+        assert sat.name == f"SAT{i}"
+        assert sat.mass == 100.0 + i
+        assert get_satellite(space, f"SAT{i}") is sat
+        assert sat.orbit.name == f"ORB{i % 2}"
+    # les vistes de files eliminades conserven els seus valors en una taula pròpia
+    for i, sat in enumerate(sats[:30]):
+        assert sat._table is not table
+        assert sat.name == f"SAT{i}" and sat.mass == 100.0 + i
+        assert sat not in space.satellites
+        assert get_satellite(space, f"SAT{i}") is None
+
+
+def test_compact_keeps_orbits_referenced_by_satellites():
+    space = make_space(4, n_orbits=3)
+    space.satellites.remove(get_satellite(space, "SAT2"))
+    orbits = list(space.orbits)
+    for orbit in orbits:
+        space.orbits.remove(orbit)
+    # compactar els satèl·lits treu la fila morta de SAT2 i després les òrbites
+    space.satellite_table.compact()
+    # ORB0 i ORB1 continuen referenciades pels satèl·lits; ORB2 no
+    assert space.orbit_table.n == 2
+    assert [sat.orbit.name for sat in space.satellites] == ["ORB0", "ORB1", "ORB0"]
+    assert orbits[0]._table is space.orbit_table
+    assert orbits[2]._table is not space.orbit_table
+    assert orbits[2].a == 8000.0
+
+
+def test_clear_detaches_views():
+    space = make_space(5)
+    sats = list(space.satellites)
+    space.satellites.clear()
+    assert len(space.satellites) == 0
+    assert space.satellite_table.n == 0
+    assert get_satellite(space, "SAT0") is None
+    assert [sat.name for sat in sats] == [f"SAT{i}" for i in range(5)]
+    assert sats[3].M0 == 0.1 * 3
+    # la taula es pot tornar a fer servir
+    space.satellites.append(sats[3])
+    assert get_satellite(space, "SAT3") is sats[3]
+    assert len(space.satellites) == 1
+
+
+def test_duplicate_names_resolve_to_the_first_live_row():
+    space = make_space(0)
+    orbit = get_orbit(space, "ORB0")
+    first = Satellite("DUP", orbit, 1.0, 0.0)
+    second = Satellite("DUP", orbit, 2.0, 0.0)
+    space.satellites.extend([first, second])
+    table = space.satellite_table
+    assert table.duplicates == 1
+    assert get_satellite(space, "DUP") is first
+    space.satellites.remove(first)
+    assert get_satellite(space, "DUP") is second
+    assert table.duplicates == 0
+    space.satellites.remove(second)
+    assert get_satellite(space, "DUP") is None
+
+
+def test_extend_with_duplicate_names():
+    space = make_space(1)
+    table = space.satellite_table
+    rows = table.extend(["SAT0", "X", "X"], orbit=[0, 0, 1], mass=[1.0, 2.0, 3.0])
+    assert list(rows) == [1, 2, 3]
+    assert table.duplicates == 2
+    assert table.find("SAT0") == 0
+    assert table.find("X") == 2
+    table.remove(2)
+    assert table.find("X") == 3
+    table.compact()
+    assert table.find("X") == 2
+    assert table.duplicates == 1
+    assert [sat.name for sat in space.satellites] == ["SAT0", "SAT0", "X"]
+    assert math.isclose(get_satellite(space, "X").mass, 3.0)
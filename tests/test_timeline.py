@@ -0,0 +1,74 @@
+import math
+import pytest
+from space import Space, get_satellite, update_all_positions
+from timeline import AddOrbit, AddSatellite, Maneuver, Timeline
+
+MU = 3.986e5
+
+
+def period(a):
+    return 2 * math.pi * math.sqrt(a**3 / MU)
+
+
+def positions(space):
+    return {s.name: (s.orbit.name, s.fuel, s.x, s.y) for s in space.satellites}
+
+
+@pytest.fixture
+def history():
+    space = Space()
+    timeline = Timeline(space, interval=2)
+    events = [AddOrbit(0.0, "LOW", period(7000.0), 0.0, 7000.0),
+              AddOrbit(0.0, "HIGH", period(9000.0), 0.05, 9000.0),
+              AddSatellite(10.0, "A", "LOW", 1000.0, 400.0, 0.0),
+              AddSatellite(20.0, "B", "LOW", 1000.0, 400.0, 1.0)]
+    for k in range(6):
+        a = 7000.0 + 200.0 * (k + 1)
+        events.append(Maneuver(100.0 + 300.0 * k, "AB"[k % 2], f"M{k}", period(a), 0.0, a))
+    for event in events:
+        assert timeline.record(space, event)
+    return space, timeline, events
+
+
+def replay(events, t):
+    # referència: tots els esdeveniments fins a t des d'un espai buit
+    space = Space()
+    for event in events:
+        if event.time <= t:
+            event.apply(space)
+    update_all_positions(space, t)
+    return space
+
+
+@pytest.mark.parametrize("t", [5.0, 15.0, 250.0, 1000.0, 1900.0, 5000.0])
+def test_seek_matches_full_replay(history, t):
+    space, timeline, events = history
+    assert timeline.seek(space, t) == sum(e.time <= t for e in events)
+    assert positions(space) == positions(replay(events, t))
+    assert positions(timeline.state_at(t)) == positions(space)
+
+
+def test_seek_back_and_forth(history):
+    space, timeline, events = history
+    for t in (1900.0, 50.0, 700.0, 15.0, 1900.0):
+        timeline.seek(space, t)
+        assert positions(space) == positions(replay(events, t))
+
+
+def test_record_after_seek_forks_history(history):
+    space, timeline, events = history
+    timeline.seek(space, 500.0)
+    assert timeline.record(space, Maneuver(600.0, "A", "FORK", period(8500.0), 0.0, 8500.0))
+    assert len(timeline) == sum(e.time <= 500.0 for e in events) + 1
+    assert timeline.end == 600.0
+    timeline.seek(space, 5000.0)
+    assert get_satellite(space, "A").orbit.name == "FORK"
+    with pytest.raises(ValueError):
+        timeline.record(space, AddOrbit(100.0, "LATE", period(7000.0), 0.0, 7000.0))
+
+
+def test_failed_event_is_not_recorded(history):
+    space, timeline, _ = history
+    count = len(timeline)
+    assert not timeline.record(space, AddSatellite(3000.0, "C", "NOWHERE", 10.0, 1.0))
+    assert len(timeline) == count
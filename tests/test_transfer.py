@@ -0,0 +1,102 @@
+import math
+import numpy as np
+import pytest
+from maneuver import MU
+from orbit import Orbit
+from satellite import Satellite
+from snapshot import load_snapshot, save_snapshot
+from space import Space, get_satellite, update_all_positions
+from transfer import TransferPlan, execute_plan, optimize_transfer
+
+
+def make_orbit(name, a, epsilon=0.0):
+    return Orbit(name, 2 * math.pi * math.sqrt(a**3 / MU), epsilon, a)
+
+
+@pytest.fixture
+def space():
+    space = Space()
+    space.orbits.extend([make_orbit("LOW", 7000.0), make_orbit("HIGH", 12000.0, 0.1)])
+    space.satellites.append(Satellite("S", space.orbits[0], 1000.0, 600.0, 2.0))
+    return space
+
+
+def burn(space, strategy):
+    satellite, target = space.satellites[0], space.orbits[1]
+    plan = optimize_transfer(satellite, target, strategies=(strategy,))
+    update_all_positions(space, plan.burn_time)
+    before = (satellite.x, satellite.y)
+    assert execute_plan(satellite, target, plan)
+    return satellite, plan, before
+
+
+@pytest.mark.parametrize("strategy, legs", [("hohmann", 1), ("bielliptic", 2)])
+def test_transfer_coasts_on_transfer_orbits(space, strategy, legs):
+    satellite, plan, before = burn(space, strategy)
+    update_all_positions(space, plan.burn_time)
+    # l'impuls no mou el satèl·lit
+    assert math.hypot(satellite.x - before[0], satellite.y - before[1]) < 1e-6
+    transfer = [o for o in space.orbits if math.isfinite(o.until)]
+    assert len(transfer) == legs
+    assert transfer[-1].until == pytest.approx(plan.arrival)
+    # cada canvi de tram i l'arribada són continus
+    for orbit in transfer:
+        update_all_positions(space, orbit.until - 1e-6)
+        x, y = satellite.x, satellite.y
+        assert satellite.orbit.name == orbit.name
+        update_all_positions(space, orbit.until + 1e-6)
+        assert math.hypot(satellite.x - x, satellite.y - y) < 1e-3
+    # la Hohmann arriba a l'àpside de l'altra banda, la bi-el·líptica al de la mateixa
+    high = space.orbits[1]
+    side = math.copysign(1.0, before[0]) * (-1) ** legs
+    assert satellite.orbit.name == "HIGH"
+    assert satellite.x == pytest.approx(side * high.a * (1 - high.epsilon * side), abs=1e-3)
+    # les òrbites de transferència ja no hi són
+    assert [o.name for o in space.orbits] == ["LOW", "HIGH"]
+
+
+def test_hohmann_coast_follows_transfer_ellipse(space):
+    satellite, plan, _ = burn(space, "hohmann")
+    r1 = math.hypot(satellite.x, satellite.y)
+    high = space.orbits[1]
+    side = 1.0 if satellite.x > 0 else -1.0
+    r2 = high.a * (1 + high.epsilon * side)
+    update_all_positions(space, (plan.burn_time + plan.arrival) / 2)
+    # a mig camí és sobre l'el·lipse r1-r2 (x = a(cosE - e), y = b sinE), no a HIGH
+    a = (r1 + r2) / 2
+    e = side * (r2 - r1) / (r1 + r2)
+    b = a * math.sqrt(1 - e**2)
+    assert (satellite.x / a + e)**2 + (satellite.y / b)**2 == pytest.approx(1.0, rel=1e-9)
+    assert satellite.orbit.name == "HIGH~1"
+
+
+def test_scalar_update_switches_legs(space):
+    satellite, plan, _ = burn(space, "bielliptic")
+    twin = Satellite("T", satellite.orbit, satellite.mass, satellite.fuel, satellite.M0)
+    space.satellites.append(twin)
+    t = plan.arrival + 100.0
+    twin.update_position(t)
+    update_all_positions(space, t)
+    assert twin.orbit.name == satellite.orbit.name == "HIGH"
+    assert twin.x == pytest.approx(satellite.x) and twin.y == pytest.approx(satellite.y)
+
+
+def test_snapshot_keeps_transfer_in_flight(space, tmp_path):
+    satellite, plan, _ = burn(space, "bielliptic")
+    path = str(tmp_path / "flight.snap")
+    save_snapshot(space, path)
+    loaded, _ = load_snapshot(path)
+    for t in np.linspace(plan.burn_time, plan.arrival + 500.0, 7):
+        update_all_positions(space, t)
+        update_all_positions(loaded, t)
+        copy = get_satellite(loaded, "S")
+        assert copy.orbit.name == satellite.orbit.name
+        assert (copy.x, copy.y) == pytest.approx((satellite.x, satellite.y), abs=1e-6)
+
+
+def test_burn_off_the_apse_line_is_refused(space):
+    satellite, target = space.satellites[0], space.orbits[1]
+    update_all_positions(space, 100.0)
+    plan = TransferPlan("hohmann", 100.0, 0.0, 0.0, True, math.nan, 0.0)
+    assert not execute_plan(satellite, target, plan)
+    assert satellite.orbit.name == "LOW" and satellite.fuel == 600.0
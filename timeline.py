@@ -0,0 +1,218 @@
+import argparse
+import time
+from bisect import bisect_right
+from orbit import Orbit
+from satellite import Satellite
+from space import Space, get_orbit, get_satellite, maneuver_satellite, update_all_positions
+from snapshot import ORBIT_FIELDS, SATELLITE_FIELDS
+
+# Línia de temps d'esdeveniments. Tot canvi d'estructura de l'espai (afegir
+# òrbites i satèl·lits, maniobrar) es desa com un esdeveniment amb el seu
+# instant, i cada `interval` esdeveniments es desa una captura de l'estat
+# (els mateixos camps que snapshot.py: elements, fases, massa, combustible).
+# Per tornar a un instant t es busca per bisecció l'últim esdeveniment <= t i
+# la captura anterior més propera, es restaura i només es reprodueixen els
+# esdeveniments que hi ha entre totes dues (com a molt `interval`). Les
+# posicions no formen part de l'estat: es recalculen a t.
+#
+# Registrar un esdeveniment després de tornar enrere descarta els posteriors
+# a l'instant actual (la història es bifurca).
+
+SNAPSHOT_INTERVAL = 64
+STATE = {"orbit": [name for name, _ in ORBIT_FIELDS if name != "alive"],
+         "satellite": [name for name, _ in SATELLITE_FIELDS]}
+
+
+class AddOrbit:
+    __slots__ = ("time", "name", "period", "epsilon", "a")
+
+    def __init__(self, time, name, period, epsilon, a):
+        self.time = time
+        self.name = name
+        self.period = period
+        self.epsilon = epsilon
+        self.a = a
+
+    def apply(self, space):
+        space.orbits.append(Orbit(self.name, self.period, self.epsilon, self.a))
+        return True
+
+
+class AddSatellite:
+    __slots__ = ("time", "name", "orbit", "mass", "fuel", "M0")
+
+    def __init__(self, time, name, orbit, mass, fuel, M0=None):
+        self.time = time
+        self.name = name
+        self.orbit = orbit
+        self.mass = mass
+        self.fuel = fuel
+        self.M0 = M0
+
+    def apply(self, space):
+        orbit = get_orbit(space, self.orbit)
+        if orbit is None:
+            return False
+        space.satellites.append(Satellite(self.name, orbit, self.mass, self.fuel, self.M0))
+        return True
+
+
+class Maneuver:
+    # canvi d'òrbita de space.maneuver_satellite
+    __slots__ = ("time", "satellite", "orbit", "period", "epsilon", "a", "strategy", "via")
+
+    def __init__(self, time, satellite, orbit, period, epsilon, a, strategy="tangential", via=None):
+        self.time = time
+        self.satellite = satellite
+        self.orbit = orbit
+        self.period = period
+        self.epsilon = epsilon
+        self.a = a
+        self.strategy = strategy
+        self.via = via
+
+    def apply(self, space):
+        sat = get_satellite(space, self.satellite)
+        if sat is None:
+            return False
+        return maneuver_satellite(space, sat, self.orbit, self.period, self.epsilon, self.a,
+                                  self.time, self.strategy, self.via)
+
+
+def capture(space):
+    # còpia de l'estat de les dues taules: (noms, columnes, vives) per taula
+    state = []
+    for table, fields in ((space.orbit_table, STATE["orbit"]),
+                          (space.satellite_table, STATE["satellite"])):
+        n = table.n
+        state.append((list(table.names), {c: table.data[c][:n].copy() for c in fields},
+                      table.alive[:n].copy()))
+    return state
+
+
+def restore(space, state):
+    # torna l'espai (el mateix objecte) a una captura; les vistes antigues
+    # deixen de ser vàlides i les posicions s'han de recalcular
+    for table, (names, columns, alive) in zip((space.orbit_table, space.satellite_table), state):
+        table.attach(names, {c: v.copy() for c, v in columns.items()}, alive)
+
+
+class Timeline:
+    def __init__(self, space, start=0.0, interval=SNAPSHOT_INTERVAL):
+        self.interval = interval
+        self.reset(space, start)
+
+    def reset(self, space, start=0.0):
+        # l'estat actual de l'espai passa a ser l'origen (p. ex. després de carregar fitxers)
+        self.start = start
+        self.events = []
+        self.times = []
+        self.counts = [0]                # esdeveniments aplicats a cada captura
+        self.snapshots = [capture(space)]
+        self.applied = 0                 # esdeveniments reflectits a l'espai en directe
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def end(self):
+        return self.times[-1] if self.times else self.start
+
+    def due(self, t):
+        # hi ha esdeveniments registrats entre l'estat en directe i t
+        return self.applied < len(self.times) and self.times[self.applied] <= t
+
+    def record(self, space, event):
+        # aplica l'esdeveniment a l'espai en directe i, si té èxit, el desa
+        if self.applied and event.time < self.times[self.applied - 1]:
+            raise ValueError(f"esdeveniment a t = {event.time} anterior a l'últim aplicat")
+        if not event.apply(space):
+            return False
+        if self.applied < len(self.events):
+            del self.events[self.applied:], self.times[self.applied:]
+            keep = bisect_right(self.counts, self.applied)
+            del self.counts[keep:], self.snapshots[keep:]
+        self.events.append(event)
+        self.times.append(event.time)
+        self.applied += 1
+        if self.applied - self.counts[-1] >= self.interval:
+            self.counts.append(self.applied)
+            self.snapshots.append(capture(space))
+        return True
+
+    def _replay(self, space, t, applied):
+        # porta un espai que reflecteix `applied` esdeveniments fins a t
+        count = bisect_right(self.times, t)
+        k = bisect_right(self.counts, count) - 1
+        if applied is None or applied > count or count - applied > count - self.counts[k]:
+            restore(space, self.snapshots[k])
+            applied = self.counts[k]
+        for event in self.events[applied:count]:
+            event.apply(space)
+        return count
+
+    def seek(self, space, t):
+        # l'espai en directe passa a l'estat de l'instant t (amb posicions);
+        # cal tenir engine.lock agafat si hi ha un SimulationEngine
+        self.applied = self._replay(space, t, self.applied)
+        update_all_positions(space, t)
+        return self.applied
+
+    def state_at(self, t):
+        # un Space nou amb l'estat de l'instant t, sense tocar l'espai en directe
+        space = Space()
+        self._replay(space, t, None)
+        update_all_positions(space, t)
+        return space
+
+
+if __name__ == "__main__":
+    import numpy as np
+    from space import satellite_elements
+    from synthetic import synthetic_space
+
+    parser = argparse.ArgumentParser(description="Cerca temporal sobre una línia de maniobres")
+    parser.add_argument("--satellites", type=int, default=10000)
+    parser.add_argument("--maneuvers", type=int, default=5000)
+    parser.add_argument("--interval", type=int, default=SNAPSHOT_INTERVAL)
+    parser.add_argument("--seeks", type=int, default=200)
+    args = parser.parse_args()
+
+    space = synthetic_space(args.satellites)
+    base = capture(space)
+    timeline = Timeline(space, interval=args.interval)
+    rng = np.random.default_rng(1)
+    sats = [s.name for s in space.satellites]
+    start = time.perf_counter()
+    t, recorded = 0.0, 0
+    for k in range(args.maneuvers):
+        t += float(rng.uniform(10, 600))
+        sat = get_satellite(space, sats[rng.integers(len(sats))])
+        a = sat.orbit.a * float(rng.uniform(1.0, 1.02))
+        recorded += timeline.record(space, Maneuver(t, sat.name, f"M{k}", 2 * np.pi * np.sqrt(a**3 / 3.986e5),
+                                                    0.0, a))
+    build = time.perf_counter() - start
+    print(f"{recorded} maniobres registrades en {build:.2f} s, {len(timeline.snapshots)} captures")
+
+    targets = rng.uniform(0, t, args.seeks)
+    start = time.perf_counter()
+    for target in targets:
+        timeline.seek(space, float(target))
+    seek = (time.perf_counter() - start) / args.seeks
+    # referència: des de l'origen reproduint tots els esdeveniments fins a t
+    check = float(targets[-1])
+    reference = Space()
+    restore(reference, base)
+    start = time.perf_counter()
+    for event in timeline.events[:bisect_right(timeline.times, check)]:
+        event.apply(reference)
+    update_all_positions(reference, check)
+    replay = time.perf_counter() - start
+    # les files d'òrbita poden diferir segons quan s'ha compactat la taula:
+    # es comparen els elements de cada satèl·lit
+    same = all(np.array_equal(u, v) for u, v in
+               zip(satellite_elements(space)[1:], satellite_elements(reference)[1:]))
+    same = same and all(np.array_equal(space.satellite_table.col(c), reference.satellite_table.col(c))
+                        for c in ("mass", "fuel", "x", "y"))
+    print(f"cerca: {seek * 1e3:.1f} ms de mitjana; reproducció completa fins a "
+          f"t = {check:.0f} s: {replay * 1e3:.0f} ms; {'idèntic' if same else 'DIFERENT'}")
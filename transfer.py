@@ -0,0 +1,173 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from maneuver import STRATEGIES, APSIS_TOL, apsis_radius, fuel_for_dv, transfer_cost
+from propagator import propagate
+from satellite import change_orbit
+
+# Optimitzador de finestres i estratègies de transferència. Per a cada
+# satèl·lit i estratègia de maneuver.STRATEGIES es calcula el Δv des del radi
+# on és a cada instant d'encesa candidat a partir de `now`, i el pla és el de
+# menys combustible (a massa fixa, el de menys Δv). Hohmann i bi-el·líptica
+# només encenen sobre la línia d'àpsides, així que els candidats són els dos
+# pròxims pasos per un àpside (M = kπ). Com que l'impuls tangencial de
+# change_orbit no porta el satèl·lit a l'òrbita demanada (la deforma o hi
+# salta), aquest es mostreja en `samples` instants d'un període i només
+# s'admet si el radi d'encesa coincideix amb el perigeu de la destinació (a
+# APSIS_TOL km).
+#
+# optimize_fleet reparteix els satèl·lits en blocs entre processos; cada bloc
+# s'avalua vectoritzat. Un threading.Event `cancel` atura el repartiment: els
+# blocs pendents es cancel·len i els seus plans queden a None.
+
+SAMPLES = 72
+CHUNK = 256
+
+
+class TransferPlan:
+    __slots__ = ("strategy", "burn_time", "dv", "fuel", "feasible", "via", "arrival")
+
+    def __init__(self, strategy, burn_time, dv, fuel, feasible, via, arrival):
+        self.strategy = strategy
+        self.burn_time = burn_time
+        self.dv = dv
+        self.fuel = fuel
+        self.feasible = feasible
+        self.via = via
+        self.arrival = arrival
+
+    def __repr__(self):
+        return (f"TransferPlan({self.strategy}, t={self.burn_time:.1f} s, "
+                f"Δv={self.dv:.1f} m/s, combustible={self.fuel:.2f} kg)")
+
+
+def evaluate_transfers(elements, mass, fuel, target_epsilon, target_a, now=0.0,
+                       samples=SAMPLES, strategies=STRATEGIES):
+    # elements = (period, epsilon, a, M0) dels n satèl·lits; retorna per a cada
+    # satèl·lit (índex d'estratègia, instant, Δv, combustible, factible, via, arribada)
+    period, epsilon, a, M0 = (np.asarray(v, dtype=float) for v in elements)
+    mass = np.asarray(mass, dtype=float)
+    sampled = now + period * (np.arange(samples) / samples)[:, None]      # (samples, n)
+    x, y = propagate(period, epsilon, a, M0, sampled)
+    # els dos pròxims àpsides: M = kπ, x > 0 per a k parell
+    motion = 2 * np.pi / period
+    k = np.ceil((M0 + motion * now) / np.pi) + np.arange(2)[:, None]      # (2, n)
+    apsides = (k * np.pi - M0) / motion
+    side = np.where(k % 2 == 0, 1.0, -1.0)
+    best = None
+    for s, strategy in enumerate(strategies):
+        if strategy == "tangential":
+            times, r1 = sampled, np.hypot(x, y)
+        else:
+            times, r1 = apsides, apsis_radius(epsilon, a, side)
+        dv, _, tof, via = transfer_cost(strategy, r1, a, target_epsilon, target_a,
+                                        epsilon1=epsilon, side=side)
+        if strategy == "tangential":
+            dv = np.where(np.abs(target_a * (1 - target_epsilon) - r1) <= APSIS_TOL, dv, np.inf)
+        dv = np.where(np.isnan(dv), np.inf, dv)
+        k = np.argmin(dv, axis=0)
+        cols = np.arange(len(mass))
+        candidate = (np.full(len(mass), s), times[k, cols], dv[k, cols],
+                     tof[k, cols], via[k, cols])
+        if best is None:
+            best = candidate
+        else:
+            take = candidate[2] < best[2]
+            best = tuple(np.where(take, c, b) for c, b in zip(candidate, best))
+    s, burn, dv, tof, via = best
+    needed = fuel_for_dv(mass, dv)
+    return s, burn, dv, needed, np.asarray(fuel) >= needed, via, burn + tof
+
+
+def _plans(result, strategies):
+    return [TransferPlan(strategies[int(s)], t, d, f, bool(ok), v, arr)
+            for s, t, d, f, ok, v, arr in zip(*(np.asarray(r).tolist() for r in result))]
+
+
+def _inputs(pairs):
+    # (elements, massa, combustible, epsilon i a de destinació) de parelles (satèl·lit, òrbita)
+    sats = [s for s, _ in pairs]
+    orbits = [s.orbit for s in sats]
+    elements = (np.array([o.period for o in orbits]), np.array([o.epsilon for o in orbits]),
+                np.array([o.a for o in orbits]), np.array([s.M0 for s in sats]))
+    return (elements, np.array([s.mass for s in sats]), np.array([s.fuel for s in sats]),
+            np.array([o.epsilon for _, o in pairs]), np.array([o.a for _, o in pairs]))
+
+
+def _evaluate_chunk(args):
+    inputs, now, samples, strategies = args
+    return evaluate_transfers(*inputs, now=now, samples=samples, strategies=strategies)
+
+
+def optimize_transfer(satellite, target, now=0.0, samples=SAMPLES, strategies=STRATEGIES):
+    # millor pla per a un sol satèl·lit, al mateix procés
+    result = evaluate_transfers(*_inputs([(satellite, target)]), now=now,
+                                samples=samples, strategies=strategies)
+    return _plans(result, strategies)[0]
+
+
+def optimize_fleet(pairs, now=0.0, samples=SAMPLES, strategies=STRATEGIES,
+                   workers=None, chunk=CHUNK, cancel=None):
+    # pairs: llista de (satèl·lit, òrbita de destinació). Retorna una llista de
+    # TransferPlan en el mateix ordre (None per als blocs cancel·lats).
+    pairs = list(pairs)
+    plans = [None] * len(pairs)
+    tasks = [(start, (_inputs(pairs[start:start + chunk]), now, samples, strategies))
+             for start in range(0, len(pairs), chunk)]
+    if not tasks:
+        return plans
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        pending = {pool.submit(_evaluate_chunk, args): start for start, args in tasks}
+        while pending:
+            if cancel is not None and cancel.is_set():
+                for future in pending:
+                    future.cancel()
+                break
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                chunk_plans = _plans(future.result(), strategies)
+                plans[start:start + len(chunk_plans)] = chunk_plans
+    return plans
+
+
+def execute_plan(satellite, target, plan):
+    # Porta el satèl·lit a l'instant d'encesa i hi aplica change_orbit amb
+    # l'estratègia del pla. S'ha de cridar quan la simulació arriba a burn_time.
+    if not plan.feasible:
+        return False
+    satellite.update_position(plan.burn_time)
+    return change_orbit(satellite, target, plan.burn_time, plan.strategy, plan.via)
+
+
+if __name__ == "__main__":
+    from synthetic import synthetic_space
+
+    parser = argparse.ArgumentParser(description="Optimitza la reconfiguració d'una flota sintètica")
+    parser.add_argument("--satellites", type=int, default=10000)
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="cancel·la l'optimització després d'aquests segons")
+    args = parser.parse_args()
+    space = synthetic_space(args.satellites)
+    orbits = list(space.orbits)
+    rng = np.random.default_rng(1)
+    pairs = [(s, orbits[i]) for s, i in zip(space.satellites, rng.integers(0, len(orbits), len(space.satellites)))]
+    cancel = threading.Event()
+    timer = threading.Timer(args.timeout or 0.0, cancel.set)
+    if args.timeout is not None:
+        timer.start()
+    start = time.perf_counter()
+    plans = optimize_fleet(pairs, samples=args.samples, workers=args.workers,
+                           chunk=args.chunk, cancel=cancel)
+    elapsed = time.perf_counter() - start
+    timer.cancel()
+    done = [p for p in plans if p is not None]
+    counts = {s: sum(p.strategy == s for p in done) for s in STRATEGIES}
+    print(f"{len(done)}/{len(plans)} plans en {elapsed:.2f} s; "
+          f"{sum(p.feasible for p in done)} factibles; {counts}")